@@ -6,11 +6,20 @@ import plotly.graph_objects as go
 from config.news_sources import CHILEAN_SOURCES, INTERNATIONAL_SOURCES, GOOGLE_NEWS_CATEGORIES
 from modules.free_news_aggregator import FreeNewsAggregator
 from modules.deepseek_analyzer import DeepSeekAnalyzer
+from modules.article_store import ArticleStore, ANALYSIS_COLUMNS, ARTICLE_COLUMNS, compact_articles
+from modules.analysis_pipeline import AnalysisPipeline, apply_update, merge_update
+from modules.local_classifier import LocalClassifier
+from modules.story_clusters import CLASSIFICATION_COLUMNS, cluster_stories, spread_story_labels
+from modules.crisis_scorer import CrisisScorer
+from modules.llm_cost import SearchCost
+from modules.telemetry import Trace, span, start_metrics_server, start_trace, tracing
+from modules.notifications import generate_analysis_summary, send_email_summary
+from config.settings import (
+    CLASSIFIER_MODE, CRISIS_RECENT_HOURS, DISPLAY_TIMEZONE, LOCAL_CONFIDENCE_THRESHOLD, WATCH_INTERVAL
+)
+import hashlib
 import os
 from dotenv import load_dotenv
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 load_dotenv()
 
@@ -45,10 +54,19 @@ st.markdown("""
 def init_components():
     all_sources = {**CHILEAN_SOURCES, **INTERNATIONAL_SOURCES}
     aggregator = FreeNewsAggregator()
+    # Los feeds directos se refrescan en segundo plano; las búsquedas consultan memoria
+    aggregator.start_ingestion(all_sources)
     analyzer = DeepSeekAnalyzer()
-    return aggregator, analyzer, all_sources
+    article_store = ArticleStore()
+    pipeline = AnalysisPipeline(analyzer, LocalClassifier())
+    crisis_scorer = CrisisScorer(analyzer)
+    start_metrics_server()
+    return aggregator, analyzer, all_sources, article_store, pipeline, crisis_scorer
+
+aggregator, analyzer, all_sources, article_store, pipeline, crisis_scorer = init_components()
 
-aggregator, analyzer, all_sources = init_components()
+# Tiempos de esta ejecución del script (cada interacción re-ejecuta todo)
+run_trace = start_trace("dashboard")
 
 # Session state
 if 'search_history' not in st.session_state:
@@ -70,6 +88,22 @@ if st.session_state.search_history:
             key=f"history_{i}"
         ):
             st.session_state.current_keyword = search['keyword']
+            st.session_state.current_keywords = search.get('keywords', [search['keyword']])
+            st.rerun()
+
+# Vigilancias del monitor (python -m modules.monitor)
+watches = article_store.watches()
+if not watches.empty:
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🛰️ Vigilancias")
+    risk_icons = {"BAJO": "🟢", "MEDIO": "🟡", "ALTO": "🟠", "CRÍTICO": "🔴"}
+    for i, watch in watches.iterrows():
+        if st.sidebar.button(
+            f"{risk_icons.get(watch['risk_level'], '⚪')} {watch['keyword']} ({int(watch['total_articles'] or 0)} noticias)",
+            key=f"watch_{i}"
+        ):
+            st.session_state.current_keyword = watch['keyword']
+            st.session_state.current_keywords = [watch['keyword']]
             st.rerun()
 
 # Configuración
@@ -108,6 +142,20 @@ min_matches = st.sidebar.number_input(
     value=1
 )
 
+classifier_modes = {"hybrid": "Híbrido (local + DeepSeek)", "local": "Local (sin red)", "llm": "DeepSeek"}
+classifier_mode = st.sidebar.selectbox(
+    "Clasificación de sentimiento",
+    list(classifier_modes),
+    index=list(classifier_modes).index(CLASSIFIER_MODE) if CLASSIFIER_MODE in classifier_modes else 0,
+    format_func=classifier_modes.get,
+    help="Híbrido: el clasificador local resuelve lo evidente y solo lo dudoso va a DeepSeek"
+)
+
+show_timings = st.sidebar.checkbox(
+    "⏱️ Desglose de tiempos",
+    help="Cuánto tomó cada feed, cada llamada a DeepSeek y cada etapa del dashboard"
+)
+
 # Header
 st.title("🔍 Monitor de Noticias Chile")
 st.markdown("**Busca términos específicos en medios chilenos e internacionales**")
@@ -121,8 +169,13 @@ with st.container():
         keyword = st.text_input(
             "**Ingresa el término a buscar:**",
             placeholder="Ej: reforma tributaria, sequía, Gabriel Boric...",
+            help='Sin distinguir tildes ni mayúsculas. Admite "frases", AND, OR, NOT, -excluir y prefijo*',
             key="keyword_input"
         )
+        multi_keyword = st.checkbox(
+            "Varios términos (separados por coma)",
+            help="Una sola pasada por las fuentes para todos los términos; cada noticia indica con cuál coincidió"
+        )
 
     with col2:
         st.markdown("<br>", unsafe_allow_html=True)
@@ -131,295 +184,259 @@ with st.container():
     st.markdown("**💡 Sugerencias:** reforma constitucional | inflación | sequía | minería | educación | pensiones")
     st.markdown('</div>', unsafe_allow_html=True)
 
-# Nueva función para análisis de emociones
-def analyze_emotion_with_deepseek(text):
-    """
-    Analiza las emociones de un texto usando DeepSeek API
-    """
-    try:
-        prompt = f"""Analiza las emociones del siguiente texto y responde SOLO con UNA palabra de estas opciones: RISA, IRA, MIEDO, TRISTEZA, DISGUSTO, SORPRESA, NEUTRAL.
-
-Texto: {text[:500]}
-
-Emoción:"""
-
-        response = analyzer.client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "Eres un experto en análisis de emociones. Responde siempre con una sola palabra en mayúsculas."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=10
-        )
-
-        emotion = response.choices[0].message.content.strip().upper()
-        valid_emotions = ["RISA", "IRA", "MIEDO", "TRISTEZA", "DISGUSTO", "SORPRESA", "NEUTRAL"]
-        if emotion in valid_emotions:
-            return emotion
-        else:
-            return 'NEUTRAL'
-    except Exception as e:
-        print(f"Error en análisis de emociones: {e}")
-        return 'DESCONOCIDO'
-
-# Nueva función para generar resumen
-def generate_analysis_summary(df, keyword, max_news=20):
-    """
-    Genera un resumen consolidado
-    """
-    if df.empty:
-        return "No hay datos para generar el resumen."
-
-    summary_parts = []
-    summary_parts.append(f"📊 RESUMEN DE ANÁLISIS: '{keyword}'")
-    summary_parts.append(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-    summary_parts.append(f"Total de noticias analizadas: {len(df)}\n")
-
-    if 'sentiment' in df.columns:
-        sentiment_counts = df['sentiment'].value_counts()
-        summary_parts.append("🎭 ANÁLISIS DE SENTIMIENTOS:")
-        for sentiment, count in sentiment_counts.items():
-            percentage = (count / len(df)) * 100
-            summary_parts.append(f"  • {sentiment}: {count} ({percentage:.1f}%)")
-        summary_parts.append("")
-
-    if 'emotion' in df.columns:
-        emotion_counts = df['emotion'].value_counts()
-        summary_parts.append("😊 ANÁLISIS DE EMOCIONES:")
-        for emotion, count in emotion_counts.items():
-            percentage = (count / len(df)) * 100
-            summary_parts.append(f"  • {emotion}: {count} ({percentage:.1f}%)")
-        summary_parts.append("")
-
-    summary_parts.append(f"📰 DETALLE DE NOTICIAS (Mostrando las primeras {min(max_news, len(df))} de {len(df)}):\n")
-
-    for idx, row in df.head(max_news).iterrows():
-        title = row.get('title', 'Sin título')
-        source = row.get('source', 'Fuente desconocida')
-        link = row.get('link', 'Sin enlace')
-        sentiment = row.get('sentiment', 'N/A')
-        emotion = row.get('emotion', 'N/A')
-
-        summary_parts.append(f"{'='*80}")
-        summary_parts.append(f"Noticia #{idx + 1}")
-        summary_parts.append(f"Titular: {title}")
-        summary_parts.append(f"Medio: {source}")
-        summary_parts.append(f"Sentimiento: {sentiment}")
-        summary_parts.append(f"Emoción: {emotion}")
-        summary_parts.append(f"Link: {link}")
-        summary_parts.append("")
-
-    if len(df) > max_news:
-        summary_parts.append(f"\n... y {len(df) - max_news} noticias más")
-
-    return "\n".join(summary_parts)
-
-# Nueva función para enviar email
-def send_email_summary(recipient_email, subject, summary_content):
-    """
-    Envía el resumen por email
-    """
-    try:
-        message = MIMEMultipart()
-        message["From"] = EMAIL_SENDER
-        message["To"] = recipient_email
-        message["Subject"] = subject
-        message.attach(MIMEText(summary_content, "plain", "utf-8"))
-
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-        server.sendmail(EMAIL_SENDER, recipient_email, message.as_string())
-        server.quit()
-
-        return True, "Email enviado exitosamente ✅"
-    except Exception as e:
-        return False, f"Error al enviar email: {str(e)}"
+def render_partial(placeholder, df, status):
+    """Vista previa mientras llegan feeds y clasificaciones; la reemplaza la vista completa"""
+    with placeholder.container():
+        st.caption(status)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📰 Noticias", len(df))
+        with col2:
+            st.metric("📡 Fuentes", df['source'].nunique() if 'source' in df.columns else 0)
+        with col3:
+            if 'sentiment' in df.columns:
+                st.metric("😟 Negativas", int((df['sentiment'] == 'NEGATIVO').sum()))
+        columns = [c for c in ('title', 'source', 'published_dt', 'sentiment', 'emotion') if c in df.columns]
+        preview = df.sort_values('published_dt', ascending=False) if 'published_dt' in df.columns else df
+        st.dataframe(preview[columns].head(20), use_container_width=True, hide_index=True)
+
+def merge_keyword_rows(df):
+    """Una fila por link: los términos con que coincidió se unen en keyword y las menciones se suman"""
+    if df.empty or df['link'].is_unique:
+        return df
+    grouped = df.groupby('link', sort=False)
+    merged = grouped.first()
+    merged['keyword'] = grouped['keyword'].agg(lambda terms: ", ".join(dict.fromkeys(terms)))
+    merged['keyword_matches'] = grouped['keyword_matches'].sum()
+    merged['relevance_score'] = grouped['relevance_score'].sum()
+    return merged.reset_index()
 
 # Función de búsqueda CORREGIDA
-def perform_search(keyword_to_search, days, categories, use_google, use_bing):
-    with st.spinner(f"🔍 Buscando '{keyword_to_search}' en múltiples fuentes..."):
-
-        # Filtrar fuentes
-        filtered_sources = {cat: sources for cat, sources in all_sources.items() if cat in categories}
-
-        # Realizar búsqueda
-        df = aggregator.aggregate_all_free(
-            keyword_to_search,
+def perform_search(keywords, days, categories, use_google, use_bing, mode=CLASSIFIER_MODE):
+    # Los resultados se muestran a medida que llegan, sin esperar a la última fuente
+    live = st.empty()
+
+    # Filtrar fuentes
+    filtered_sources = {cat: sources for cat, sources in all_sources.items() if cat in categories}
+
+    cutoff = (datetime.utcnow() - timedelta(days=days)).replace(tzinfo=None)
+    cutoff_utc = pd.Timestamp(cutoff, tz="UTC")
+
+    # --- Historial persistente: lo guardado en búsquedas anteriores dentro de la ventana ---
+    # (solo de los orígenes habilitados en la barra lateral)
+    origins = ['rss'] + (['google'] if use_google else []) + (['bing'] if use_bing else [])
+    with span("ui_stage", stage="stored_results"):
+        stored_frames = [
+            article_store.search(term, since=cutoff_utc, categories=categories, origins=origins,
+                                 min_matches=min_matches)
+            for term in keywords
+        ]
+    stored_frames = [f for f in stored_frames if not f.empty]
+    stored_df = pd.concat(stored_frames, ignore_index=True) if stored_frames else pd.DataFrame()
+    if not stored_df.empty:
+        stored_df = stored_df.assign(relevance_score=stored_df['keyword_matches'])
+        render_partial(live, stored_df, "📚 Resultados guardados; consultando fuentes...")
+
+    # Realizar búsqueda: ventana de días, categorías y mínimo de menciones se aplican
+    # al recorrer los feeds; published_dt ya viene como datetime64[ns, UTC]
+    frames = []
+    with st.spinner(f"🔍 Buscando '{', '.join(keywords)}' en múltiples fuentes..."), \
+            span("ui_stage", stage="fetch"):
+        for batch in aggregator.iter_results_many(
+            keywords,
             filtered_sources,
             use_google_news=use_google,
-            use_bing_news=use_bing
-        )
-
-        if df is None or df.empty:
-            return pd.DataFrame()
-
-        # --- Filtrar por fecha (últimos N días) ---
-        if 'published' in df.columns:
-            df['published_dt'] = pd.to_datetime(df['published'], errors='coerce', utc=True)
-            cutoff = (datetime.utcnow() - timedelta(days=days)).replace(tzinfo=None)
-            # published_dt es UTC-aware; pasamos cutoff a UTC-aware
-            cutoff_utc = pd.Timestamp(cutoff, tz="UTC")
-            df = df[df['published_dt'].notna() & (df['published_dt'] >= cutoff_utc)]
-
-        if df.empty:
-            return df
+            use_bing_news=use_bing,
+            since=cutoff_utc.to_pydatetime(),
+            min_matches=min_matches
+        ):
+            frames.append(batch)
+            partial = pd.concat(frames + ([stored_df] if not stored_df.empty else []), ignore_index=True)
+            render_partial(live, partial.drop_duplicates('link'), "📥 Llegando resultados...")
 
-        # Filtrar por menciones mínimas
-        if 'keyword_matches' in df.columns:
-            df = df[df['keyword_matches'] >= min_matches]
+    df = pd.concat(frames, ignore_index=True).sort_values('relevance_score', ascending=False) \
+        if frames else pd.DataFrame()
 
-        if df.empty:
-            return df
+    # Lo recién descargado tiene prioridad sobre la copia guardada del mismo link y término
+    if not stored_df.empty:
+        if not df.empty:
+            fresh = set(zip(df['link'], df['keyword']))
+            stored_df = stored_df[[pair not in fresh for pair in zip(stored_df['link'], stored_df['keyword'])]]
+        df = pd.concat([df, stored_df], ignore_index=True) if not df.empty else stored_df
 
-        # Reset index para que el loop/progress sea 100% consistente
-        df = df.reset_index(drop=True)
+    if df.empty:
+        live.empty()
+        return df
 
-        # --- Análisis de sentimiento y emociones ---
-        with st.spinner("Analizando sentimientos y emociones..."):
-            sentiments = []
-            emotions = []
+    # Con varios términos, una noticia que menciona más de uno se analiza y muestra una vez
+    df = merge_keyword_rows(df)
+
+    # Reset index para que el loop/progress sea 100% consistente
+    df = df.reset_index(drop=True)
+
+    # --- Agrupar copias de la misma historia (Google/Bing/medios) ---
+    with span("ui_stage", stage="cluster"):
+        df = cluster_stories(df)
+
+    # --- Reutilizar el análisis ya guardado para estos links ---
+    known = article_store.get_analysis(df['link'].tolist())
+    for col in ANALYSIS_COLUMNS:
+        from_store = df['link'].map(known[col])
+        df[col] = df[col].fillna(from_store) if col in df.columns else from_store
+        # Sin análisis guardado la columna queda float64 (todo NaN) y no admite textos
+        if col != 'confidence':
+            df[col] = df[col].astype(object)
+
+    if mode == "llm":
+        # Lo etiquetado localmente se vuelve a clasificar con DeepSeek
+        df.loc[df['classifier'].eq('local'), CLASSIFICATION_COLUMNS] = None
+    elif mode == "hybrid":
+        # Etiquetas locales dudosas (de una corrida en modo local) vuelven a pasar por el
+        # clasificador y, si siguen dudosas, escalan a DeepSeek
+        doubtful = df['classifier'].eq('local') & \
+            (pd.to_numeric(df['confidence'], errors='coerce').fillna(0) < LOCAL_CONFIDENCE_THRESHOLD)
+        df.loc[doubtful, CLASSIFICATION_COLUMNS] = None
+    unlabeled = df['sentiment'].isna()
+    # Si alguna copia de la historia ya estaba analizada, el resto la hereda
+    df = spread_story_labels(df)
+
+    # Solo se analiza un representante por historia
+    pending = df.index[df['sentiment'].isna() & df['is_representative']].tolist()
+    # Resúmenes con IA: primeras 5 historias que no tengan uno guardado
+    to_summarize = [
+        i for i in df.index[df['is_representative']][:5] if pd.isna(df.at[i, 'summary_ai'])
+    ]
+    failed, failed_summaries = [], []
 
-            total_rows = len(df)
+    # --- Sentimiento/emoción por lotes y resúmenes, en paralelo (solo lo no analizado antes) ---
+    if pending or to_summarize:
+        with st.spinner("Analizando sentimientos, emociones y generando resúmenes..."), \
+                span("ui_stage", stage="analysis"):
             progress_bar = st.progress(0.0)
-
-            for i, row in df.iterrows():
-                text = f"{row.get('title', '')} {row.get('summary', '')}"
-
-                # Sentimiento
-                sentiment_result = analyzer.analyze_sentiment(text)
-                sentiments.append(sentiment_result.get('sentiment', 'NEUTRAL'))
-
-                # Emoción
-                emotions.append(analyze_emotion_with_deepseek(text))
-
-                # Progress SIEMPRE en [0.0, 1.0]
-                progress = (i + 1) / total_rows
+            outcome = {"classifications": {}, "summaries": {}, "failed_summaries": [], "escalated": 0}
+
+            for update in pipeline.stream(
+                df[['title', 'summary']].to_dict('records'),
+                classify=pending,
+                summarize=to_summarize,
+                mode=mode
+            ):
+                merge_update(outcome, update)
+                df = apply_update(df, update)
+                # Progress SIEMPRE en [0.0, 1.0]; los resultados llegan en cualquier orden
+                progress = update['done'] / update['total'] if update['total'] else 1.0
                 progress_bar.progress(min(1.0, max(0.0, float(progress))))
+                render_partial(live, df, f"🧠 Analizando: {update['done']} de {update['total']} tareas listas")
 
             progress_bar.progress(1.0)
             progress_bar.empty()
 
-            df['sentiment'] = sentiments
-            df['emotion'] = emotions
+        # Lo que falló en el representante tampoco cuenta como analizado en sus copias
+        failed_stories = df.loc[outcome['failed'], 'story_id']
+        failed = df.index[df['story_id'].isin(failed_stories) & unlabeled].tolist()
+        failed_summaries = outcome['failed_summaries']
+        if mode == "hybrid" and pending:
+            st.caption(
+                f"🧮 {len(pending) - outcome['escalated']} de {len(pending)} historias clasificadas localmente; "
+                f"{outcome['escalated']} enviadas a DeepSeek"
+            )
 
-        # --- Resúmenes con IA (primeros 5) ---
-        with st.spinner("Generando resúmenes con IA..."):
-            df['summary_ai'] = df.get('summary', '')
-            for i in range(min(5, len(df))):
-                row = df.iloc[i]
-                summary = analyzer.summarize_article(row.get('title', ''), row.get('summary', ''))
-                df.at[i, 'summary_ai'] = summary
+        if failed:
+            st.warning(
+                f"⚠️ {len(failed)} noticias no pudieron analizarse tras varios reintentos "
+                f"(se muestran como NEUTRAL / DESCONOCIDO y se reintentarán en la próxima búsqueda)"
+            )
 
-        return df
+    # Persistir antes de completar summary_ai con el resumen del feed (solo para mostrar).
+    # Lo que falló no se guarda como analizado para que se reintente después.
+    to_store = df[[c for c in ARTICLE_COLUMNS if c in df.columns]].copy()
+    to_store.loc[failed, CLASSIFICATION_COLUMNS] = None
+    to_store.loc[failed_summaries, 'summary_ai'] = None
+    with span("ui_stage", stage="persist"):
+        article_store.upsert(to_store)
+    df['summary_ai'] = df['summary_ai'].fillna(df.get('summary', ''))
+    # Columnas de visualización: una vez por búsqueda, no en cada rerun
+    df['date'] = df['published_dt'].dt.tz_convert(DISPLAY_TIMEZONE)
+
+    live.empty()
+    # Lo que queda en la sesión, con tipos compactos
+    return compact_articles(df)
+
+# Agregados y gráficos del resultado: se calculan una vez por conjunto de resultados
+# (la huella se fija al buscar) y no en cada rerun provocado por filtros o botones
+FINGERPRINT_COLUMNS = ('link', 'keyword', 'keyword_matches', 'source', 'story_id',
+                       'sentiment', 'emotion', 'summary_ai')
+
+def results_fingerprint(df):
+    """Huella del resultado: cambia si cambian las noticias, su análisis o su orden
+
+    Depende del orden porque story_id es la posición de la primera fila de cada historia.
+    """
+    if df.empty:
+        return ""
+    columns = [c for c in FINGERPRINT_COLUMNS if c in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def results_metrics(fingerprint, _df):
+    has_matches = 'keyword_matches' in _df.columns
+    return {
+        'news': len(_df),
+        'stories': _df['story_id'].nunique() if 'story_id' in _df.columns else len(_df),
+        'sources': _df['source'].nunique(),
+        'mentions': int(_df['keyword_matches'].sum()) if has_matches else len(_df),
+        'avg_mentions': _df['keyword_matches'].mean() if has_matches else 1.0,
+        'negative': int((_df['sentiment'] == 'NEGATIVO').sum()),
+        'positive': int((_df['sentiment'] == 'POSITIVO').sum()),
+        'source_list': _df['source'].unique().tolist(),
+        # Medios que publicaron cada historia
+        'story_sources': {story: sorted(set(sources)) for story, sources in _df.groupby('story_id')['source']}
+                         if 'story_id' in _df.columns else {}
+    }
 
-# Ejecutar búsqueda
-if search_button and keyword:
-    st.session_state.current_results = perform_search(
-        keyword, 
-        days_back, 
-        categories_filter,
-        use_google_news,
-        use_bing_news
+@st.cache_data(max_entries=32, show_spinner=False)
+def coverage_figures(fingerprint, _df, multi_keyword):
+    """Gráficos de cobertura; None donde no hay datos para graficar"""
+    figures = {}
+
+    sentiment_counts = _df['sentiment'].value_counts()
+    sentiment_counts = sentiment_counts[sentiment_counts > 0]
+    figures['sentiment'] = px.pie(
+        values=sentiment_counts.values,
+        names=sentiment_counts.index,
+        color=sentiment_counts.index,
+        color_discrete_map={
+            'POSITIVO': '#00CC96', 
+            'NEUTRAL': '#636EFA', 
+            'NEGATIVO': '#EF553B'
+        }
     )
-    st.session_state.current_keyword = keyword
 
-    # Guardar en historial
-    if not st.session_state.current_results.empty:
-        st.session_state.search_history.append({
-            'keyword': keyword,
-            'count': len(st.session_state.current_results),
-            'timestamp': datetime.now()
-        })
-
-# Mostrar resultados
-df = st.session_state.current_results
-
-if not df.empty and 'current_keyword' in st.session_state:
-    keyword_searched = st.session_state.current_keyword
-
-    st.markdown("---")
-
-    # Métricas
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("📰 Noticias", len(df))
-    with col2:
-        st.metric("📡 Fuentes", df['source'].nunique())
-    with col3:
-        total_mentions = int(df['keyword_matches'].sum()) if 'keyword_matches' in df.columns else len(df)
-        st.metric("📊 Menciones", total_mentions)
-    with col4:
-        avg_mentions = df['keyword_matches'].mean() if 'keyword_matches' in df.columns else 1.0
-        st.metric("📈 Promedio", f"{avg_mentions:.1f}")
-
-    # Análisis de Crisis
-    st.markdown("---")
-    st.header(f"🚨 Análisis de Riesgo: '{keyword_searched}'")
-
-    crisis_data = analyzer.detect_crisis_signals(df)
-
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        color_map = {"BAJO": "🟢", "MEDIO": "🟡", "ALTO": "🟠", "CRÍTICO": "🔴"}
-        st.metric("Nivel", f"{color_map.get(crisis_data['risk_level'], '⚪')} {crisis_data['risk_level']}")
-    with col2:
-        st.metric("Score", f"{crisis_data.get('score', 0):.1f}%")
-    with col3:
-        negative_pct = (crisis_data.get('negative_news', 0) / len(df) * 100) if len(df) > 0 else 0
-        st.metric("% Negativas", f"{negative_pct:.1f}%")
-    with col4:
-        positive_count = len(df[df['sentiment'] == 'POSITIVO'])
-        st.metric("Positivas", positive_count)
-
-    if crisis_data.get('analysis'):
-        st.info(f"**💡 Análisis:** {crisis_data['analysis']}")
-
-    # Visualizaciones
-    st.markdown("---")
-    st.header("📊 Análisis de Cobertura")
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.subheader("Distribución de Sentimiento")
-        sentiment_counts = df['sentiment'].value_counts()
-        fig = px.pie(
-            values=sentiment_counts.values,
-            names=sentiment_counts.index,
-            color=sentiment_counts.index,
-            color_discrete_map={
-                'POSITIVO': '#00CC96', 
-                'NEUTRAL': '#636EFA', 
-                'NEGATIVO': '#EF553B'
-            }
-        )
-        st.plotly_chart(fig, use_container_width=True)
-
-    with col2:
-        st.subheader("Top Medios")
-        source_counts = df['source'].value_counts().head(10)
-        fig = px.bar(
-            x=source_counts.values,
-            y=source_counts.index,
-            orientation='h',
-            labels={'x': 'Cantidad', 'y': 'Medio'}
+    source_counts = _df['source'].value_counts()
+    source_counts = source_counts[source_counts > 0].head(10)
+    fig = px.bar(
+        x=source_counts.values,
+        y=source_counts.index,
+        orientation='h',
+        labels={'x': 'Cantidad', 'y': 'Medio'}
+    )
+    fig.update_layout(showlegend=False)
+    figures['sources'] = fig
+
+    figures['terms'] = None
+    if multi_keyword:
+        term_counts = _df['keyword'].str.split(", ").explode().value_counts()
+        figures['terms'] = px.bar(
+            x=term_counts.index,
+            y=term_counts.values,
+            labels={'x': 'Término', 'y': 'Noticias'}
         )
-        fig.update_layout(showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
-        st.write("DEBUG columnas DF:", df.columns.tolist())
-        # GRÁFICO DE EMOCIONES (ROBUSTO)
-    st.subheader("😊 Distribución de Emociones")
-
-    if 'emotion' not in df.columns:
-        st.warning("No existe la columna 'emotion'. Revisa que se esté creando en perform_search().")
-    else:
-        emotions_clean = df['emotion'].dropna().astype(str).str.upper().str.strip()
 
-        if emotions_clean.empty:
-            st.warning("La columna 'emotion' existe, pero no tiene datos (todo viene vacío/NaN).")
-        else:
+    figures['emotion'] = None
+    if 'emotion' in _df.columns:
+        emotions_clean = _df['emotion'].dropna().astype(str).str.upper().str.strip()
+        if not emotions_clean.empty:
             emotion_counts = emotions_clean.value_counts().reset_index()
             emotion_counts.columns = ["emotion", "count"]
 
@@ -444,18 +461,13 @@ if not df.empty and 'current_keyword' in st.session_state:
                 labels={"count": "Cantidad", "emotion": "Emoción"},
                 title="Emociones Detectadas en las Noticias"
             )
-
             fig.update_layout(showlegend=False, height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            figures['emotion'] = fig
 
-
-    # Timeline
-    st.subheader("📅 Evolución Temporal")
-    df['date'] = pd.to_datetime(df['published'], errors='coerce')
-    df['date_only'] = df['date'].dt.date
-
-    if df['date_only'].notna().any():
-        timeline = df.groupby(['date_only', 'sentiment']).size().unstack(fill_value=0)
+    figures['timeline'] = None
+    date_only = _df['date'].dt.date
+    if date_only.notna().any():
+        timeline = _df.groupby([date_only.rename('date_only'), 'sentiment'], observed=True).size().unstack(fill_value=0)
 
         fig = go.Figure()
         color_map = {'POSITIVO': '#00CC96', 'NEUTRAL': '#636EFA', 'NEGATIVO': '#EF553B'}
@@ -468,12 +480,13 @@ if not df.empty and 'current_keyword' in st.session_state:
                 line=dict(color=color_map.get(sentiment, '#636EFA'))
             ))
         fig.update_layout(xaxis_title="Fecha", yaxis_title="Cantidad")
-        st.plotly_chart(fig, use_container_width=True)
+        figures['timeline'] = fig
 
-    # Lista de noticias
-    st.markdown("---")
-    st.header(f"📋 Noticias sobre '{keyword_searched}'")
+    return figures
 
+@st.fragment
+def render_news_list(df, keyword_searched, keywords_searched, metrics):
+    """Filtros, orden y lista de noticias; al tocar un filtro solo se vuelve a ejecutar esto"""
     # Filtros
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -483,7 +496,7 @@ if not df.empty and 'current_keyword' in st.session_state:
             default=["POSITIVO", "NEGATIVO", "NEUTRAL"]
         )
     with col2:
-        sources_available = df['source'].unique().tolist()
+        sources_available = metrics['source_list']
         sources_filter = st.multiselect(
             "Medio",
             sources_available,
@@ -495,11 +508,19 @@ if not df.empty and 'current_keyword' in st.session_state:
             ["Fecha (reciente)", "Menciones (mayor)", "Relevancia"]
         )
 
+    terms_filter = keywords_searched
+    if len(keywords_searched) > 1:
+        terms_filter = st.multiselect("Término", keywords_searched, default=keywords_searched)
+
     # Aplicar filtros
     filtered_df = df[
         (df['sentiment'].isin(sentiment_filter)) &
         (df['source'].isin(sources_filter))
     ]
+    if len(keywords_searched) > 1:
+        filtered_df = filtered_df[
+            filtered_df['keyword'].str.split(", ").apply(lambda terms: bool(set(terms) & set(terms_filter)))
+        ]
 
     if sort_by == "Fecha (reciente)":
         filtered_df = filtered_df.sort_values('date', ascending=False)
@@ -510,15 +531,38 @@ if not df.empty and 'current_keyword' in st.session_state:
         if 'relevance_score' in filtered_df.columns:
             filtered_df = filtered_df.sort_values('relevance_score', ascending=False)
 
-    st.markdown(f"**Mostrando {len(filtered_df)} de {len(df)} noticias**")
+    # Una entrada por historia: la primera copia que queda tras filtros y orden
+    story_sources = metrics['story_sources']
+    if 'story_id' in filtered_df.columns:
+        filtered_df = filtered_df.drop_duplicates('story_id')
 
-    # Mostrar noticias
-    for idx, row in filtered_df.head(50).iterrows():
-        sentiment_emoji = {"POSITIVO": "😊", "NEGATIVO": "😟", "NEUTRAL": "😐"}
-        emotion_emoji = {"RISA": "😂", "IRA": "😠", "MIEDO": "😨", "TRISTEZA": "😢", 
-                        "DISGUSTO": "🤢", "SORPRESA": "😲", "NEUTRAL": "😐"}
+    # Paginación: solo se arma la página visible, sea cual sea el tamaño del resultado
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("Por página", [10, 20, 50], index=1, key="news_page_size")
+    pages = max(1, -(-len(filtered_df) // page_size))
+    # Si los filtros dejan menos páginas, se vuelve a la última disponible
+    st.session_state.news_page = min(st.session_state.get("news_page", 1), pages)
+    with col2:
+        page_number = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, key="news_page")
+
+    first = (page_number - 1) * page_size
+    page = filtered_df.iloc[first:first + page_size].copy()
+    st.markdown(f"**Mostrando {first + 1 if len(page) else 0}–{first + len(page)} de "
+                f"{len(filtered_df)} historias ({len(df)} noticias)**")
 
-        title_display = row['title'].replace(keyword_searched, f"**{keyword_searched}**")
+    # Resaltado de términos sobre la página completa, sin distinguir mayúsculas
+    page['title_display'] = aggregator.highlight_series(page['title'], keywords_searched)
+    if 'summary' in page.columns:
+        page['summary_display'] = aggregator.highlight_series(page['summary'], keywords_searched)
+
+    sentiment_emoji = {"POSITIVO": "😊", "NEGATIVO": "😟", "NEUTRAL": "😐"}
+    emotion_emoji = {"RISA": "😂", "IRA": "😠", "MIEDO": "😨", "TRISTEZA": "😢", 
+                    "DISGUSTO": "🤢", "SORPRESA": "😲", "NEUTRAL": "😐"}
+
+    # Mostrar noticias
+    for row in page.to_dict('records'):
+        title_display = row['title_display']
 
         matches_info = ""
         if 'keyword_matches' in row and row['keyword_matches'] > 0:
@@ -528,9 +572,13 @@ if not df.empty and 'current_keyword' in st.session_state:
         if 'emotion' in row:
             emotion_info = f" | {emotion_emoji.get(row['emotion'], '😐')} {row['emotion']}"
 
+        coverage_info = ""
+        if row.get('story_size', 1) > 1:
+            coverage_info = f" | 📰 {int(row['story_size'])} copias"
+
         with st.expander(
             f"{sentiment_emoji.get(row['sentiment'], '📰')} {row['source']} | "
-            f"{row['sentiment']}{emotion_info}{matches_info}"
+            f"{row['sentiment']}{emotion_info}{matches_info}{coverage_info}"
         ):
             st.markdown(f"### {title_display}")
 
@@ -539,8 +587,7 @@ if not df.empty and 'current_keyword' in st.session_state:
             with col1:
                 if row.get('summary'):
                     st.markdown("**Resumen:**")
-                    summary_display = row['summary'].replace(keyword_searched, f"**{keyword_searched}**")
-                    st.markdown(summary_display)
+                    st.markdown(row['summary_display'])
 
                 if row.get('summary_ai') and row['summary_ai'] != row.get('summary'):
                     st.markdown("**Análisis IA:**")
@@ -548,8 +595,14 @@ if not df.empty and 'current_keyword' in st.session_state:
 
                 st.markdown(f"🔗 [Leer noticia completa]({row['link']})")
 
+                if row.get('story_size', 1) > 1:
+                    st.caption(f"📡 Publicada por: {', '.join(story_sources[row['story_id']])}")
+
             with col2:
                 st.metric("Sentimiento", row['sentiment'])
+                if pd.notna(row.get('confidence')):
+                    origin = "local" if row.get('classifier') == 'local' else "DeepSeek"
+                    st.caption(f"🎯 Confianza: {row['confidence']:.0%} ({origin})")
                 if 'emotion' in row:
                     st.metric("Emoción", row['emotion'])
                 if 'keyword_matches' in row:
@@ -559,6 +612,162 @@ if not df.empty and 'current_keyword' in st.session_state:
                 if 'category' in row:
                     st.caption(f"🏷️ {row['category']}")
 
+    csv = filtered_df.to_csv(index=False).encode('utf-8')
+    st.download_button(
+        label="📥 Descargar CSV",
+        data=csv,
+        file_name=f"noticias_{keyword_searched}_{datetime.now().strftime('%Y%m%d')}.csv",
+        mime="text/csv",
+        use_container_width=True
+    )
+
+# Ejecutar búsqueda
+if search_button and keyword:
+    keywords = [k.strip() for k in keyword.split(",") if k.strip()] if multi_keyword else [keyword]
+    keyword = ", ".join(keywords)
+    # Lo que la búsqueda (y su evaluación de riesgo) gaste en DeepSeek se acumula aquí
+    st.session_state.search_cost = SearchCost(keyword)
+    # Feeds, llamadas a DeepSeek y etapas de la búsqueda, para el desglose de tiempos
+    st.session_state.search_trace = Trace(keyword)
+    with analyzer.ledger.track(st.session_state.search_cost), tracing(st.session_state.search_trace):
+        st.session_state.current_results = perform_search(
+            keywords, 
+            days_back, 
+            categories_filter,
+            use_google_news,
+            use_bing_news,
+            classifier_mode
+        )
+    st.session_state.current_keyword = keyword
+    st.session_state.current_keywords = keywords
+    # Parámetros con que se obtuvo el resultado: separan el estado del evaluador de riesgo
+    st.session_state.search_scope = (days_back, tuple(categories_filter), use_google_news,
+                                     use_bing_news, min_matches)
+    st.session_state.results_fingerprint = results_fingerprint(st.session_state.current_results)
+
+    # Guardar en historial
+    if not st.session_state.current_results.empty:
+        st.session_state.search_history.append({
+            'keyword': keyword,
+            'keywords': keywords,
+            'count': len(st.session_state.current_results),
+            'timestamp': datetime.now()
+        })
+
+# Mostrar resultados
+df = st.session_state.current_results
+
+if not df.empty and 'current_keyword' in st.session_state:
+    keyword_searched = st.session_state.current_keyword
+    keywords_searched = st.session_state.get('current_keywords', [keyword_searched])
+    fingerprint = st.session_state.get('results_fingerprint') or results_fingerprint(df)
+    with span("ui_stage", stage="metrics"):
+        metrics = results_metrics(fingerprint, df)
+
+    st.markdown("---")
+
+    # Métricas
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("📰 Noticias", metrics['news'])
+    with col2:
+        st.metric("🧵 Historias", metrics['stories'])
+    with col3:
+        st.metric("📡 Fuentes", metrics['sources'])
+    with col4:
+        st.metric("📊 Menciones", metrics['mentions'])
+    with col5:
+        st.metric("📈 Promedio", f"{metrics['avg_mentions']:.1f}")
+
+    # Análisis de Crisis
+    st.markdown("---")
+    st.header(f"🚨 Análisis de Riesgo: '{keyword_searched}'")
+
+    # Si el monitor vigila este keyword y lo evaluó hace poco, se reutiliza su resultado
+    watch = article_store.get_watch(keyword_searched)
+    watch_age = None
+    if watch and watch.get('last_run') and watch.get('risk_level'):
+        watch_age = (pd.Timestamp.now(tz='UTC') - pd.Timestamp(watch['last_run'])).total_seconds()
+    if watch_age is not None and watch_age <= 2 * WATCH_INTERVAL:
+        crisis_data = {
+            'risk_level': watch['risk_level'],
+            'score': watch['risk_score'] or 0,
+            'analysis': watch['analysis'] or '',
+            'negative_news': metrics['negative'],
+            'total_news': len(df)
+        }
+        st.caption(f"🛰️ Evaluación del monitor de hace {int(watch_age // 60)} min "
+                   f"({int(watch['total_articles'] or 0)} noticias en su ventana)")
+    else:
+        # Se reevalúa en cada rerun, pero DeepSeek solo se consulta si cambió el conjunto de noticias
+        with analyzer.ledger.track(st.session_state.get('search_cost')), span("ui_stage", stage="crisis"):
+            crisis_data = crisis_scorer.assess(keyword_searched, df, scope=st.session_state.get('search_scope'))
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        color_map = {"BAJO": "🟢", "MEDIO": "🟡", "ALTO": "🟠", "CRÍTICO": "🔴"}
+        st.metric("Nivel", f"{color_map.get(crisis_data['risk_level'], '⚪')} {crisis_data['risk_level']}")
+    with col2:
+        st.metric("Score", f"{crisis_data.get('score', 0):.1f}%")
+    with col3:
+        negative_pct = (crisis_data.get('negative_news', 0) / len(df) * 100) if len(df) > 0 else 0
+        st.metric("% Negativas", f"{negative_pct:.1f}%")
+    with col4:
+        st.metric("Positivas", metrics['positive'])
+
+    if 'volume_spike' in crisis_data:
+        spike = crisis_data['volume_spike']
+        spike_info = f"{spike:.1f}× el volumen habitual" if spike is not None else "sin línea base aún"
+        st.caption(
+            f"⏱️ Últimas {CRISIS_RECENT_HOURS:.0f} h: {crisis_data['recent_news']} noticias, "
+            f"{crisis_data['negative_ratio_recent']:.0f}% negativas ({spike_info})"
+        )
+
+    if crisis_data.get('analysis'):
+        st.info(f"**💡 Análisis:** {crisis_data['analysis']}")
+
+    # Visualizaciones
+    st.markdown("---")
+    st.header("📊 Análisis de Cobertura")
+    with span("ui_stage", stage="figures"):
+        figures = coverage_figures(fingerprint, df, len(keywords_searched) > 1)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Distribución de Sentimiento")
+        st.plotly_chart(figures['sentiment'], use_container_width=True)
+
+    with col2:
+        st.subheader("Top Medios")
+        st.plotly_chart(figures['sources'], use_container_width=True)
+        st.write("DEBUG columnas DF:", df.columns.tolist())
+        # GRÁFICO DE EMOCIONES (ROBUSTO)
+    if figures['terms'] is not None:
+        st.subheader("🔤 Noticias por Término")
+        st.plotly_chart(figures['terms'], use_container_width=True)
+
+    st.subheader("😊 Distribución de Emociones")
+
+    if 'emotion' not in df.columns:
+        st.warning("No existe la columna 'emotion'. Revisa que se esté creando en perform_search().")
+    elif figures['emotion'] is None:
+        st.warning("La columna 'emotion' existe, pero no tiene datos (todo viene vacío/NaN).")
+    else:
+        st.plotly_chart(figures['emotion'], use_container_width=True)
+
+
+    # Timeline
+    st.subheader("📅 Evolución Temporal")
+    if figures['timeline'] is not None:
+        st.plotly_chart(figures['timeline'], use_container_width=True)
+
+    # Lista de noticias
+    st.markdown("---")
+    st.header(f"📋 Noticias sobre '{keyword_searched}'")
+    with span("ui_stage", stage="news_list"):
+        render_news_list(df, keyword_searched, keywords_searched, metrics)
+
     # Exportar y Resumen
     st.markdown("---")
     st.header("📊 Resumen y Exportación")
@@ -571,28 +780,16 @@ if not df.empty and 'current_keyword' in st.session_state:
         with st.expander("📊 Ver Resumen Completo", expanded=True):
             st.text(summary_text)
 
-    # Botones de descarga
-    col1, col2 = st.columns(2)
-    with col1:
-        csv = filtered_df.to_csv(index=False).encode('utf-8')
+    # Descarga del resumen (el CSV de la vista filtrada está junto a la lista)
+    if hasattr(st.session_state, 'summary_text'):
         st.download_button(
-            label="📥 Descargar CSV",
-            data=csv,
-            file_name=f"noticias_{keyword_searched}_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
+            label="⬇️ Descargar Resumen",
+            data=st.session_state.summary_text,
+            file_name=f"resumen_{keyword_searched}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            mime="text/plain",
             use_container_width=True
         )
 
-    with col2:
-        if hasattr(st.session_state, 'summary_text'):
-            st.download_button(
-                label="⬇️ Descargar Resumen",
-                data=st.session_state.summary_text,
-                file_name=f"resumen_{keyword_searched}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
-
     # Sección de envío por email
     if hasattr(st.session_state, 'summary_text'):
         st.markdown("---")
@@ -622,7 +819,9 @@ if not df.empty and 'current_keyword' in st.session_state:
                     success, message = send_email_summary(
                         recipient_email,
                         subject,
-                        st.session_state.summary_text
+                        st.session_state.summary_text,
+                        EMAIL_SENDER,
+                        EMAIL_PASSWORD
                     )
                     if success:
                         st.success(message)
@@ -651,6 +850,47 @@ else:
         st.markdown("**🌍 Social**")
         st.markdown("- Sequía\n- Educación\n- Salud")
 
+# Desglose de tiempos: la última búsqueda (feeds, DeepSeek, etapas) y esta ejecución del dashboard
+if show_timings:
+    st.markdown("---")
+    st.subheader("⏱️ Desglose de tiempos")
+    search_trace = st.session_state.get('search_trace')
+    if search_trace is not None:
+        st.markdown(f"**Búsqueda '{search_trace.label}'**: {search_trace.wall_time():.2f} s")
+        st.dataframe(pd.DataFrame(search_trace.breakdown()), use_container_width=True, hide_index=True)
+        st.caption("Feeds y llamadas a DeepSeek corren en paralelo: la suma de los spans puede superar el total")
+    st.markdown(f"**Esta ejecución del dashboard**: {run_trace.wall_time():.2f} s")
+    st.dataframe(pd.DataFrame(run_trace.breakdown()), use_container_width=True, hide_index=True)
+
+# Uso de DeepSeek: al final del script para incluir lo que gastó esta ejecución
+st.sidebar.markdown("---")
+st.sidebar.subheader("💰 Uso de DeepSeek")
+today_usage = analyzer.ledger.day_totals()
+col1, col2 = st.sidebar.columns(2)
+col1.metric("Hoy (USD)", f"${today_usage['cost']:.4f}")
+col2.metric("Llamadas", today_usage['calls'])
+st.sidebar.caption(
+    f"{today_usage['prompt_tokens'] + today_usage['completion_tokens']:,} tokens hoy "
+    f"({today_usage['cached_tokens']:,} de entrada en caché de DeepSeek)"
+)
+search_cost = st.session_state.get('search_cost')
+if search_cost is not None:
+    if search_cost.totals['calls']:
+        st.sidebar.caption(
+            f"Última búsqueda ('{search_cost.label}'): {search_cost.totals['calls']} llamadas, "
+            f"{search_cost.tokens:,} tokens, ${search_cost.totals['cost']:.4f}"
+        )
+    else:
+        st.sidebar.caption(f"Última búsqueda ('{search_cost.label}'): sin llamadas a DeepSeek")
+    if search_cost.runaway:
+        st.sidebar.warning(f"🔥 La última búsqueda superó {analyzer.ledger.search_token_alert:,} tokens")
+if today_usage['by_operation']:
+    with st.sidebar.expander("Desglose por operación"):
+        st.dataframe(
+            pd.DataFrame.from_dict(today_usage['by_operation'], orient='index'),
+            use_container_width=True
+        )
+
 # Footer
 st.markdown("---")
 st.caption(
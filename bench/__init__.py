@@ -0,0 +1 @@
+"""Benchmarks sin red: feeds locales, DeepSeek simulado y el harness (python -m bench.run)"""
@@ -0,0 +1,253 @@
+"""Servidor local de feeds para el benchmark: reproduce un corpus grabado o feeds sintéticos
+
+    python -m bench.feed_server record                 # graba los feeds configurados en bench/corpus
+    python -m bench.feed_server serve --entries 10000  # sirve corpus + sintéticos hasta Ctrl-C
+
+Cada medio escucha en su propio puerto: el limitador de cortesía (DomainRateLimiter)
+separa por host:puerto, igual que en producción separa por dominio.
+"""
+import argparse
+import email.utils
+import json
+import random
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from config.news_sources import CHILEAN_SOURCES, INTERNATIONAL_SOURCES
+
+DEFAULT_CORPUS_DIR = "bench/corpus"
+
+# Temas con su frecuencia relativa: son también las consultas del benchmark de matching
+TOPICS = [
+    ("sequía", 6), ("reforma de pensiones", 4), ("inflación", 5), ("minería", 4), ("educación", 4),
+    ("salud", 5), ("Banco Central", 3), ("Congreso", 5), ("incendios forestales", 3), ("desempleo", 3),
+    ("litio", 2), ("seguridad", 5), ("Gabriel Boric", 3), ("cobre", 3), ("vivienda", 2),
+]
+_SUBJECTS = ["el Gobierno", "los alcaldes", "la oposición", "expertos", "gremios", "vecinos",
+             "el Ministerio", "la Cámara", "sindicatos", "académicos", "empresarios", "la Corte Suprema"]
+_VERBS = ["advierten", "anuncian", "cuestionan", "proponen", "rechazan", "evalúan", "piden", "confirman"]
+_OBJECTS = ["nuevas medidas", "un plan de emergencia", "cambios urgentes", "recursos adicionales",
+            "una mesa de trabajo", "un informe preliminar", "sanciones", "un acuerdo regional"]
+_PLACES = ["Santiago", "Valparaíso", "Atacama", "Biobío", "La Araucanía", "Antofagasta", "Los Lagos", "Maule"]
+_NOUNS = ["familias", "comunas", "proyectos", "escuelas", "hospitales", "empresas", "hectáreas", "viviendas",
+          "trabajadores", "camiones", "pozos", "faenas", "consultorios", "denuncias", "becas", "créditos"]
+_ADJECTIVES = ["afectadas", "nuevos", "rurales", "públicos", "privadas", "urgentes", "pendientes", "regionales",
+               "evaluados", "comprometidos", "vulnerables", "detenidos"]
+# Sílabas para nombres propios inventados: hacen única cada historia sin cambiar su forma
+_SYLLABLES = ["ca", "ro", "mi", "te", "lu", "sa", "ne", "vo", "ri", "da", "go", "pe", "la", "fi", "zu", "mo"]
+
+
+def source_slug(name: str) -> str:
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-")
+
+
+def configured_sources() -> List[Tuple[str, Dict]]:
+    """(categoría, fuente) de los feeds RSS configurados"""
+    return [
+        (category, source)
+        for sources in (CHILEAN_SOURCES, INTERNATIONAL_SOURCES)
+        for category, source_list in sources.items()
+        for source in source_list
+        if source['type'] == 'rss'
+    ]
+
+
+def _name(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def _story(rng: random.Random) -> Dict:
+    weights = [w for _, w in TOPICS]
+    topics = rng.choices([t for t, _ in TOPICS], weights=weights, k=rng.choice((1, 1, 2)))
+    place = rng.choice(_PLACES)
+    name = f"{_name(rng)} {_name(rng)}"
+    title = (f"{topics[0].capitalize()}: {name} {rng.choice(_VERBS)} {rng.randint(2, 999)} "
+             f"{rng.choice(_NOUNS)} {rng.choice(_ADJECTIVES)} en {place}")
+    summary = (f"<p>En <b>{place}</b>, {name} y {rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} "
+               f"{rng.choice(_OBJECTS)} ante la situación de {' y '.join(topics)}.</p>"
+               f"<p>Las autoridades de {place} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} "
+               f"<a href=\"https://example.cl/mas\">Leer más</a></p>")
+    return {"title": title, "summary": summary}
+
+
+def _variant(story: Dict, rng: random.Random) -> Dict:
+    """Otra versión de la misma historia, como la publicaría otro medio"""
+    words = story["title"].split()
+    if len(words) > 6:
+        words.pop(rng.randrange(1, len(words) - 1))
+    prefix = rng.choice(["", "", "Última hora: ", "Video: ", "EN VIVO | "])
+    return {"title": prefix + " ".join(words), "summary": story["summary"]}
+
+
+def synthetic_corpus(sources: List[Tuple[str, Dict]], entries: int, seed: int = 7,
+                     shared_ratio: float = 0.3, days: float = 7) -> Dict[str, bytes]:
+    """{slug: RSS} con `entries` entradas repartidas entre las fuentes
+
+    Una fracción shared_ratio de las entradas son otras versiones de historias ya
+    publicadas por otro medio, para que la agrupación de historias tenga trabajo.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    per_source = max(1, entries // max(1, len(sources)))
+    stories: List[Dict] = []
+    feeds = {}
+    for _, source in sources:
+        slug = source_slug(source['name'])
+        items = []
+        for i in range(per_source):
+            if stories and rng.random() < shared_ratio:
+                item = _variant(rng.choice(stories), rng)
+            else:
+                item = _story(rng)
+                stories.append(item)
+            published = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            items.append(
+                "<item>"
+                f"<title>{escape(item['title'])}</title>"
+                f"<link>https://{slug}.example.cl/noticia/{i}</link>"
+                f"<guid>https://{slug}.example.cl/noticia/{i}</guid>"
+                f"<description>{escape(item['summary'])}</description>"
+                f"<pubDate>{email.utils.format_datetime(published)}</pubDate>"
+                "</item>"
+            )
+        feeds[slug] = (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>{escape(source['name'])}</title><link>https://{slug}.example.cl</link>"
+            + "".join(items) + "</channel></rss>"
+        ).encode("utf-8")
+    return feeds
+
+
+def load_corpus(path: str = DEFAULT_CORPUS_DIR) -> Dict[str, bytes]:
+    """{slug: cuerpo grabado}; vacío si no hay corpus"""
+    corpus = Path(path)
+    if not corpus.is_dir():
+        return {}
+    return {feed.stem: feed.read_bytes() for feed in sorted(corpus.glob("*.xml"))}
+
+
+def record_corpus(path: str = DEFAULT_CORPUS_DIR, timeout: float = 15) -> int:
+    """Descarga una vez los feeds configurados (requiere red); devuelve cuántos se grabaron"""
+    import requests
+
+    Path(path).mkdir(parents=True, exist_ok=True)
+    session = requests.Session()
+    session.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; NewsMonitorBot/1.0)'})
+    recorded = 0
+    for _, source in configured_sources():
+        try:
+            response = session.get(source['url'], timeout=timeout)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Error en {source['name']}: {e}")
+            continue
+        (Path(path) / f"{source_slug(source['name'])}.xml").write_bytes(response.content)
+        print(f"📼 {source['name']}: {len(response.content)} bytes")
+        recorded += 1
+    (Path(path) / "recorded_at.json").write_text(
+        json.dumps({"recorded_at": datetime.now(timezone.utc).isoformat()}), encoding="utf-8")
+    return recorded
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    # Sin keep-alive por defecto: el cliente abre una conexión por feed, como con los medios
+    def do_GET(self):
+        body = self.server.body
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FeedServer:
+    """Un puerto por medio en 127.0.0.1, cada uno sirviendo su feed desde memoria"""
+
+    def __init__(self, feeds: Dict[str, bytes], latency: float = 0.0):
+        self.feeds = feeds
+        self.latency = latency
+        self._servers: Dict[str, ThreadingHTTPServer] = {}
+
+    def start(self) -> "FeedServer":
+        for slug, body in self.feeds.items():
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+            server.daemon_threads = True
+            server.body = body
+            server.latency = self.latency
+            threading.Thread(target=server.serve_forever, name=f"feed-{slug}", daemon=True).start()
+            self._servers[slug] = server
+        return self
+
+    def url(self, slug: str) -> str:
+        return f"http://127.0.0.1:{self._servers[slug].server_port}/{slug}.xml"
+
+    def sources(self, configured: Optional[List[Tuple[str, Dict]]] = None) -> Dict[str, List[Dict]]:
+        """Las fuentes configuradas, con sus URLs apuntando a este servidor"""
+        sources: Dict[str, List[Dict]] = {}
+        for category, source in configured or configured_sources():
+            slug = source_slug(source['name'])
+            if slug in self._servers:
+                sources.setdefault(category, []).append({**source, 'url': self.url(slug)})
+        return sources
+
+    def stop(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+        self._servers.clear()
+
+
+def build_feeds(entries: int, corpus_dir: Optional[str] = DEFAULT_CORPUS_DIR, seed: int = 7) -> Dict[str, bytes]:
+    """Corpus grabado donde exista; el resto de las fuentes, sintéticas hasta ~entries en total"""
+    sources = configured_sources()
+    recorded = load_corpus(corpus_dir) if corpus_dir else {}
+    missing = [(c, s) for c, s in sources if source_slug(s['name']) not in recorded]
+    feeds = {slug: body for slug, body in recorded.items()
+             if slug in {source_slug(s['name']) for _, s in sources}}
+    if missing and entries > 0:
+        share = entries * len(missing) // len(sources)
+        feeds.update(synthetic_corpus(missing, share, seed=seed))
+    return feeds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feeds locales para el benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="graba los feeds configurados (requiere red)")
+    record.add_argument("--out", default=DEFAULT_CORPUS_DIR)
+    serve = sub.add_parser("serve", help="sirve corpus grabado + feeds sintéticos")
+    serve.add_argument("--corpus", default=DEFAULT_CORPUS_DIR)
+    serve.add_argument("--entries", type=int, default=10000)
+    serve.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        print(f"📼 {record_corpus(args.out)} feeds grabados en {args.out}")
+        return
+
+    server = FeedServer(build_feeds(args.entries, args.corpus), args.latency_ms / 1000).start()
+    for category, sources in server.sources().items():
+        for source in sources:
+            print(f"{category:10} {source['name']:20} {source['url']}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""DeepSeek simulado (API compatible con OpenAI) con latencia y tasa de errores configurables
+
+    python -m bench.mock_deepseek --port 8089 --latency-ms 400 --error-rate 0.05
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8089 DEEPSEEK_API_KEY=x streamlit run app.py
+
+Responde /chat/completions según el prompt: JSON de clasificación para los lotes,
+un nivel de riesgo para la evaluación de crisis y texto libre para el resto. Los
+errores se reparten entre 429 y 503, que DeepSeekAnalyzer reintenta.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+SENTIMENTS = ["POSITIVO", "NEGATIVO", "NEUTRAL"]
+EMOTIONS = ["RISA", "IRA", "MIEDO", "TRISTEZA", "DISGUSTO", "SORPRESA", "NEUTRAL"]
+RISK_LEVELS = ["BAJO", "MEDIO", "ALTO", "CRÍTICO"]
+
+_ITEM_RE = re.compile(r"^\[(\d+)\] ", re.M)
+
+
+def _tokens(text: str) -> int:
+    # Misma estimación que DeepSeekAnalyzer (~3 caracteres por token)
+    return len(text) // 3 + 4
+
+
+class MockDeepSeek:
+    """Servidor HTTP en un hilo de fondo; cuenta requests y errores inyectados"""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.5, error_rate: float = 0.0,
+                 seed: Optional[int] = None, port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.port = port
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def _draw(self) -> tuple:
+        """(segundos de latencia, ¿falla?) del próximo request"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return max(0.0, delay), failed, self._rng.random()
+
+    def _content(self, messages, roll: float) -> str:
+        user = messages[-1].get("content", "") if messages else ""
+        if user.startswith("Clasifica"):
+            rng = random.Random(user)
+            items = [{"id": int(i), "sentimiento": rng.choice(SENTIMENTS), "emocion": rng.choice(EMOTIONS),
+                      "confianza": round(rng.uniform(0.5, 1.0), 2)} for i in _ITEM_RE.findall(user)]
+            return json.dumps({"items": items}, ensure_ascii=False)
+        if user.startswith("Evalúa el riesgo"):
+            level = RISK_LEVELS[int(roll * len(RISK_LEVELS))]
+            return f"{level}. Respuesta simulada por el servidor de benchmark."
+        return "Resumen simulado: la noticia describe hechos recientes en tres oraciones breves."
+
+    def completion(self, payload: Dict, roll: float) -> Dict:
+        messages = payload.get("messages", [])
+        content = self._content(messages, roll)
+        prompt_tokens = sum(_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = _tokens(content)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "deepseek-chat"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "logprobs": None,
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_cache_hit_tokens": 0,
+                "prompt_cache_miss_tokens": prompt_tokens
+            }
+        }
+
+    def start(self) -> "MockDeepSeek":
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body: Dict, headers: Optional[Dict] = None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._reply(404, {"error": {"message": "not found"}})
+                    return
+                delay, failed, roll = mock._draw()
+                time.sleep(delay)
+                if failed:
+                    if roll < 0.5:
+                        self._reply(429, {"error": {"message": "Rate limit (simulado)"}}, {"Retry-After": "0"})
+                    else:
+                        self._reply(503, {"error": {"message": "Server overloaded (simulado)"}})
+                    return
+                self._reply(200, mock.completion(payload, roll))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-deepseek", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DeepSeek simulado para pruebas de rendimiento sin red")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter", type=float, default=0.5, help="variación relativa de la latencia (0-1)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de requests que responden 429/503")
+    args = parser.parse_args(argv)
+
+    mock = MockDeepSeek(args.latency_ms / 1000, args.jitter, args.error_rate, port=args.port).start()
+    print(f"🤖 DeepSeek simulado en {mock.base_url} (DEEPSEEK_BASE_URL)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Benchmark sin red: ingesta, matching, dedup, análisis y post-proceso de DataFrames
+
+    python -m bench.run                                   # 10.000 entradas sintéticas, DeepSeek simulado
+    python -m bench.run --entries 50000 --rounds 5 --json bench_output.json
+    python -m bench.run --llm-latency-ms 800 --llm-error-rate 0.1 --analyze 1000
+
+Los feeds salen de bench/corpus (grabado con `python -m bench.feed_server record`) o
+son sintéticos; DeepSeek es bench.mock_deepseek. Cachés, bases y logs van a un
+directorio temporal: nada toca data/, cache/ ni la API real. La configuración de
+rendimiento (FETCH_MAX_WORKERS, LLM_MAX_RPS, CLASSIFY_BATCH_SIZE, ...) se toma del
+entorno como en producción, para comparar ajustes.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from bench.feed_server import DEFAULT_CORPUS_DIR, TOPICS, FeedServer, build_feeds, configured_sources
+from bench.mock_deepseek import MockDeepSeek
+
+# Consultas del matching: los temas del corpus sintético más la sintaxis del índice
+QUERIES = [topic for topic, _ in TOPICS] + [
+    '"reforma de pensiones"', "sequía OR incendios", "minería -litio", "educ*", "Banco AND Central",
+]
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p90/p99/máx en milisegundos"""
+    if not samples:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.asarray(samples) * 1000
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99), "max_ms": float(values.max())}
+
+
+class Report:
+    """Un renglón por (etapa, operación): throughput sobre el tiempo de pared y latencias por muestra"""
+
+    def __init__(self):
+        self.rows: List[Dict] = []
+
+    def add(self, stage: str, operation: str, samples: List[float], items: int, wall: float, **extra):
+        self.rows.append({
+            "stage": stage,
+            "operation": operation,
+            "samples": len(samples),
+            "items": items,
+            "wall_s": wall,
+            "items_per_s": items / wall if wall > 0 else None,
+            **percentiles(samples),
+            **extra
+        })
+
+    def print(self):
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else "-"
+
+        header = f"{'etapa':12} {'operación':28} {'n':>6} {'ítems':>8} {'ítems/s':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'máx ms':>9}"
+        print(header)
+        print("-" * len(header))
+        for row in self.rows:
+            print(f"{row['stage']:12} {row['operation']:28} {row['samples']:>6} {row['items']:>8} "
+                  f"{fmt(row['items_per_s'], '>10.1f')} {fmt(row['p50_ms'], '>9.2f')} {fmt(row['p90_ms'], '>9.2f')} "
+                  f"{fmt(row['p99_ms'], '>9.2f')} {fmt(row['max_ms'], '>9.2f')}")
+
+
+def _span_durations(trace, name: str) -> List[float]:
+    return [s["duration"] for s in trace.spans if s["name"] == name]
+
+
+def _configure(workdir: str, mock: MockDeepSeek, entries_per_feed: int):
+    """Rutas y endpoint del benchmark; debe correr antes de importar config.settings"""
+    os.environ.update({
+        "DEEPSEEK_API_KEY": "bench",
+        "DEEPSEEK_BASE_URL": mock.base_url,
+        "FEED_CACHE_DIR": os.path.join(workdir, "feeds"),
+        "ANALYSIS_CACHE_PATH": os.path.join(workdir, "analysis.db"),
+        "ARTICLE_DB_PATH": os.path.join(workdir, "articles.db"),
+        "URL_CACHE_PATH": os.path.join(workdir, "urls.db"),
+        "LLM_LEDGER_PATH": os.path.join(workdir, "llm_usage.db"),
+        "LOCAL_MODEL_PATH": os.path.join(workdir, "local_model.npz"),
+        "TELEMETRY_LOG_PATH": os.path.join(workdir, "logs", "telemetry.jsonl"),
+        "METRICS_PORT": "0",
+        # Cada ronda descarga de nuevo y no se resuelven redirecciones por red
+        "FEED_CACHE_FRESH_TTL": "0",
+        "URL_RESOLVE_NETWORK": "0",
+    })
+    # Que el store retenga todo el corpus (salvo que se quiera medir con el límite real)
+    os.environ.setdefault("ENTRY_STORE_MAX_PER_SOURCE", str(max(500, entries_per_feed * 2)))
+
+
+def run(args) -> Report:
+    feeds = build_feeds(args.entries, None if args.no_corpus else args.corpus, seed=args.seed)
+    feed_server = FeedServer(feeds, args.feed_latency_ms / 1000).start()
+    mock = MockDeepSeek(args.llm_latency_ms / 1000, args.llm_jitter, args.llm_error_rate, seed=args.seed).start()
+    workdir = tempfile.mkdtemp(prefix="news-bench-")
+    _configure(workdir, mock, args.entries // max(1, len(feeds)))
+
+    # Importados después de configurar el entorno: config.settings lo lee al importarse
+    from modules.analysis_pipeline import AnalysisPipeline, apply_update
+    from modules.article_store import ARTICLE_COLUMNS, ArticleStore, compact_articles
+    from modules.deepseek_analyzer import DeepSeekAnalyzer
+    from modules.free_news_aggregator import FreeNewsAggregator
+    from modules.local_classifier import LocalClassifier
+    from modules.story_clusters import CLASSIFICATION_COLUMNS, cluster_stories, spread_story_labels
+    from modules.telemetry import METRICS, Trace, tracing
+
+    report = Report()
+    sources = feed_server.sources()
+    print(f"🧪 {len(feeds)} feeds locales ({sum(len(b) for b in feeds.values()) / 1e6:.1f} MB), "
+          f"{args.rounds} rondas, trabajo en {workdir}")
+
+    try:
+        # --- Ingesta: descarga + parseo + indexado de todos los feeds directos ---
+        aggregator = FreeNewsAggregator()
+        jobs = aggregator._rss_jobs(sources)
+        aggregator.ingestor.sources = jobs
+        for round_no in range(args.rounds):
+            trace = Trace("ingesta")
+            parsed_before = METRICS.total("feed_entries_total")
+            started = time.perf_counter()
+            with tracing(trace):
+                added = aggregator.ingestor.refresh()
+            wall = time.perf_counter() - started
+            parsed = METRICS.total("feed_entries_total") - parsed_before
+            operation = "ingesta en frío" if round_no == 0 else f"refresco #{round_no}"
+            report.add("ingestion", operation, _span_durations(trace, "feed_fetch"), int(parsed), wall,
+                       new_entries=added)
+            if round_no == 0:
+                report.add("ingestion", "parseo por feed", _span_durations(trace, "feed_parse"), int(parsed),
+                           sum(_span_durations(trace, "feed_parse")))
+                report.add("ingestion", "indexado por feed", _span_durations(trace, "feed_index"), added,
+                           sum(_span_durations(trace, "feed_index")))
+        print(f"📥 {len(aggregator.store)} entradas en memoria")
+
+        # --- Matching: consultas al índice invertido y búsqueda completa de varios términos ---
+        samples = []
+        started = time.perf_counter()
+        matches = 0
+        for _ in range(args.rounds):
+            for query in QUERIES:
+                t0 = time.perf_counter()
+                matches += sum(1 for _ in aggregator.store.search_many(jobs, [query]))
+                samples.append(time.perf_counter() - t0)
+        wall = time.perf_counter() - started
+        report.add("matching", "consulta al índice", samples, len(aggregator.store) * len(samples), wall,
+                   matches_per_round=matches // args.rounds)
+
+        samples = []
+        topics = [topic for topic, _ in TOPICS]
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            results = aggregator.aggregate_many(topics, sources, use_google_news=False)
+            samples.append(time.perf_counter() - t0)
+        report.add("matching", f"aggregate_many ({len(topics)} términos)", samples, len(results) * len(samples),
+                   sum(samples))
+
+        # --- Dedup: link canónico + duplicados exactos, y agrupación de historias (MinHash) ---
+        records = [{
+            'title': e.title, 'link': e.link, 'published': e.published, 'published_dt': e.published_dt,
+            'summary': e.summary, 'source': e.source, 'category': e.category,
+            'keyword': "", 'keyword_matches': 1
+        } for e in aggregator.store.iter_entries(jobs)]
+        samples, cluster_samples = [], []
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            frame = aggregator._to_frame(records, set())
+            samples.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            clustered = cluster_stories(frame.reset_index(drop=True))
+            cluster_samples.append(time.perf_counter() - t0)
+        report.add("dedup", "link canónico + exactos", samples, len(records) * len(samples), sum(samples))
+        report.add("dedup", "historias (MinHash)", cluster_samples, len(clustered) * len(cluster_samples),
+                   sum(cluster_samples), stories=int(clustered['story_id'].nunique()))
+
+        # --- Análisis: pipeline completo contra el DeepSeek simulado ---
+        analyzer = DeepSeekAnalyzer()
+        pipeline = AnalysisPipeline(analyzer, LocalClassifier())
+        df = clustered[clustered['is_representative']].head(args.analyze).reset_index(drop=True)
+        for col in CLASSIFICATION_COLUMNS + ['summary_ai']:
+            df[col] = None
+        articles = df[['title', 'summary']].to_dict('records')
+        retries_before = METRICS.total("llm_retries_total")
+        trace = Trace("análisis")
+        started = time.perf_counter()
+        with tracing(trace):
+            outcome = pipeline.run(articles, classify=list(df.index), summarize=list(df.index[:5]), mode=args.mode)
+        wall = time.perf_counter() - started
+        retries = METRICS.total("llm_retries_total") - retries_before
+        report.add("analysis", f"pipeline ({args.mode})", [wall], len(df), wall,
+                   failed=len(outcome.get('failed', [])), escalated=outcome['escalated'], retries=int(retries))
+        report.add("analysis", "request a DeepSeek", _span_durations(trace, "llm_request"),
+                   len(_span_durations(trace, "llm_request")), wall)
+        report.add("analysis", "llamada (esperas+reintentos)", _span_durations(trace, "llm_call"),
+                   len(_span_durations(trace, "llm_call")), wall)
+        df = apply_update(df, outcome)
+
+        t0 = time.perf_counter()
+        pipeline.run(articles, classify=list(df.index), summarize=[], mode=args.mode)
+        wall = time.perf_counter() - t0
+        report.add("analysis", "pipeline (todo en caché)", [wall], len(df), wall)
+
+        # --- Post-proceso: lo que hace perform_search con el resultado ---
+        result = clustered.copy()
+        labels = df.set_index('story_id')[CLASSIFICATION_COLUMNS]
+        for col in CLASSIFICATION_COLUMNS:
+            result[col] = result['story_id'].map(labels[col]).where(result['is_representative'])
+        result['summary_ai'] = None
+        store = ArticleStore()
+        steps = {"spread_story_labels": [], "compact_articles": [], "ArticleStore.upsert": [], "ArticleStore.search": []}
+        for _ in range(args.rounds):
+            frame = result.copy()
+            t0 = time.perf_counter()
+            frame = spread_story_labels(frame)
+            steps["spread_story_labels"].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            store.upsert(frame[[c for c in ARTICLE_COLUMNS if c in frame.columns]])
+            steps["ArticleStore.upsert"].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            compact_articles(frame)
+            steps["compact_articles"].append(time.perf_counter() - t0)
+            for topic in topics:
+                t0 = time.perf_counter()
+                store.search(topic)
+                steps["ArticleStore.search"].append(time.perf_counter() - t0)
+        for operation, samples in steps.items():
+            # Las búsquedas cuentan consultas; el resto, filas procesadas
+            items = len(samples) if operation == "ArticleStore.search" else len(result) * args.rounds
+            report.add("postprocess", operation, samples, items, sum(samples))
+
+        print(f"🤖 DeepSeek simulado: {mock.requests} requests, {mock.errors} errores inyectados; "
+              f"costo registrado ${analyzer.ledger.day_totals()['cost']:.4f}")
+    finally:
+        feed_server.stop()
+        mock.stop()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sin red con feeds locales y DeepSeek simulado")
+    parser.add_argument("--entries", type=int, default=10000, help="entradas sintéticas en total (feeds sin corpus)")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR, help="feeds grabados con bench.feed_server record")
+    parser.add_argument("--no-corpus", action="store_true", help="solo feeds sintéticos")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--feed-latency-ms", type=float, default=0.0, help="latencia de cada feed local")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.02)
+    parser.add_argument("--analyze", type=int, default=400, help="historias que se envían al pipeline de análisis")
+    parser.add_argument("--mode", default="llm", choices=["llm", "hybrid", "local"])
+    parser.add_argument("--json", help="guarda los resultados en este archivo (para comparar corridas)")
+    parser.add_argument("--keep-workdir", action="store_true", help="conserva cachés, bases y logs de la corrida")
+    args = parser.parse_args(argv)
+
+    if not configured_sources():
+        raise SystemExit("No hay fuentes RSS configuradas")
+    report = run(args)
+    print()
+    report.print()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": report.rows}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Parámetros de rendimiento y red (sobrescribibles por variables de entorno)
+import os
+
+# Descarga concurrente de feeds
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "12"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", "4"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+
+# Cortesía por dominio: segundos mínimos entre dos requests al mismo host
+DOMAIN_MIN_INTERVAL = float(os.getenv("DOMAIN_MIN_INTERVAL", "0.3"))
+
+# Caché de feeds (volumen ./cache de docker-compose)
+FEED_CACHE_DIR = os.getenv("FEED_CACHE_DIR", "cache/feeds")
+# Dentro de este plazo se reutiliza el feed sin tocar la red
+FEED_CACHE_FRESH_TTL = float(os.getenv("FEED_CACHE_FRESH_TTL", "120"))
+# Pasado este plazo la entrada se elimina del disco
+FEED_CACHE_MAX_AGE = float(os.getenv("FEED_CACHE_MAX_AGE", str(24 * 3600)))
+FEED_CACHE_MAX_BYTES = int(os.getenv("FEED_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Ingesta en segundo plano de los feeds directos
+INGEST_INTERVAL = float(os.getenv("INGEST_INTERVAL", "300"))
+# Entradas retenidas por fuente (los feeds solo exponen las últimas; aquí se acumulan)
+ENTRY_STORE_MAX_PER_SOURCE = int(os.getenv("ENTRY_STORE_MAX_PER_SOURCE", "500"))
+
+# Almacén persistente de artículos (volumen ./data de docker-compose)
+ARTICLE_DB_PATH = os.getenv("ARTICLE_DB_PATH", "data/articles.db")
+
+# Caché de resultados de DeepSeek (sentimiento, emoción, resúmenes)
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "cache/analysis.db")
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", str(30 * 24 * 3600)))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "100000"))
+
+# Clasificación por lotes: artículos por request y reintentos de ítems inválidos
+CLASSIFY_BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", "20"))
+CLASSIFY_MAX_RETRIES = int(os.getenv("CLASSIFY_MAX_RETRIES", "2"))
+
+# Endpoint de DeepSeek (compatible con OpenAI); el benchmark lo apunta a un servidor simulado
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+
+# Presupuesto y reintentos del LLM
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "4"))
+LLM_MAX_RPS = float(os.getenv("LLM_MAX_RPS", "5"))
+LLM_MAX_TPM = float(os.getenv("LLM_MAX_TPM", "300000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+
+# Tokens de entrada (estimados) que puede ocupar el texto variable de cada prompt
+SUMMARY_INPUT_TOKENS = int(os.getenv("SUMMARY_INPUT_TOKENS", "600"))
+CRISIS_INPUT_TOKENS = int(os.getenv("CRISIS_INPUT_TOKENS", "500"))
+CONNECTIONS_INPUT_TOKENS = int(os.getenv("CONNECTIONS_INPUT_TOKENS", "400"))
+
+# Registro de uso del LLM: precios en USD por millón de tokens (deepseek-chat)
+LLM_LEDGER_PATH = os.getenv("LLM_LEDGER_PATH", "data/llm_usage.db")
+LLM_PRICE_INPUT = float(os.getenv("LLM_PRICE_INPUT", "0.28"))
+LLM_PRICE_INPUT_CACHED = float(os.getenv("LLM_PRICE_INPUT_CACHED", "0.028"))
+LLM_PRICE_OUTPUT = float(os.getenv("LLM_PRICE_OUTPUT", "0.42"))
+# Una búsqueda que pasa de estos tokens se avisa en el log y en el dashboard (0 = sin aviso)
+LLM_SEARCH_TOKEN_ALERT = int(os.getenv("LLM_SEARCH_TOKEN_ALERT", "50000"))
+
+# Clasificador local (léxico + modelo lineal) y modo por defecto: "local", "llm" o "hybrid"
+CLASSIFIER_MODE = os.getenv("CLASSIFIER_MODE", "hybrid")
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "data/local_model.npz")
+# En modo híbrido, bajo esta probabilidad la noticia se escala a DeepSeek
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.75"))
+
+# Agrupación de copias de una misma noticia: similitud Jaccard mínima (estimada por MinHash)
+STORY_SIMILARITY_THRESHOLD = float(os.getenv("STORY_SIMILARITY_THRESHOLD", "0.5"))
+
+# Resolución de links de Google/Bing a la URL del medio (caché persistente)
+URL_CACHE_PATH = os.getenv("URL_CACHE_PATH", "cache/urls.db")
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", str(90 * 24 * 3600)))
+# Lo que no se pudo desenvolver (aún es link de Google/Bing) se reintenta pasado este plazo
+URL_CACHE_FAILURE_TTL = float(os.getenv("URL_CACHE_FAILURE_TTL", "3600"))
+# Seguir redirecciones por red es opcional: los ids CBMi actuales de Google News no redirigen
+# por HTTP. Sin red solo se desenvuelve Bing y el formato antiguo de Google
+URL_RESOLVE_NETWORK = os.getenv("URL_RESOLVE_NETWORK", "0") == "1"
+URL_RESOLVE_TIMEOUT = float(os.getenv("URL_RESOLVE_TIMEOUT", "3"))
+URL_RESOLVE_MAX_WORKERS = int(os.getenv("URL_RESOLVE_MAX_WORKERS", "8"))
+
+# Bajadas de los feeds: se limpian de HTML y se recortan a este largo (tokens estimados) al ingerir
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+
+# Búsqueda de varios términos: cuántos se combinan con OR en una misma consulta a Google/Bing
+NEWS_QUERY_OR_TERMS = int(os.getenv("NEWS_QUERY_OR_TERMS", "5"))
+
+# Zona horaria en que se muestran las fechas (se guardan siempre en UTC)
+DISPLAY_TIMEZONE = os.getenv("DISPLAY_TIMEZONE", "America/Santiago")
+
+# Señales de crisis: lapso reciente vs. línea base, y cuántas veces el volumen normal es un pico
+CRISIS_RECENT_HOURS = float(os.getenv("CRISIS_RECENT_HOURS", "24"))
+CRISIS_BASELINE_DAYS = float(os.getenv("CRISIS_BASELINE_DAYS", "7"))
+CRISIS_SPIKE_FACTOR = float(os.getenv("CRISIS_SPIKE_FACTOR", "2.0"))
+# Búsquedas (keyword + filtros) cuyas estadísticas y última evaluación se conservan en memoria
+CRISIS_MAX_KEYWORDS = int(os.getenv("CRISIS_MAX_KEYWORDS", "64"))
+
+# Monitor en segundo plano (python -m modules.monitor)
+WATCHLIST_PATH = os.getenv("WATCHLIST_PATH", "config/watchlist.json")
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "600"))
+# Ventana de noticias que evalúa cada vigilancia
+WATCH_WINDOW_DAYS = float(os.getenv("WATCH_WINDOW_DAYS", "1"))
+# Nivel de riesgo desde el que se alerta (BAJO, MEDIO, ALTO, CRÍTICO) y pausa entre alertas iguales
+ALERT_LEVEL = os.getenv("ALERT_LEVEL", "ALTO")
+ALERT_COOLDOWN = float(os.getenv("ALERT_COOLDOWN", str(6 * 3600)))
+ALERT_RECIPIENTS = [r.strip() for r in os.getenv("ALERT_RECIPIENTS", "").split(",") if r.strip()]
+EMAIL_SENDER = os.getenv("EMAIL_SENDER", "")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "")
+
+# Instrumentación: log JSON de spans y eventos (volumen ./logs; vacío = sin log) y puerto de /metrics (0 = apagado)
+TELEMETRY_LOG_PATH = os.getenv("TELEMETRY_LOG_PATH", "logs/telemetry.jsonl")
+TELEMETRY_LOG_MAX_BYTES = int(os.getenv("TELEMETRY_LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+TELEMETRY_LOG_BACKUPS = int(os.getenv("TELEMETRY_LOG_BACKUPS", "3"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
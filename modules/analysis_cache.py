@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Optional
+
+from config.settings import (
+    ANALYSIS_CACHE_MAX_ENTRIES,
+    ANALYSIS_CACHE_PATH,
+    ANALYSIS_CACHE_TTL,
+)
+from modules.telemetry import count
+
+# Cada cuántas escrituras se revisa TTL/tamaño (evita un DELETE por inserción)
+_EVICT_EVERY = 200
+# last_used solo se reescribe si tiene más de esto: el LRU no necesita más precisión y
+# así un acierto no es una transacción de escritura
+_TOUCH_AFTER = 3600
+
+
+def normalize_text(text: str) -> str:
+    """Forma canónica del texto para que variaciones de espacios no cambien la clave"""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class AnalysisCache:
+    """Caché persistente de respuestas del LLM, direccionada por contenido
+
+    La clave es sha256(modelo, versión del prompt, texto normalizado): cambiar el
+    prompt o el modelo invalida solo lo que corresponde. Expira por TTL y, sobre
+    max_entries, descarta lo menos usado recientemente (LRU).
+    """
+
+    def __init__(self, path: str = ANALYSIS_CACHE_PATH,
+                 ttl: float = ANALYSIS_CACHE_TTL,
+                 max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, text: str) -> str:
+        payload = "\x1f".join((model, prompt_version, normalize_text(text)))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, last_used FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                count("llm_cache_misses_total")
+                return None
+            if now - row[2] > _TOUCH_AFTER:
+                with self._conn:
+                    self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            count("llm_cache_hits_total")
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if entries > self.max_entries:
+            self._conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?
+                )
+            """, (entries - self.max_entries,))
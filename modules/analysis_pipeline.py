@@ -0,0 +1,147 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from config.settings import CLASSIFIER_MODE, CLASSIFY_BATCH_SIZE, LLM_MAX_WORKERS
+from modules.story_clusters import spread_story_labels
+
+# Prefijo con el que DeepSeekAnalyzer.summarize_article informa un fallo
+SUMMARY_ERROR_PREFIX = "Error al resumir"
+
+
+class AnalysisPipeline:
+    """Despacha en paralelo los lotes de clasificación y los resúmenes de una búsqueda
+
+    El ritmo real lo pone el presupuesto RPS/TPM del analizador (compartido por
+    todos los hilos); aquí solo se decide qué se pide y en qué orden se informa.
+
+    Modos de clasificación: "llm" (todo a DeepSeek), "local" (todo al clasificador
+    local) e "hybrid" (local primero; solo lo de baja confianza va a DeepSeek).
+    """
+
+    def __init__(self, analyzer, local_classifier=None, max_workers: int = LLM_MAX_WORKERS,
+                 batch_size: int = CLASSIFY_BATCH_SIZE):
+        self.analyzer = analyzer
+        self.local = local_classifier
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    def _submit(self, fn, *args):
+        # Cada tarea corre con una copia del contexto: el gasto del LLM se carga a la búsqueda activa
+        return self.executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def stream(self, articles: List[Dict], classify: List[int], summarize: List[int],
+               mode: str = CLASSIFIER_MODE) -> Iterator[Dict]:
+        """Como run(), pero entrega los resultados a medida que llegan
+
+        Cada actualización trae solo lo nuevo: {"classifications": {pos: {...}},
+        "summaries": {pos: texto}, "failed_summaries": [pos, ...], "done": n,
+        "total": n, "escalated": n}. La primera llega sin esperar al LLM, con lo que
+        ya estaba en caché y lo resuelto localmente.
+        """
+        texts, cached = self.analyzer.lookup_classifications([articles[i] for i in classify])
+        # Lo que DeepSeek ya clasificó antes sale gratis en cualquier modo
+        classifications = {i: {**c, "classifier": "llm"} for i, c in zip(classify, cached) if c is not None}
+        pending = [(i, text) for i, text, c in zip(classify, texts, cached) if c is None]
+
+        escalated = 0
+        if pending and mode != "llm" and self.local is not None:
+            predictions = self.local.predict([text for _, text in pending])
+            keep = self.local.confident(predictions) if mode == "hybrid" else [True] * len(pending)
+            for (i, _), prediction, accepted in zip(pending, predictions.to_dict('records'), keep):
+                if accepted:
+                    classifications[i] = {
+                        "sentiment": prediction['sentiment'],
+                        "emotion": prediction['emotion'],
+                        "confidence": prediction['confidence'],
+                        "classifier": "local"
+                    }
+            pending = [(i, text) for i, text in pending if i not in classifications]
+            escalated = len(pending)
+
+        futures = {}
+        for start in range(0, len(pending), self.batch_size):
+            chunk = pending[start:start + self.batch_size]
+            future = self._submit(self.analyzer.classify_chunk, [text for _, text in chunk])
+            futures[future] = ("classify", [i for i, _ in chunk])
+        for i in summarize:
+            summary = articles[i].get('summary')
+            future = self._submit(
+                self.analyzer.summarize_article,
+                articles[i].get('title', ''),
+                summary if isinstance(summary, str) else ''
+            )
+            futures[future] = ("summary", i)
+
+        total = len(classify) + len(summarize)
+        done = len(classifications)
+        update = {"classifications": classifications, "summaries": {}, "failed_summaries": [],
+                  "done": done, "total": total, "escalated": escalated}
+        yield update
+
+        for future in as_completed(futures):
+            kind, target = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error en análisis ({kind}): {e}")
+                result = None
+
+            update = {"classifications": {}, "summaries": {}, "failed_summaries": [],
+                      "total": total, "escalated": escalated}
+            if kind == "classify":
+                if result is None:
+                    result = [{"sentiment": "NEUTRAL", "emotion": "DESCONOCIDO", "confidence": 0.0, "error": True}] * len(target)
+                for i, classification in zip(target, result):
+                    update["classifications"][i] = {**classification, "classifier": "llm"}
+                done += len(target)
+            else:
+                if result is None or result.startswith(SUMMARY_ERROR_PREFIX):
+                    update["failed_summaries"].append(target)
+                if result is not None:
+                    update["summaries"][target] = result
+                done += 1
+            update["done"] = done
+            yield update
+
+    def run(self, articles: List[Dict], classify: List[int], summarize: List[int],
+            on_progress: Optional[Callable[[int, int], None]] = None,
+            mode: str = CLASSIFIER_MODE) -> Dict:
+        """Clasifica los artículos de las posiciones `classify` y resume los de `summarize`
+
+        on_progress(hechos, total) se invoca desde el hilo que llama a run() a medida
+        que terminan las tareas, en cualquier orden.
+        Cada clasificación indica en "classifier" si la resolvió "local" o "llm".
+        Devuelve {"classifications": {pos: {...}}, "summaries": {pos: texto},
+                  "failed": [pos, ...], "failed_summaries": [pos, ...], "escalated": n}.
+        """
+        outcome = {"classifications": {}, "summaries": {}, "failed_summaries": [], "escalated": 0}
+        for update in self.stream(articles, classify, summarize, mode):
+            merge_update(outcome, update)
+            if on_progress:
+                on_progress(update["done"], update["total"])
+        return outcome
+
+
+def merge_update(outcome: Dict, update: Dict):
+    """Acumula una actualización de AnalysisPipeline.stream() en el resultado de run()"""
+    outcome["classifications"].update(update["classifications"])
+    outcome["summaries"].update(update["summaries"])
+    outcome["failed_summaries"].extend(update["failed_summaries"])
+    outcome["escalated"] = update["escalated"]
+    outcome["failed"] = [i for i, c in outcome["classifications"].items() if c.get("error")]
+
+
+def apply_update(df: pd.DataFrame, update: Dict) -> pd.DataFrame:
+    """Vuelca en df (índice = posiciones enviadas al pipeline) una actualización o un resultado"""
+    for i, classification in update['classifications'].items():
+        df.at[i, 'sentiment'] = classification['sentiment']
+        df.at[i, 'emotion'] = classification['emotion']
+        df.at[i, 'confidence'] = classification['confidence']
+        df.at[i, 'classifier'] = classification['classifier']
+    for i, summary in update['summaries'].items():
+        df.at[i, 'summary_ai'] = summary
+    # Las copias de cada historia heredan la clasificación del representante
+    return spread_story_labels(df)
@@ -0,0 +1,345 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from config.settings import ARTICLE_DB_PATH
+from modules.html_text import sanitize_summary
+from modules.text_index import InvertedIndex, positive_phrases
+
+# Columnas persistidas, en el orden de la tabla
+ARTICLE_COLUMNS = [
+    'link', 'title', 'summary', 'source', 'category', 'keyword', 'keyword_matches',
+    'published', 'published_dt', 'sentiment', 'emotion', 'confidence', 'classifier', 'summary_ai', 'fetched_at',
+    'origin'
+]
+ANALYSIS_COLUMNS = ['sentiment', 'emotion', 'confidence', 'classifier', 'summary_ai']
+
+# Candidatos de FTS5 que se verifican contra la consulta por tanda
+_SEARCH_BATCH = 2000
+
+# Texto repetido entre filas (pocos valores distintos): como category ocupa un código por fila
+CATEGORICAL_COLUMNS = ['source', 'category', 'keyword', 'sentiment', 'emotion', 'classifier', 'origin']
+
+# Columnas agregadas después de la primera versión del esquema: (nombre, tipo)
+_MIGRATIONS = [
+    ('confidence', 'REAL'),
+    ('classifier', 'TEXT'),
+    ('origin', 'TEXT'),
+]
+
+# De dónde vino cada artículo: feed directo del medio, Google News o Bing News
+ORIGINS = ['rss', 'google', 'bing']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    link TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    summary TEXT,
+    source TEXT,
+    category TEXT,
+    keyword TEXT,
+    keyword_matches INTEGER,
+    published TEXT,
+    published_dt TEXT,
+    sentiment TEXT,
+    emotion TEXT,
+    confidence REAL,
+    classifier TEXT,
+    summary_ai TEXT,
+    fetched_at TEXT,
+    analyzed_at TEXT,
+    origin TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_published_dt ON articles(published_dt);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, summary,
+    content='articles', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+-- Estado de cada vigilancia del monitor (modules/monitor.py), para que el dashboard lo lea
+CREATE TABLE IF NOT EXISTS watches (
+    keyword TEXT PRIMARY KEY,
+    last_run TEXT,
+    new_articles INTEGER,
+    total_articles INTEGER,
+    risk_level TEXT,
+    risk_score REAL,
+    analysis TEXT,
+    alerted_level TEXT,
+    alerted_at TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, summary ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+    INSERT INTO articles_fts(rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+END;
+"""
+
+
+def _iso_utc(value) -> Optional[str]:
+    """Timestamp -> texto ISO-8601 en UTC (ordenable lexicográficamente)"""
+    if value is None or pd.isna(value):
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        # Naive = hora local del servidor (p. ej. fetched_at = datetime.now())
+        ts = pd.Timestamp(ts.to_pydatetime().astimezone(timezone.utc))
+    ts = ts.tz_convert('UTC')
+    return ts.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def _fts_phrase(words: List[str]) -> str:
+    """Frase FTS5; el prefijo* solo vale en la última palabra, así que se corta ahí"""
+    parts, current = [], []
+    for word in words:
+        current.append(word.rstrip("*"))
+        if word.endswith("*"):
+            parts.append('"' + " ".join(current) + '" *')
+            current = []
+    if current:
+        parts.append('"' + " ".join(current) + '"')
+    return "(" + " AND ".join(parts) + ")" if len(parts) > 1 else parts[0]
+
+
+def fts_query(keyword: str) -> Optional[str]:
+    """Preselección FTS5 para un término del buscador (misma sintaxis que InvertedIndex)
+
+    Une con OR las frases no negadas: toda coincidencia contiene alguna. AND, NOT,
+    paréntesis y el conteo de menciones se resuelven después sobre esos candidatos.
+    None si la consulta no tiene términos positivos (no puede coincidir con nada).
+    """
+    phrases = [_fts_phrase(words) for words in positive_phrases(keyword)]
+    return " OR ".join(phrases) if phrases else None
+
+
+def compact_articles(df: pd.DataFrame) -> pd.DataFrame:
+    """Tipos compactos para un resultado que queda vivo (p. ej. en la sesión de Streamlit)
+
+    Categorías para el texto repetido y enteros/flotantes del menor ancho que alcance.
+    Ojo: value_counts() de una categoría incluye los valores con 0 filas.
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and (df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype)):
+            df[col] = df[col].astype('category')
+    for col in ('keyword_matches', 'relevance_score', 'story_id', 'story_size'):
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    if 'confidence' in df.columns:
+        df['confidence'] = pd.to_numeric(df['confidence'], errors='coerce').astype('float32')
+    return df
+
+
+class ArticleStore:
+    """Artículos analizados persistidos en SQLite, con índice de texto FTS5, clave = link"""
+
+    def __init__(self, path: str = ARTICLE_DB_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+
+    def _migrate(self):
+        """Agrega a bases existentes las columnas que el esquema actual espera"""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+        with self._conn:
+            for column, column_type in _MIGRATIONS:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE articles ADD COLUMN {column} {column_type}")
+            # Filas anteriores a origin: solo los feeds directos traen categoría
+            self._conn.execute(
+                "UPDATE articles SET origin = CASE WHEN category IS NOT NULL THEN 'rss' "
+                "WHEN source = 'Bing News' THEN 'bing' ELSE 'google' END WHERE origin IS NULL"
+            )
+
+    def upsert(self, df: pd.DataFrame) -> int:
+        """Inserta o actualiza artículos; el análisis existente no se pisa con vacíos"""
+        if df.empty or 'link' not in df.columns:
+            return 0
+
+        analyzed_at = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for record in df.to_dict('records'):
+            if not record.get('link'):
+                continue
+            row = {col: record.get(col) for col in ARTICLE_COLUMNS}
+            row['published_dt'] = _iso_utc(row['published_dt'])
+            row['fetched_at'] = _iso_utc(row['fetched_at'])
+            row['keyword_matches'] = int(row['keyword_matches']) if pd.notna(row['keyword_matches']) else None
+            row['confidence'] = float(row['confidence']) if pd.notna(row['confidence']) else None
+            for col in ('summary', 'source', 'category', 'keyword', 'published', 'sentiment', 'emotion', 'classifier', 'summary_ai'):
+                if row[col] is not None and pd.isna(row[col]):
+                    row[col] = None
+            row['analyzed_at'] = analyzed_at if row['sentiment'] else None
+            if row['origin'] is None or pd.isna(row['origin']):
+                row['origin'] = 'rss' if row['category'] else ('bing' if row['source'] == 'Bing News' else 'google')
+            rows.append(row)
+
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO articles (link, title, summary, source, category, keyword, keyword_matches,
+                                      published, published_dt, sentiment, emotion, confidence, classifier, summary_ai,
+                                      fetched_at, analyzed_at, origin)
+                VALUES (:link, :title, :summary, :source, :category, :keyword, :keyword_matches,
+                        :published, :published_dt, :sentiment, :emotion, :confidence, :classifier, :summary_ai,
+                        :fetched_at, :analyzed_at, :origin)
+                ON CONFLICT(link) DO UPDATE SET
+                    title = excluded.title,
+                    summary = COALESCE(excluded.summary, articles.summary),
+                    source = excluded.source,
+                    category = COALESCE(excluded.category, articles.category),
+                    keyword = excluded.keyword,
+                    keyword_matches = excluded.keyword_matches,
+                    published = COALESCE(excluded.published, articles.published),
+                    published_dt = COALESCE(excluded.published_dt, articles.published_dt),
+                    sentiment = COALESCE(excluded.sentiment, articles.sentiment),
+                    emotion = COALESCE(excluded.emotion, articles.emotion),
+                    confidence = COALESCE(excluded.confidence, articles.confidence),
+                    classifier = COALESCE(excluded.classifier, articles.classifier),
+                    summary_ai = COALESCE(excluded.summary_ai, articles.summary_ai),
+                    fetched_at = excluded.fetched_at,
+                    analyzed_at = COALESCE(excluded.analyzed_at, articles.analyzed_at),
+                    -- Un link que llegó también por el feed del medio se queda como directo (con categoría)
+                    origin = CASE WHEN articles.origin = 'rss' THEN 'rss' ELSE excluded.origin END
+            """, rows)
+        return len(rows)
+
+    def get_analysis(self, links: List[str]) -> pd.DataFrame:
+        """Sentimiento/emoción/resumen ya calculados para esos links (índice = link)"""
+        links = [l for l in dict.fromkeys(links) if l]
+        frames = []
+        with self._lock:
+            # SQLite limita la cantidad de parámetros por consulta
+            for start in range(0, len(links), 500):
+                chunk = links[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                frames.append(pd.read_sql_query(
+                    f"SELECT link, sentiment, emotion, confidence, classifier, summary_ai FROM articles "
+                    f"WHERE sentiment IS NOT NULL AND link IN ({placeholders})",
+                    self._conn, params=chunk
+                ))
+        if not frames:
+            return pd.DataFrame(columns=ANALYSIS_COLUMNS)
+        return pd.concat(frames, ignore_index=True).set_index('link')
+
+    def search(self, keyword: str, since=None, categories: Optional[List[str]] = None,
+               origins: Optional[List[str]] = None, min_matches: int = 1, limit: int = 1000) -> pd.DataFrame:
+        """Artículos guardados que cumplen la consulta, dentro de la ventana de fechas
+
+        categories filtra los feeds directos y origins los orígenes (ORIGINS) habilitados;
+        None deja pasar todo.
+
+        keyword y keyword_matches se calculan para esta consulta: las columnas guardadas
+        son las de la última búsqueda que trajo cada link, quizá con otro término.
+        """
+        match = fts_query(keyword)
+        if match is None:
+            return pd.DataFrame()
+        sql = [
+            "SELECT a.* FROM articles_fts",
+            "JOIN articles a ON a.rowid = articles_fts.rowid",
+            "WHERE articles_fts MATCH ?"
+        ]
+        params: list = [match]
+        if since is not None:
+            # Rango sobre el índice idx_articles_published_dt
+            sql.append("AND a.published_dt >= ?")
+            params.append(_iso_utc(since))
+        if origins is not None:
+            sql.append(f"AND a.origin IN ({','.join('?' * len(origins)) or 'NULL'})")
+            params.extend(origins)
+        if categories:
+            # Google/Bing no traen categoría: el filtro aplica solo a los feeds directos
+            sql.append(f"AND (a.origin <> 'rss' OR a.category IN ({','.join('?' * len(categories))}))")
+            params.extend(categories)
+        sql.append("ORDER BY a.published_dt DESC")
+
+        frames, found = [], 0
+        try:
+            with self._lock:
+                cursor = self._conn.execute(" ".join(sql), params)
+                columns = [d[0] for d in cursor.description]
+                while found < limit:
+                    rows = cursor.fetchmany(_SEARCH_BATCH)
+                    if not rows:
+                        break
+                    batch = self._matching(pd.DataFrame([tuple(r) for r in rows], columns=columns), keyword)
+                    batch = batch[batch['keyword_matches'] >= min_matches]
+                    frames.append(batch)
+                    found += len(batch)
+                cursor.close()
+        except sqlite3.OperationalError as e:
+            print(f"Error en búsqueda del historial: {e}")
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True).head(limit) if frames else pd.DataFrame()
+        if df.empty:
+            return df
+        df = df.drop(columns=['analyzed_at'])
+        # Siempre escritas por _iso_utc: formato fijo, sin inferencia por fila
+        df['published_dt'] = pd.to_datetime(df['published_dt'], utc=True, errors='coerce', format='ISO8601')
+        df['fetched_at'] = pd.to_datetime(df['fetched_at'], utc=True, errors='coerce', format='ISO8601')
+        return df
+
+    @staticmethod
+    def _matching(batch: pd.DataFrame, keyword: str) -> pd.DataFrame:
+        """Filas de la tanda que cumplen la consulta, con sus menciones para ese término"""
+        # Filas guardadas antes de limpiar las bajadas al ingerir (memorizado: casi gratis en las demás)
+        batch['summary'] = batch['summary'].fillna('').map(sanitize_summary)
+        index = InvertedIndex()
+        for pos, (title, summary) in enumerate(zip(batch['title'].fillna(''), batch['summary'])):
+            index.add(pos, title, summary)
+        counts = index.search(keyword)
+        batch = batch.iloc[sorted(counts)].copy()
+        batch['keyword'] = keyword
+        batch['keyword_matches'] = [counts[pos] for pos in sorted(counts)]
+        return batch
+
+    def llm_labeled(self, limit: int = 50000) -> pd.DataFrame:
+        """Artículos etiquetados por DeepSeek (los anteriores a la columna classifier también lo son)"""
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT link, title, summary, sentiment, emotion FROM articles "
+                "WHERE sentiment IS NOT NULL AND COALESCE(classifier, 'llm') = 'llm' "
+                "ORDER BY analyzed_at DESC LIMIT ?",
+                self._conn, params=(limit,)
+            )
+
+    def get_watch(self, keyword: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM watches WHERE keyword = ?", (keyword,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def save_watch(self, keyword: str, **fields):
+        """Inserta o actualiza el estado de una vigilancia (solo los campos dados)"""
+        columns = ['keyword', *fields]
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO watches ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(keyword) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in fields)}",
+                (keyword, *fields.values())
+            )
+
+    def watches(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM watches ORDER BY keyword", self._conn)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
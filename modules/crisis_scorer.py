@@ -0,0 +1,177 @@
+"""Señales de crisis incrementales: estadísticas móviles por búsqueda + narrativa memorizada
+
+El dashboard vuelve a ejecutar todo el script en cada interacción (filtros, botones).
+CrisisScorer mantiene por búsqueda (keyword y filtros) contadores por hora de noticias
+y negativas, que se actualizan solo con lo que cambió, y pide la narrativa a DeepSeek solo cuando
+cambia el conjunto de artículos (DeepSeekAnalyzer.detect_crisis_signals la memoriza
+por conjunto de links).
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import CRISIS_BASELINE_DAYS, CRISIS_MAX_KEYWORDS, CRISIS_RECENT_HOURS, CRISIS_SPIKE_FACTOR
+
+_HOUR = 3600
+
+
+class RollingStats:
+    """Noticias y negativas por hora de publicación de un keyword, actualizadas por link"""
+
+    def __init__(self, baseline_days: float = CRISIS_BASELINE_DAYS):
+        self.horizon = baseline_days * 24 * _HOUR
+        # link -> (hora, ¿negativa?): lo que ya está contado y en qué balde
+        self._counted: Dict[str, Tuple[int, bool]] = {}
+        # hora (epoch // 3600) -> [noticias, negativas]
+        self._buckets: Dict[int, list] = {}
+
+    def _add(self, hour: int, negative: bool, sign: int):
+        bucket = self._buckets.setdefault(hour, [0, 0])
+        bucket[0] += sign
+        bucket[1] += sign * negative
+        if bucket[0] <= 0:
+            del self._buckets[hour]
+
+    def update(self, df: pd.DataFrame, now: datetime) -> int:
+        """Deja los contadores iguales a df: suma lo nuevo o con otro sentimiento y descuenta
+        lo que ya no está; devuelve cuántos links cambiaron"""
+        oldest = int((now.timestamp() - self.horizon) // _HOUR)
+        # Lo que sale del horizonte se descuenta
+        for hour in [h for h in self._buckets if h < oldest]:
+            del self._buckets[hour]
+        self._counted = {link: v for link, v in self._counted.items() if v[0] >= oldest}
+
+        published = pd.to_datetime(df['published_dt'], utc=True, errors='coerce')
+        valid = published.notna().to_numpy()
+        epoch = pd.Timestamp(0, tz='UTC')
+        hours = ((published[valid] - epoch) // pd.Timedelta(hours=1)).to_numpy()
+        negatives = (df.loc[valid, 'sentiment'] == 'NEGATIVO').to_numpy()
+        links = df.loc[valid, 'link'].astype(str).to_numpy()
+
+        changed = 0
+        present = set(links)
+        for link in [l for l in self._counted if l not in present]:
+            hour, negative = self._counted.pop(link)
+            self._add(hour, negative, -1)
+            changed += 1
+        for link, hour, negative in zip(links, hours, negatives):
+            hour, negative = int(hour), bool(negative)
+            if hour < oldest:
+                continue
+            previous = self._counted.get(link)
+            if previous == (hour, negative):
+                continue
+            if previous is not None:
+                self._add(previous[0], previous[1], -1)
+            self._add(hour, negative, +1)
+            self._counted[link] = (hour, negative)
+            changed += 1
+        return changed
+
+    def window(self, now: datetime, hours: float, end_hours: float = 0) -> Tuple[int, int]:
+        """(noticias, negativas) publicadas entre now - hours y now - end_hours"""
+        current = now.timestamp() // _HOUR
+        start, end = current - hours, current - end_hours
+        total = negative = 0
+        for hour, (count, neg) in self._buckets.items():
+            if start < hour <= end:
+                total += count
+                negative += neg
+        return total, negative
+
+
+class CrisisScorer:
+    """Evaluación de riesgo por keyword, barata de repetir en cada rerun de Streamlit
+
+    assess() devuelve lo mismo que detect_crisis_signals más:
+      - negative_ratio_recent: % de negativas en las últimas CRISIS_RECENT_HOURS
+      - volume_spike: noticias recientes / promedio del mismo lapso en la línea base
+        (CRISIS_BASELINE_DAYS previos); None si no hay línea base
+    Si el LLM falla, el nivel se estima con esas estadísticas.
+
+    El estado se guarda por (keyword, scope): scope identifica con qué parámetros se
+    obtuvo df (ventana, categorías, orígenes), para que dos vistas distintas del mismo
+    keyword no se mezclen. Se conservan los max_keys usados más recientemente.
+    """
+
+    def __init__(self, analyzer, recent_hours: float = CRISIS_RECENT_HOURS,
+                 baseline_days: float = CRISIS_BASELINE_DAYS, spike_factor: float = CRISIS_SPIKE_FACTOR,
+                 max_keys: int = CRISIS_MAX_KEYWORDS):
+        self.analyzer = analyzer
+        self.recent_hours = recent_hours
+        self.baseline_days = baseline_days
+        self.spike_factor = spike_factor
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._stats: "OrderedDict[tuple, RollingStats]" = OrderedDict()
+        # (keyword, scope) -> (links, sentimientos, resultado) de la última evaluación
+        self._last: Dict[tuple, Tuple[frozenset, int, Dict]] = {}
+
+    def _state(self, key: tuple) -> RollingStats:
+        """Estadísticas de key (LRU): la menos usada sale junto con su última evaluación"""
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = RollingStats(self.baseline_days)
+            while len(self._stats) > self.max_keys:
+                evicted, _ = self._stats.popitem(last=False)
+                self._last.pop(evicted, None)
+        else:
+            self._stats.move_to_end(key)
+        return stats
+
+    def _signals(self, stats: RollingStats, now: datetime) -> Dict:
+        recent_total, recent_negative = stats.window(now, self.recent_hours)
+        baseline_hours = self.baseline_days * 24 - self.recent_hours
+        baseline_total, _ = stats.window(now, self.baseline_days * 24, end_hours=self.recent_hours)
+
+        spike: Optional[float] = None
+        if baseline_hours > 0 and baseline_total > 0:
+            expected = baseline_total * self.recent_hours / baseline_hours
+            spike = recent_total / expected
+        return {
+            "recent_news": recent_total,
+            "negative_ratio_recent": recent_negative / recent_total * 100 if recent_total else 0.0,
+            "volume_spike": spike
+        }
+
+    def _fallback_level(self, signals: Dict, score: float) -> str:
+        """Nivel aproximado sin LLM: proporción de negativas y pico de volumen"""
+        spiking = signals["volume_spike"] is not None and signals["volume_spike"] >= self.spike_factor
+        ratio = max(score, signals["negative_ratio_recent"])
+        if ratio >= 60 and spiking:
+            return "CRÍTICO"
+        if ratio >= 60 or (ratio >= 40 and spiking):
+            return "ALTO"
+        if ratio >= 30 or spiking:
+            return "MEDIO"
+        return "BAJO"
+
+    def assess(self, keyword: str, df: pd.DataFrame, now: Optional[datetime] = None,
+               scope: Hashable = None) -> Dict:
+        now = now or datetime.now(timezone.utc)
+        key = (keyword, scope)
+        links = frozenset(df['link'].astype(str)) if 'link' in df.columns else frozenset()
+        negatives = int((df['sentiment'] == 'NEGATIVO').sum()) if 'sentiment' in df.columns else 0
+
+        with self._lock:
+            stats = self._state(key)
+            if 'published_dt' in df.columns and 'link' in df.columns:
+                stats.update(df, now)
+            signals = self._signals(stats, now)
+
+            last = self._last.get(key)
+            if last is not None and last[0] == links and last[1] == negatives:
+                return {**last[2], **signals}
+
+        # Fuera del lock: la narrativa puede requerir una llamada al LLM
+        result = self.analyzer.detect_crisis_signals(df)
+        if result["risk_level"] == "ERROR":
+            # También se recuerda el fallo: los reruns no reintentan; un conjunto nuevo sí
+            result = {**result, "risk_level": self._fallback_level(signals, result.get("score", 0))}
+        with self._lock:
+            if key in self._stats:
+                self._last[key] = (links, negatives, result)
+        return {**result, **signals}
@@ -1,9 +1,45 @@
-from openai import OpenAI
+from openai import BadRequestError, OpenAI
 import os
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 import json
+import math
+import re
+import time
+
+from config.settings import (
+    CLASSIFY_BATCH_SIZE,
+    CLASSIFY_MAX_RETRIES,
+    CONNECTIONS_INPUT_TOKENS,
+    CRISIS_INPUT_TOKENS,
+    DEEPSEEK_BASE_URL,
+    LLM_MAX_RETRIES,
+    SUMMARY_INPUT_TOKENS,
+)
+from modules.analysis_cache import AnalysisCache
+from modules.html_text import estimate_tokens, truncate_tokens
+from modules.llm_budget import LLMBudget, backoff_delay, is_transient_error
+from modules.llm_cost import CostLedger, usage_tokens
+from modules.telemetry import count, span
+
+VALID_SENTIMENTS = ['POSITIVO', 'NEGATIVO', 'NEUTRAL']
+VALID_EMOTIONS = ["RISA", "IRA", "MIEDO", "TRISTEZA", "DISGUSTO", "SORPRESA", "NEUTRAL"]
+
+# Ubica, dentro del JSON generado, la etiqueta de sentimiento de cada ítem
+_SENTIMENT_VALUE_RE = re.compile(r'"id"\s*:\s*(?P<id>\d+)[^{}]*?"sentimiento"\s*:\s*"(?P<label>[A-ZÁÉÍÓÚ]+)"')
 
 class DeepSeekAnalyzer:
+    MODEL = "deepseek-chat"
+    # Subir la versión al cambiar un prompt invalida solo las entradas de caché de ese prompt
+    SUMMARY_PROMPT_VERSION = "summary-v1"
+    CLASSIFY_PROMPT_VERSION = "classify-v2"
+    CRISIS_PROMPT_VERSION = "crisis-v1"
+    # Titulares (los más recientes) que se envían para evaluar el riesgo
+    CRISIS_HEADLINES = 15
+    # Titulares que se comparan en find_connections
+    CONNECTIONS_TITLES = 10
+    # Texto máximo por artículo dentro de un lote
+    CLASSIFY_MAX_CHARS = 600
+
     def __init__(self):
         api_key = os.getenv("DEEPSEEK_API_KEY")
         if not api_key:
@@ -11,14 +47,80 @@ class DeepSeekAnalyzer:
         
         self.client = OpenAI(
             api_key=api_key,
-            base_url="https://api.deepseek.com"
+            base_url=DEEPSEEK_BASE_URL,
+            # Los reintentos los maneja _chat, con backoff y presupuesto compartido
+            max_retries=0
         )
+        self.cache = AnalysisCache()
+        self.budget = LLMBudget()
+        self.ledger = CostLedger()
+        self.use_logprobs = True
+    
+    def _estimate_tokens(self, messages: List[Dict]) -> int:
+        """Estimación gruesa (~3 caracteres por token en español) para reservar presupuesto"""
+        return sum(estimate_tokens(m.get('content', '')) + 4 for m in messages)
+    
+    @staticmethod
+    def _fit_lines(lines: List[str], max_tokens: int) -> str:
+        """Une líneas (en orden de prioridad) hasta agotar max_tokens; cada una se recorta a lo que quede"""
+        kept = []
+        remaining = max_tokens
+        for line in lines:
+            # Sin espacio ni para el inicio de una línea más: se corta aquí
+            if remaining < 8:
+                break
+            line = truncate_tokens(" ".join(str(line).split()), remaining)
+            kept.append(line)
+            remaining -= estimate_tokens(line) + 1
+        return "\n".join(kept)
+    
+    def _chat(self, operation: str = "chat", **kwargs):
+        """Llamada al LLM con presupuesto RPS/TPM y reintentos ante 429/5xx/timeouts
+
+        El usage de la respuesta queda en self.ledger bajo `operation`. Spans:
+        llm_call (todo, con esperas y reintentos), llm_budget_wait y llm_request
+        (cada ida y vuelta a la API).
+        """
+        estimate = self._estimate_tokens(kwargs['messages']) + kwargs.get('max_tokens', 0)
+        
+        with span("llm_call", operation=operation):
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                with span("llm_budget_wait", operation=operation):
+                    self.budget.acquire(estimate)
+                try:
+                    with span("llm_request", operation=operation):
+                        response = self.client.chat.completions.create(model=self.MODEL, **kwargs)
+                except Exception as e:
+                    if attempt >= LLM_MAX_RETRIES or not is_transient_error(e):
+                        raise
+                    delay = backoff_delay(attempt, e)
+                    count("llm_retries_total", operation=operation)
+                    print(f"⏳ DeepSeek {type(e).__name__}: reintento {attempt + 1}/{LLM_MAX_RETRIES} en {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                
+                usage = getattr(response, 'usage', None)
+                if usage is not None and getattr(usage, 'total_tokens', None):
+                    self.budget.adjust(usage.total_tokens - estimate)
+                if usage is not None:
+                    self.ledger.record(operation, usage)
+                    tokens = usage_tokens(usage)
+                    count("llm_tokens_total", tokens["prompt_tokens"], operation=operation, kind="prompt")
+                    count("llm_tokens_total", tokens["completion_tokens"], operation=operation, kind="completion")
+                return response
     
     def summarize_article(self, title: str, content: str) -> str:
-        """Resume un artículo usando DeepSeek"""
+        """Resume un artículo usando DeepSeek (título y contenido recortados a SUMMARY_INPUT_TOKENS)"""
+        title = truncate_tokens(title or "", SUMMARY_INPUT_TOKENS // 4)
+        content = truncate_tokens(content or "", SUMMARY_INPUT_TOKENS - estimate_tokens(title))
+        cache_key = self.cache.make_key(self.MODEL, self.SUMMARY_PROMPT_VERSION, f"{title}\n{content}")
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+            response = self._chat(
+                "summary",
                 messages=[
                     {
                         "role": "system", 
@@ -32,49 +134,210 @@ class DeepSeekAnalyzer:
                 max_tokens=200,
                 temperature=0.3
             )
-            return response.choices[0].message.content
+            summary = response.choices[0].message.content
+            self.cache.set(cache_key, summary)
+            return summary
         except Exception as e:
             return f"Error al resumir: {str(e)}"
     
+    def classify(self, text: str) -> Dict:
+        """Sentimiento, emoción y confianza de un texto en una sola llamada
+
+        Devuelve {"sentiment", "emotion", "confidence"}; la confianza es la
+        probabilidad que el modelo asignó a la etiqueta de sentimiento.
+        """
+        texts, cached = self.lookup_classifications([text])
+        if cached[0] is not None:
+            return cached[0]
+        return self.classify_chunk(texts)[0]
+    
     def analyze_sentiment(self, text: str) -> Dict:
-        """Analiza el sentimiento de un texto"""
+        """Analiza el sentimiento de un texto (comparte llamada y caché con analyze_emotion)"""
+        result = self.classify(text)
+        if result.get("error"):
+            return {"sentiment": "NEUTRAL", "confidence": 0.0}
+        return {"sentiment": result["sentiment"], "confidence": result["confidence"]}
+    
+    def analyze_emotion(self, text: str) -> str:
+        """Clasifica la emoción predominante de un texto (comparte llamada con analyze_sentiment)"""
+        return self.classify(text)["emotion"]
+    
+    def _article_text(self, article) -> str:
+        if isinstance(article, str):
+            return article
+        # Filas del historial pueden traer summary = NaN
+        title, summary = article.get('title'), article.get('summary')
+        return " ".join(part for part in (title, summary) if isinstance(part, str) and part)
+    
+    def _label_confidences(self, response) -> Dict[int, float]:
+        """{id: P(etiqueta de sentimiento)} a partir de los logprobs de los tokens de la etiqueta"""
+        choice = response.choices[0]
+        token_logprobs = getattr(getattr(choice, 'logprobs', None), 'content', None)
+        if not token_logprobs:
+            return {}
+        
+        # Offset de cada token dentro del texto generado
+        spans = []
+        offset = 0
+        for token in token_logprobs:
+            spans.append((offset, offset + len(token.token), token.logprob))
+            offset += len(token.token)
+        
+        confidences = {}
+        for match in _SENTIMENT_VALUE_RE.finditer(choice.message.content or ""):
+            start, end = match.span('label')
+            logprob = sum(lp for t_start, t_end, lp in spans if t_start < end and t_end > start)
+            confidences[int(match.group('id'))] = math.exp(logprob)
+        return confidences
+    
+    def _classify_request(self, texts: List[str]) -> Dict[int, Dict]:
+        """Un request para varios textos; devuelve {posición: {"sentiment", "emotion", "confidence"}} solo de ítems válidos"""
+        numbered = "\n\n".join(
+            f"[{i}] {text[:self.CLASSIFY_MAX_CHARS]}" for i, text in enumerate(texts)
+        )
+        request = dict(
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "Eres un analista de sentimiento y emociones de noticias. "
+                        "Para cada texto numerado clasifica el sentimiento (POSITIVO, NEGATIVO o NEUTRAL), "
+                        "la emoción predominante (RISA, IRA, MIEDO, TRISTEZA, DISGUSTO, SORPRESA o NEUTRAL) "
+                        "y tu confianza en el sentimiento, entre 0 y 1. "
+                        'Responde SOLO con JSON: {"items": [{"id": 0, "sentimiento": "...", "emocion": "...", "confianza": 0.0}]}'
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": f"Clasifica estos {len(texts)} textos:\n\n{numbered}"
+                }
+            ],
+            response_format={"type": "json_object"},
+            max_tokens=40 * len(texts) + 20,
+            temperature=0.1
+        )
+        
+        response = None
+        if self.use_logprobs:
+            try:
+                response = self._chat("classify", logprobs=True, **request)
+            except BadRequestError as e:
+                # El endpoint no acepta logprobs: se usa la confianza declarada por el modelo
+                print(f"DeepSeek sin logprobs ({e}); se usará la confianza declarada")
+                self.use_logprobs = False
+        if response is None:
+            response = self._chat("classify", **request)
+
+        parsed = {}
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Eres un analista de sentimiento. Responde SOLO con una palabra: POSITIVO, NEGATIVO o NEUTRAL"
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Sentimiento del texto:\n{text}"
-                    }
-                ],
-                max_tokens=10,
-                temperature=0.1
-            )
-            sentiment = response.choices[0].message.content.strip().upper()
-            
-            # Validar respuesta
-            if sentiment not in ['POSITIVO', 'NEGATIVO', 'NEUTRAL']:
-                sentiment = 'NEUTRAL'
+            items = json.loads(response.choices[0].message.content).get("items", [])
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            return parsed
+        confidences = self._label_confidences(response)
+
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                idx = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            sentiment = str(item.get("sentimiento", "")).strip().upper()
+            emotion = str(item.get("emocion", "")).strip().upper()
+            # Solo se aceptan etiquetas válidas; el resto se reintenta
+            if 0 <= idx < len(texts) and sentiment in VALID_SENTIMENTS and emotion in VALID_EMOTIONS:
+                confidence = confidences.get(idx)
+                if confidence is None:
+                    try:
+                        confidence = float(item.get("confianza"))
+                    except (TypeError, ValueError):
+                        confidence = 0.5
+                parsed[idx] = {
+                    "sentiment": sentiment,
+                    "emotion": emotion,
+                    "confidence": round(min(1.0, max(0.0, confidence)), 3)
+                }
+        return parsed
+    
+    def _classify_key(self, text: str) -> str:
+        return self.cache.make_key(self.MODEL, self.CLASSIFY_PROMPT_VERSION, text[:self.CLASSIFY_MAX_CHARS])
+    
+    def lookup_classifications(self, articles: List) -> Tuple[List[str], List[Optional[Dict]]]:
+        """Textos a clasificar y resultados ya presentes en caché (None = pendiente)"""
+        texts = [self._article_text(a) for a in articles]
+        return texts, [self.cache.get(self._classify_key(t)) for t in texts]
+    
+    def classify_chunk(self, texts: List[str]) -> List[Dict]:
+        """Clasifica un lote en un request; reintenta solo los ítems inválidos
+
+        Los ítems que siguen fallando (o si la API falla tras sus reintentos) quedan
+        como NEUTRAL / DESCONOCIDO con "error": True, para que el llamador no los
+        confunda con una clasificación real.
+        """
+        results: List[Optional[Dict]] = [None] * len(texts)
+        pending = list(range(len(texts)))
+        
+        for attempt in range(CLASSIFY_MAX_RETRIES + 1):
+            if not pending:
+                break
+            try:
+                parsed = self._classify_request([texts[i] for i in pending])
+            except Exception as e:
+                print(f"Error en clasificación por lotes: {e}")
+                break
             
-            return {"sentiment": sentiment, "confidence": 0.85}
-        except Exception as e:
-            print(f"Error en análisis de sentimiento: {e}")
-            return {"sentiment": "NEUTRAL", "confidence": 0.0}
+            failed = []
+            for pos, i in enumerate(pending):
+                if pos in parsed:
+                    results[i] = parsed[pos]
+                    self.cache.set(self._classify_key(texts[i]), parsed[pos])
+                else:
+                    failed.append(i)
+            pending = failed
+        
+        for i in pending:
+            results[i] = {"sentiment": "NEUTRAL", "emotion": "DESCONOCIDO", "confidence": 0.0, "error": True}
+        return results
+    
+    def classify_batch(self, articles: List, batch_size: int = CLASSIFY_BATCH_SIZE,
+                       on_progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+        """Clasifica sentimiento y emoción de muchos artículos con pocos requests
+
+        Envía hasta batch_size artículos por request y recibe JSON estructurado.
+        Los ítems ausentes o con etiquetas inválidas se reintentan (solo esos).
+        Para despachar los lotes en paralelo ver AnalysisPipeline.
+        """
+        texts, results = self.lookup_classifications(articles)
+        pending = [i for i, r in enumerate(results) if r is None]
+        
+        total = len(texts)
+        done = total - len(pending)
+        if on_progress:
+            on_progress(done, total)
+        
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            for i, result in zip(chunk, self.classify_chunk([texts[i] for i in chunk])):
+                results[i] = result
+            done += len(chunk)
+            if on_progress:
+                on_progress(done, total)
+        
+        return results
     
     def find_connections(self, articles: List[Dict]) -> str:
         """Encuentra conexiones temáticas entre noticias"""
         if len(articles) < 2:
             return "No hay suficientes noticias para analizar conexiones"
         
-        titles = "\n".join([f"{i+1}. {art['title']}" for i, art in enumerate(articles[:10])])
+        titles = self._fit_lines(
+            [f"{i+1}. {art['title']}" for i, art in enumerate(articles[:self.CONNECTIONS_TITLES])],
+            CONNECTIONS_INPUT_TOKENS
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+            response = self._chat(
+                "connections",
                 messages=[
                     {
                         "role": "system", 
@@ -92,8 +355,24 @@ class DeepSeekAnalyzer:
         except Exception as e:
             return f"Error al analizar conexiones: {str(e)}"
     
+    def _crisis_key(self, df) -> str:
+        """Clave de la evaluación: el conjunto de artículos (links), sin importar orden ni filtros"""
+        ids = df['link'] if 'link' in df.columns else df['title']
+        return self.cache.make_key(self.MODEL, self.CRISIS_PROMPT_VERSION, "\n".join(sorted(ids.astype(str))))
+    
+    def _crisis_headlines(self, df) -> str:
+        """Los titulares más recientes que quepan en CRISIS_INPUT_TOKENS; depende solo del
+        conjunto de artículos, no de su orden"""
+        if 'published_dt' in df.columns and 'link' in df.columns:
+            df = df.sort_values(['published_dt', 'link'], ascending=[False, True], na_position='last')
+        return self._fit_lines(df.head(self.CRISIS_HEADLINES)['title'].tolist(), CRISIS_INPUT_TOKENS)
+    
     def detect_crisis_signals(self, df) -> Dict:
-        """Detecta señales de posibles crisis"""
+        """Detecta señales de posibles crisis
+
+        La narrativa de DeepSeek se memoriza por conjunto de artículos: volver a
+        evaluar las mismas noticias no llama al LLM (los errores no se memorizan).
+        """
         if df.empty:
             return {"risk_level": "BAJO", "score": 0, "analysis": "No hay datos suficientes"}
         
@@ -101,27 +380,13 @@ class DeepSeekAnalyzer:
         total = len(df)
         negative_ratio = negative_count / total if total > 0 else 0
         
-        # Análisis contextual con DeepSeek
-        recent_headlines = "\n".join(df.head(15)['title'].tolist())
+        cache_key = self._crisis_key(df)
+        analysis = self.cache.get(cache_key)
         
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Eres un analista de riesgos. Evalúa el riesgo de crisis (social/económica/política) basado en titulares. Responde con: BAJO, MEDIO, ALTO o CRÍTICO, seguido de 1-2 oraciones explicando por qué."
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Evalúa el riesgo de crisis:\n\n{recent_headlines}"
-                    }
-                ],
-                max_tokens=150,
-                temperature=0.2
-            )
-            
-            analysis = response.choices[0].message.content
+            if analysis is None:
+                analysis = self._crisis_narrative(self._crisis_headlines(df))
+                self.cache.set(cache_key, analysis)
             
             # Determinar nivel de riesgo
             if "CRÍTICO" in analysis.upper():
@@ -149,3 +414,22 @@ class DeepSeekAnalyzer:
                 "negative_news": negative_count,
                 "total_news": total
             }
+    
+    def _crisis_narrative(self, recent_headlines: str) -> str:
+        """Análisis contextual con DeepSeek"""
+        response = self._chat(
+            "crisis",
+            messages=[
+                {
+                    "role": "system", 
+                    "content": "Eres un analista de riesgos. Evalúa el riesgo de crisis (social/económica/política) basado en titulares. Responde con: BAJO, MEDIO, ALTO o CRÍTICO, seguido de 1-2 oraciones explicando por qué."
+                },
+                {
+                    "role": "user", 
+                    "content": f"Evalúa el riesgo de crisis:\n\n{recent_headlines}"
+                }
+            ],
+            max_tokens=150,
+            temperature=0.2
+        )
+        return response.choices[0].message.content
@@ -0,0 +1,225 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.settings import ENTRY_STORE_MAX_PER_SOURCE, INGEST_INTERVAL
+from modules.html_text import sanitize_summary
+from modules.telemetry import count, span
+from modules.text_index import InvertedIndex
+from modules.timestamps import entry_timestamp, within
+
+
+class StoredEntry:
+    """Entrada de un feed directo en memoria; con __slots__ ocupa una fracción de un dict"""
+
+    __slots__ = ('doc_id', 'title', 'link', 'published', 'published_dt', 'summary',
+                 'source', 'source_url', 'category', 'ingested_at')
+
+    def __init__(self, doc_id: int, title: str, link: str, published: str, published_dt: Optional[datetime],
+                 summary: str, source: str, source_url: str, category: str, ingested_at: float):
+        self.doc_id = doc_id
+        self.title = title
+        self.link = link
+        self.published = published
+        self.published_dt = published_dt
+        self.summary = summary
+        self.source = source
+        self.source_url = source_url
+        self.category = category
+        self.ingested_at = ingested_at
+
+
+class EntryStore:
+    """Almacén en memoria de las entradas de los feeds directos, compartido por todas las búsquedas"""
+
+    def __init__(self, max_per_source: int = ENTRY_STORE_MAX_PER_SOURCE):
+        self.max_per_source = max_per_source
+        self._lock = threading.RLock()
+        self._entries: Dict[str, StoredEntry] = {}
+        self._by_source: Dict[str, List[str]] = {}
+        self._refreshed_at: Dict[str, float] = {}
+        self._index = InvertedIndex()
+        self._doc_ids: Dict[int, str] = {}
+        self._next_doc_id = 0
+
+    def _entry_id(self, entry) -> str:
+        return entry.get('link') or entry.get('id') or entry.get('title', '')
+
+    def add_feed(self, category: str, source: Dict, feed) -> int:
+        """Incorpora las entradas de un feed recién descargado; devuelve cuántas son nuevas"""
+        url = source['url']
+        now = time.time()
+        feed_ids = []
+        seen = set()
+        new_count = 0
+
+        with self._lock:
+            for entry in feed.entries:
+                entry_id = self._entry_id(entry)
+                if not entry_id or entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                title = entry.get('title', '')
+                # Texto limpio desde el inicio: el índice cuenta menciones sobre texto, no sobre HTML
+                summary = sanitize_summary(entry.get('summary', ''))
+                previous = self._entries.get(entry_id)
+                if previous is None:
+                    new_count += 1
+                    doc_id = self._next_doc_id
+                    self._next_doc_id += 1
+                    self._doc_ids[doc_id] = entry_id
+                else:
+                    doc_id = previous.doc_id
+
+                # Solo se reindexa lo nuevo o lo que cambió
+                if previous is None or previous.title != title or previous.summary != summary:
+                    self._index.add(doc_id, title, summary)
+
+                self._entries[entry_id] = StoredEntry(
+                    doc_id=doc_id,
+                    title=title,
+                    link=entry.get('link', ''),
+                    published=entry.get('published', ''),
+                    # Fecha normalizada una sola vez, al ingerir
+                    published_dt=entry_timestamp(entry),
+                    summary=summary,
+                    # Medio, URL y categoría son los mismos objetos str de la configuración
+                    source=source['name'],
+                    source_url=url,
+                    category=category,
+                    ingested_at=now
+                )
+                feed_ids.append(entry_id)
+
+            # Lo que el feed ya no expone se conserva detrás, hasta el tope por fuente
+            previous = [i for i in self._by_source.get(url, []) if i not in seen]
+            ordered = feed_ids + previous
+            for entry_id in ordered[self.max_per_source:]:
+                self._evict(entry_id)
+            self._by_source[url] = ordered[:self.max_per_source]
+            self._refreshed_at[url] = now
+
+        return new_count
+
+    def _evict(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            self._index.remove(entry.doc_id)
+            self._doc_ids.pop(entry.doc_id, None)
+
+    def has_source(self, url: str) -> bool:
+        with self._lock:
+            return url in self._refreshed_at
+
+    def iter_entries(self, sources: List[Tuple[str, Dict]]) -> Iterator[StoredEntry]:
+        """Entradas de las fuentes pedidas, en el orden de la configuración"""
+        with self._lock:
+            ids = dict.fromkeys(
+                entry_id
+                for _, source in sources
+                for entry_id in self._by_source.get(source['url'], [])
+            )
+            snapshot = [self._entries[entry_id] for entry_id in ids if entry_id in self._entries]
+        return iter(snapshot)
+
+    def search(self, sources: List[Tuple[str, Dict]], query: str,
+               since: Optional[datetime] = None, min_matches: int = 1) -> List[Tuple[StoredEntry, int]]:
+        """(entrada, menciones) que cumplen la consulta, vía índice invertido
+
+        El costo depende de las listas de postings involucradas, no del tamaño del store.
+        Con since, las entradas anteriores (o sin fecha) se descartan aquí mismo, igual
+        que las que mencionan el término menos de min_matches veces.
+        """
+        urls = {source['url'] for _, source in sources}
+        with self._lock:
+            matches = self._index.search(query)
+            results = []
+            for doc_id in sorted(matches):
+                if matches[doc_id] < min_matches:
+                    continue
+                entry = self._entries.get(self._doc_ids.get(doc_id))
+                if entry is not None and entry.source_url in urls and within(entry.published_dt, since):
+                    results.append((entry, matches[doc_id]))
+        return results
+
+    def search_many(self, sources: List[Tuple[str, Dict]], queries: List[str],
+                    since: Optional[datetime] = None, min_matches: int = 1) -> List[Tuple[StoredEntry, str, int]]:
+        """(entrada, consulta, menciones) de varias consultas en una sola pasada sobre el store
+
+        Cada consulta es una búsqueda en el índice (costo según sus postings); las
+        entradas se resuelven y filtran una vez aunque coincidan con varias consultas.
+        Resultados en orden de entrada y, dentro de cada una, en el orden de queries.
+        """
+        urls = {source['url'] for _, source in sources}
+        with self._lock:
+            hits: Dict[int, List[Tuple[str, int]]] = {}
+            for query in dict.fromkeys(queries):
+                for doc_id, count in self._index.search(query).items():
+                    if count >= min_matches:
+                        hits.setdefault(doc_id, []).append((query, count))
+
+            results = []
+            for doc_id in sorted(hits):
+                entry = self._entries.get(self._doc_ids.get(doc_id))
+                if entry is None or entry.source_url not in urls or not within(entry.published_dt, since):
+                    continue
+                results.extend((entry, query, count) for query, count in hits[doc_id])
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class FeedIngestor:
+    """Hilo que refresca periódicamente todas las fuentes configuradas en un EntryStore"""
+
+    def __init__(self, fetcher, store: EntryStore, sources: List[Tuple[str, Dict]],
+                 interval: float = INGEST_INTERVAL):
+        self.fetcher = fetcher
+        self.store = store
+        self.sources = sources
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self, sources: List[Tuple[str, Dict]] = None) -> int:
+        """Descarga en paralelo las fuentes (todas por defecto) y las guarda en el store"""
+        sources = self.sources if sources is None else sources
+        new_entries = 0
+
+        jobs = [(i, source['url']) for i, (_, source) in enumerate(sources)]
+        with span("ingest_refresh"):
+            for i, feed, error in self.fetcher.fetch_many(jobs):
+                category, source = sources[i]
+                if error is not None:
+                    count("feed_errors_total", source=source['name'])
+                    print(f"Error en {source['name']}: {error}")
+                    continue
+                with span("feed_index", source=source['name']):
+                    added = self.store.add_feed(category, source, feed)
+                count("entries_ingested_total", added, source=source['name'])
+                new_entries += added
+
+        return new_entries
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                new_entries = self.refresh()
+                print(f"📥 Ingesta: {new_entries} entradas nuevas en {time.time() - started:.1f}s")
+            except Exception as e:
+                print(f"Error en ingesta de feeds: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feed-ingestor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import feedparser
+
+from config.settings import (
+    FEED_CACHE_DIR,
+    FEED_CACHE_FRESH_TTL,
+    FEED_CACHE_MAX_AGE,
+    FEED_CACHE_MAX_BYTES,
+)
+
+
+class FeedCache:
+    """Caché en disco de feeds RSS con validadores HTTP (ETag / Last-Modified)
+
+    Por cada URL guarda el cuerpo crudo (<hash>.xml) y sus metadatos (<hash>.json).
+    Los feeds ya parseados se mantienen en memoria para reutilizarlos ante un 304.
+    """
+
+    def __init__(self, cache_dir: str = FEED_CACHE_DIR,
+                 fresh_ttl: float = FEED_CACHE_FRESH_TTL,
+                 max_age: float = FEED_CACHE_MAX_AGE,
+                 max_bytes: int = FEED_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.fresh_ttl = fresh_ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Dict] = {}
+        self._parsed: Dict[str, feedparser.FeedParserDict] = {}
+        self._load_index()
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.xml"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_index(self):
+        """Lee los metadatos existentes en disco (sobrevive reinicios)"""
+        for meta_path in self.cache_dir.glob("*.json"):
+            try:
+                meta = json.loads(meta_path.read_text(encoding='utf-8'))
+                self._meta[meta_path.stem] = meta
+            except Exception as e:
+                print(f"Caché de feeds: metadatos ilegibles en {meta_path.name}: {e}")
+                meta_path.unlink(missing_ok=True)
+
+    def _write_meta(self, key: str, meta: Dict):
+        tmp_path = self._meta_path(key).with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta), encoding='utf-8')
+        tmp_path.replace(self._meta_path(key))
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Metadatos de la URL, o None si no está en caché"""
+        with self._lock:
+            return self._meta.get(self._key(url))
+
+    def is_fresh(self, meta: Dict) -> bool:
+        return time.time() - meta.get('fetched_at', 0) < self.fresh_ttl
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Headers If-None-Match / If-Modified-Since para un GET condicional"""
+        meta = self.lookup(url)
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load(self, url: str) -> Optional[feedparser.FeedParserDict]:
+        """Feed parseado desde memoria, o desde el cuerpo en disco si hace falta"""
+        key = self._key(url)
+        with self._lock:
+            meta = self._meta.get(key)
+            if meta is None:
+                return None
+            meta['last_used'] = time.time()
+            parsed = self._parsed.get(key)
+        if parsed is not None:
+            return parsed
+
+        try:
+            body = self._body_path(key).read_bytes()
+        except OSError:
+            return None
+        parsed = feedparser.parse(body, response_headers=meta.get('headers', {}))
+        with self._lock:
+            self._parsed[key] = parsed
+        return parsed
+
+    def store(self, url: str, body: bytes, headers: Dict, parsed: feedparser.FeedParserDict):
+        """Guarda un feed recién descargado (respuesta 200)"""
+        key = self._key(url)
+        now = time.time()
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag') or headers.get('etag'),
+            'last_modified': headers.get('Last-Modified') or headers.get('last-modified'),
+            'headers': {k: v for k, v in headers.items() if k.lower() in ('content-type', 'content-location')},
+            'size': len(body),
+            'fetched_at': now,
+            'last_used': now
+        }
+
+        with self._lock:
+            self._body_path(key).write_bytes(body)
+            self._write_meta(key, meta)
+            self._meta[key] = meta
+            self._parsed[key] = parsed
+            self._evict()
+
+    def touch(self, url: str):
+        """Marca el feed como revalidado (respuesta 304)"""
+        key = self._key(url)
+        with self._lock:
+            meta = self._meta.get(key)
+            if meta is None:
+                return
+            meta['fetched_at'] = meta['last_used'] = time.time()
+            self._write_meta(key, meta)
+
+    def _drop(self, key: str):
+        self._meta.pop(key, None)
+        self._parsed.pop(key, None)
+        self._body_path(key).unlink(missing_ok=True)
+        self._meta_path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        """Elimina entradas vencidas y, si se supera max_bytes, las menos usadas"""
+        now = time.time()
+        for key in [k for k, m in self._meta.items() if now - m.get('fetched_at', 0) > self.max_age]:
+            self._drop(key)
+
+        total = sum(m.get('size', 0) for m in self._meta.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._meta, key=lambda k: self._meta[k].get('last_used', 0)):
+            total -= self._meta[key].get('size', 0)
+            self._drop(key)
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,136 @@
+import contextvars
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import feedparser
+import requests
+
+from modules.feed_cache import FeedCache
+from modules.telemetry import count, span
+from config.settings import (
+    DOMAIN_MIN_INTERVAL,
+    FETCH_CONNECT_TIMEOUT,
+    FETCH_MAX_BYTES,
+    FETCH_MAX_WORKERS,
+    FETCH_TIMEOUT,
+)
+
+
+class DomainRateLimiter:
+    """Espacia los requests a un mismo dominio sin bloquear a los demás"""
+
+    def __init__(self, min_interval: float = DOMAIN_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, url: str):
+        """Reserva el siguiente turno del host y duerme hasta que llegue"""
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            with span("politeness_wait", host=host):
+                time.sleep(delay)
+
+
+class FeedFetcher:
+    """Descarga y parsea feeds RSS en paralelo, con timeout por feed"""
+
+    def __init__(self, session: requests.Session,
+                 max_workers: int = FETCH_MAX_WORKERS,
+                 timeout: float = FETCH_TIMEOUT,
+                 rate_limiter: Optional[DomainRateLimiter] = None,
+                 cache: Optional[FeedCache] = None):
+        self.session = session
+        self.cache = cache
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or DomainRateLimiter()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="feed")
+
+    def _download(self, url: str, headers: Optional[Dict] = None) -> Tuple[int, bytes, Dict]:
+        """Descarga el cuerpo del feed respetando un plazo total de self.timeout"""
+        self.rate_limiter.wait(url)
+        deadline = time.monotonic() + self.timeout
+
+        with self.session.get(
+            url,
+            headers=headers,
+            timeout=(min(FETCH_CONNECT_TIMEOUT, self.timeout), self.timeout),
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            if response.status_code == 304:
+                return 304, b"", dict(response.headers)
+
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=16384):
+                chunks.append(chunk)
+                size += len(chunk)
+                # El timeout de requests es por lectura; este corta a los medios que "gotean" bytes
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"el feed superó {self.timeout:.0f}s")
+                if size > FETCH_MAX_BYTES:
+                    raise ValueError(f"el feed supera {FETCH_MAX_BYTES} bytes")
+
+            count("feed_bytes_total", size, host=urllib.parse.urlsplit(url).netloc.lower())
+            return response.status_code, b"".join(chunks), dict(response.headers)
+
+    def _parse(self, host: str, body: bytes, headers: Dict) -> feedparser.FeedParserDict:
+        with span("feed_parse", host=host):
+            parsed = feedparser.parse(body, response_headers=headers)
+        count("feed_entries_total", len(parsed.entries), host=host)
+        return parsed
+
+    def fetch(self, url: str) -> feedparser.FeedParserDict:
+        """Descarga y parsea un feed en el hilo actual, usando la caché si existe"""
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with span("feed_fetch", host=host):
+            return self._fetch(url, host)
+
+    def _fetch(self, url: str, host: str) -> feedparser.FeedParserDict:
+        if self.cache is None:
+            _, body, headers = self._download(url)
+            return self._parse(host, body, headers)
+
+        meta = self.cache.lookup(url)
+        if meta and self.cache.is_fresh(meta):
+            cached = self.cache.load(url)
+            if cached is not None:
+                count("feed_cache_hits_total", kind="fresh")
+                return cached
+
+        status, body, headers = self._download(url, self.cache.conditional_headers(url))
+        if status == 304:
+            cached = self.cache.load(url)
+            if cached is not None:
+                count("feed_cache_hits_total", kind="not_modified")
+                self.cache.touch(url)
+                return cached
+            # El cuerpo en disco desapareció: se pide completo de nuevo
+            status, body, headers = self._download(url)
+
+        count("feed_cache_misses_total")
+        parsed = self._parse(host, body, headers)
+        self.cache.store(url, body, headers, parsed)
+        return parsed
+
+    def fetch_many(self, jobs: Iterable[Tuple[Any, str]]) -> Iterator[Tuple[Any, Optional[feedparser.FeedParserDict], Optional[Exception]]]:
+        """Descarga todos los feeds en paralelo y entrega (clave, feed, error) a medida que terminan"""
+        # Cada descarga corre con una copia del contexto: sus spans quedan en la traza de quien la pidió
+        futures = {self.executor.submit(contextvars.copy_context().run, self.fetch, url): key for key, url in jobs}
+
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                yield key, future.result(), None
+            except Exception as e:
+                yield key, None, e
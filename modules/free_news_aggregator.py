@@ -1,12 +1,21 @@
-import feedparser
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pandas as pd
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import math
 import urllib.parse
-import time
 import re
+from functools import lru_cache
+
+from config.settings import NEWS_QUERY_OR_TERMS
+from modules.entry_store import EntryStore, FeedIngestor
+from modules.feed_cache import FeedCache
+from modules.feed_fetcher import FeedFetcher
+from modules.html_text import sanitize_summary
+from modules.telemetry import count, span
+from modules.text_index import InvertedIndex, phrase_regex, positive_phrases
+from modules.timestamps import entry_timestamp, within
+from modules.url_canonicalizer import UrlResolver
 
 class FreeNewsAggregator:
     """Agregador de noticias 100% gratuito usando RSS y scraping ético"""
@@ -16,28 +25,140 @@ class FreeNewsAggregator:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (compatible; NewsMonitorBot/1.0)'
         })
+        self.fetcher = FeedFetcher(self.session, cache=FeedCache())
+        self.store = EntryStore()
+        self.ingestor = FeedIngestor(self.fetcher, self.store, [])
+        # Las redirecciones (opcionales) comparten el turno por dominio de las descargas
+        self.urls = UrlResolver(self.session, rate_limiter=self.fetcher.rate_limiter)
+    
+    def start_ingestion(self, sources: Dict):
+        """Arranca el refresco periódico de los feeds directos en segundo plano"""
+        self.ingestor.sources = self._rss_jobs(sources)
+        self.ingestor.start()
+    
+    def _or_query(self, keywords: List[str]) -> str:
+        """Varios términos en una sola consulta: (a) OR (b) OR ..."""
+        if len(keywords) == 1:
+            return keywords[0]
+        return " OR ".join(f"({keyword})" for keyword in keywords)
+    
+    def _keyword_groups(self, keywords: List[str]) -> List[List[str]]:
+        """Términos agrupados de a NEWS_QUERY_OR_TERMS para las consultas a Google/Bing"""
+        size = max(1, NEWS_QUERY_OR_TERMS)
+        return [keywords[i:i + size] for i in range(0, len(keywords), size)]
+    
+    def _attribute(self, entries: List, keywords: List[str], summary_field: str) -> Iterator[Tuple[object, str]]:
+        """(entrada, término) de un feed consultado con varios términos unidos por OR
+
+        El agregador no dice qué término trajo cada entrada: se reconstruye con un
+        índice temporal sobre título y bajada, con la misma sintaxis que el store.
+        Lo que no menciona ningún término en esos campos (coincidió en el cuerpo) no
+        se puede atribuir y se omite; con un solo término se conserva todo.
+        """
+        if len(keywords) == 1:
+            for entry in entries:
+                yield entry, keywords[0]
+            return
+        index = InvertedIndex()
+        for doc_id, entry in enumerate(entries):
+            index.add(doc_id, entry.get('title', ''), sanitize_summary(entry.get(summary_field, '')))
+        matches = {keyword: index.search(keyword) for keyword in keywords}
+        for doc_id, entry in enumerate(entries):
+            for keyword in keywords:
+                if doc_id in matches[keyword]:
+                    yield entry, keyword
+    
+    def _google_news_url(self, keyword: str, country: str = "CL", language: str = "es-419",
+                         since: Optional[datetime] = None) -> str:
+        """keyword puede ser una consulta combinada con OR (ver _or_query)"""
+        query = f"({keyword}) Chile" if " OR " in keyword else f"{keyword} Chile"
+        if since is not None:
+            # Google filtra del lado del servidor: el tope de 50 entradas se llena con la ventana pedida
+            # (el margen evita pedir un día de más por los segundos transcurridos desde el corte)
+            days = max(1, math.ceil((datetime.now(timezone.utc) - since).total_seconds() / 86400 - 0.01))
+            query += f" when:{days}d"
+        query = urllib.parse.quote(query)
+        return f"https://news.google.com/rss/search?q={query}&hl=es-{country}&gl={country}&ceid={country}:{language}"
+    
+    def _parse_google_news(self, feed, keywords: List[str], since: Optional[datetime] = None) -> Iterator[Dict]:
+        for entry, keyword in self._attribute(feed.entries[:50], keywords, 'summary'):
+            published_dt = entry_timestamp(entry)
+            if not within(published_dt, since):
+                continue
+            yield {
+                'title': entry.get('title', ''),
+                'link': entry.get('link', ''),
+                'published': entry.get('published', ''),
+                'published_dt': published_dt,
+                'summary': sanitize_summary(entry.get('summary', '')),
+                'source': entry.get('source', {}).get('title', 'Google News') if isinstance(entry.get('source'), dict) else 'Google News',
+                'origin': 'google',
+                'keyword': keyword,
+                'keyword_matches': 1
+            }
+    
+    def _bing_news_url(self, keyword: str) -> str:
+        query = urllib.parse.quote(keyword)
+        return f"https://www.bing.com/news/search?q={query}&format=rss"
+    
+    def _parse_bing_news(self, feed, keywords: List[str], since: Optional[datetime] = None) -> Iterator[Dict]:
+        for entry, keyword in self._attribute(feed.entries[:30], keywords, 'description'):
+            published_dt = entry_timestamp(entry)
+            if not within(published_dt, since):
+                continue
+            yield {
+                'title': entry.get('title', ''),
+                'link': entry.get('link', ''),
+                'published': entry.get('published', ''),
+                'published_dt': published_dt,
+                'summary': sanitize_summary(entry.get('description', '')),
+                'source': 'Bing News',
+                'origin': 'bing',
+                'keyword': keyword,
+                'keyword_matches': 1
+            }
+    
+    def _search_store(self, rss_sources: List[Tuple[str, Dict]], keywords: List[str],
+                      since: Optional[datetime] = None, min_matches: int = 1) -> Iterator[Dict]:
+        """Consulta el índice del store; las menciones salen directamente de los postings
+
+        Una fila por (entrada, término) que coincide.
+        """
+        for entry, keyword, keyword_count in self.store.search_many(rss_sources, keywords, since=since,
+                                                                    min_matches=min_matches):
+            yield {
+                'title': entry.title,
+                'link': entry.link,
+                'published': entry.published,
+                'published_dt': entry.published_dt,
+                'summary': entry.summary,
+                'source': entry.source,
+                'category': entry.category,
+                'origin': 'rss',
+                'keyword': keyword,
+                'keyword_matches': keyword_count
+            }
+    
+    def _ingest_feed(self, category: str, source: Dict, feed, keywords: List[str],
+                     since: Optional[datetime] = None, min_matches: int = 1) -> Iterator[Dict]:
+        """Guarda un feed directo en el store y devuelve sus coincidencias, vía la consulta en memoria"""
+        self.store.add_feed(category, source, feed)
+        return self._search_store([(category, source)], keywords, since, min_matches)
+    
+    def _rss_jobs(self, sources: Dict) -> List[Tuple[str, Dict]]:
+        """Lista plana de (categoría, fuente) para los feeds RSS directos"""
+        return [
+            (category, source)
+            for category, source_list in sources.items()
+            for source in source_list
+            if source['type'] == 'rss'
+        ]
     
     def search_google_news_rss(self, keyword: str, country: str = "CL", language: str = "es-419") -> List[Dict]:
         """Busca en Google News usando RSS (GRATIS)"""
         try:
-            query = urllib.parse.quote(f"{keyword} Chile")
-            url = f"https://news.google.com/rss/search?q={query}&hl=es-{country}&gl={country}&ceid={country}:{language}"
-            
-            feed = feedparser.parse(url)
-            results = []
-            
-            for entry in feed.entries[:50]:
-                results.append({
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'published': entry.get('published', ''),
-                    'summary': entry.get('summary', ''),
-                    'source': entry.get('source', {}).get('title', 'Google News') if isinstance(entry.get('source'), dict) else 'Google News',
-                    'keyword': keyword,
-                    'keyword_matches': 1
-                })
-            
-            return results
+            feed = self.fetcher.fetch(self._google_news_url(keyword, country, language))
+            return list(self._parse_google_news(feed, [keyword]))
         except Exception as e:
             print(f"Error en Google News RSS: {e}")
             return []
@@ -45,104 +166,169 @@ class FreeNewsAggregator:
     def search_bing_news_rss(self, keyword: str) -> List[Dict]:
         """Busca en Bing News usando RSS (GRATIS)"""
         try:
-            query = urllib.parse.quote(keyword)
-            url = f"https://www.bing.com/news/search?q={query}&format=rss"
-            
-            feed = feedparser.parse(url)
-            results = []
-            
-            for entry in feed.entries[:30]:
-                results.append({
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'published': entry.get('published', ''),
-                    'summary': entry.get('description', ''),
-                    'source': 'Bing News',
-                    'keyword': keyword,
-                    'keyword_matches': 1
-                })
-            
-            return results
+            feed = self.fetcher.fetch(self._bing_news_url(keyword))
+            return list(self._parse_bing_news(feed, [keyword]))
         except Exception as e:
             print(f"Error en Bing News: {e}")
             return []
     
     def search_chilean_rss_with_keyword(self, sources: Dict, keyword: str) -> List[Dict]:
-        """Busca keyword en feeds RSS chilenos directos (GRATIS)"""
-        results = []
-        
-        for category, source_list in sources.items():
-            for source in source_list:
-                if source['type'] == 'rss':
-                    try:
-                        feed = feedparser.parse(source['url'])
-                        
-                        for entry in feed.entries:
-                            title = entry.get('title', '').lower()
-                            summary = entry.get('summary', '').lower()
-                            
-                            # Buscar keyword (case insensitive)
-                            if keyword.lower() in title or keyword.lower() in summary:
-                                keyword_count = title.count(keyword.lower()) + summary.count(keyword.lower())
-                                
-                                results.append({
-                                    'title': entry.get('title', ''),
-                                    'link': entry.get('link', ''),
-                                    'published': entry.get('published', ''),
-                                    'summary': entry.get('summary', ''),
-                                    'source': source['name'],
-                                    'category': category,
-                                    'keyword': keyword,
-                                    'keyword_matches': keyword_count
-                                })
-                        
-                        time.sleep(0.3)  # Ser respetuoso
-                    except Exception as e:
-                        print(f"Error en {source['name']}: {e}")
+        """Busca keyword en feeds RSS chilenos directos (GRATIS)
+
+        La búsqueda se hace en memoria sobre el índice del store (sin tildes, admite
+        frases y AND/OR/NOT); solo se descargan las fuentes que la ingesta aún no ha traído.
+        """
+        rss_sources = self._rss_jobs(sources)
+        missing = [(c, s) for c, s in rss_sources if not self.store.has_source(s['url'])]
+        if missing:
+            self.ingestor.refresh(missing)
         
-        return results
+        return list(self._search_store(rss_sources, [keyword]))
     
-    def aggregate_all_free(self, keyword: str, sources: Dict, 
-                          use_google_news: bool = True, 
-                          use_bing_news: bool = False) -> pd.DataFrame:
-        """Agrega noticias de TODAS las fuentes gratuitas"""
-        all_results = []
-        
-        # Google News
-        if use_google_news:
-            print(f"🔍 Buscando en Google News...")
-            google_results = self.search_google_news_rss(keyword)
-            all_results.extend(google_results)
+    def _to_frame(self, records, seen: Set[Tuple[str, str]]) -> Optional[pd.DataFrame]:
+        """Filas nuevas de un lote: fechas UTC, link canónico y sin (link, término) ya entregados"""
+        df = pd.DataFrame(list(records))
+        if df.empty:
+            return None
+        df['published_dt'] = pd.to_datetime(df['published_dt'], utc=True)
+        df['fetched_at'] = datetime.now()
         
-        # Bing News
-        if use_bing_news:
-            print(f"🔍 Buscando en Bing News...")
-            bing_results = self.search_bing_news_rss(keyword)
-            all_results.extend(bing_results)
+        # Link canónico: la misma nota vía Google, Bing o el feed del medio queda con una sola URL
+        with span("url_resolve"):
+            df['link'] = self.urls.resolve_many(df['link'].fillna('').tolist())
         
-        # Medios chilenos directos
-        print(f"🔍 Buscando en medios chilenos...")
-        chilean_results = self.search_chilean_rss_with_keyword(sources, keyword)
-        all_results.extend(chilean_results)
+        # Eliminar duplicados exactos; las copias de una misma historia se agrupan
+        # después (story_clusters) para no perder la cobertura por medio
+        df = df.drop_duplicates(subset=['link', 'keyword'], keep='first')
+        delivered = pd.Series(list(zip(df['link'], df['keyword'])), index=df.index).isin(seen)
+        df = df[~delivered]
+        if df.empty:
+            return None
+        seen.update(zip(df['link'], df['keyword']))
         
-        if not all_results:
-            return pd.DataFrame()
+        # Calcular relevancia
+        df['relevance_score'] = df.get('keyword_matches', 1)
+        return df
+    
+    def iter_results(self, keyword: str, sources: Dict,
+                     use_google_news: bool = True,
+                     use_bing_news: bool = False,
+                     since: Optional[datetime] = None,
+                     min_matches: int = 1) -> Iterator[pd.DataFrame]:
+        """Entrega lotes de resultados a medida que están disponibles (ver iter_results_many)"""
+        return self.iter_results_many([keyword], sources, use_google_news, use_bing_news,
+                                      since, min_matches)
+    
+    def iter_results_many(self, keywords: List[str], sources: Dict,
+                          use_google_news: bool = True,
+                          use_bing_news: bool = False,
+                          since: Optional[datetime] = None,
+                          min_matches: int = 1) -> Iterator[pd.DataFrame]:
+        """Entrega lotes de resultados de uno o varios términos a medida que están disponibles
+
+        Primero lo que ya está en memoria (sin esperar a la red) y luego un lote por
+        cada feed que termina de descargarse. Cada feed directo se descarga una sola
+        vez y se consulta con todos los términos; Google y Bing reciben los términos
+        unidos por OR, de a NEWS_QUERY_OR_TERMS por consulta. Cada fila lleva en
+        keyword el término con que coincidió (una nota que menciona dos términos sale
+        dos veces). Los filtros se aplican mientras se recorren los feeds, antes de
+        crear filas: since (datetime UTC) descarta lo anterior, min_matches lo que
+        menciona menos veces el término y sources ya trae solo las categorías pedidas.
+        published_dt sale como datetime64[ns, UTC].
+        """
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+        if not keywords:
+            return
+        # Google y Bing dependen de los términos; se descargan en paralelo junto con los
+        # feeds directos que todavía no estén en el store. Sus entradas cuentan siempre
+        # una mención, así que con min_matches > 1 ni se piden.
+        rss_sources = self._rss_jobs(sources)
+        handlers = []
+        use_google_news = use_google_news and min_matches <= 1
+        use_bing_news = use_bing_news and min_matches <= 1
+        for group in self._keyword_groups(keywords):
+            query = self._or_query(group)
+            if use_google_news:
+                handlers.append(("Google News", self._google_news_url(query, since=since),
+                                 lambda feed, g=group: self._parse_google_news(feed, g, since)))
+            if use_bing_news:
+                handlers.append(("Bing News", self._bing_news_url(query),
+                                 lambda feed, g=group: self._parse_bing_news(feed, g, since)))
+        for category, source in rss_sources:
+            if not self.store.has_source(source['url']):
+                handlers.append((source['name'], source['url'],
+                                 lambda feed, c=category, s=source:
+                                     self._ingest_feed(c, s, feed, keywords, since, min_matches)))
         
-        df = pd.DataFrame(all_results)
-        df['fetched_at'] = datetime.now()
+        label = keywords[0] if len(keywords) == 1 else f"{len(keywords)} términos"
+        print(f"🔍 Buscando '{label}' ({len(handlers)} descargas, {len(self.store)} entradas en memoria)...")
+        # La ingesta en segundo plano puede traer una entrada dos veces: se entrega solo la primera
+        seen: Set[Tuple[str, str]] = set()
         
-        # Eliminar duplicados
-        df = df.drop_duplicates(subset=['title'], keep='first')
+        with span("store_search"):
+            batch = self._to_frame(self._search_store(rss_sources, keywords, since, min_matches), seen)
+        if batch is not None:
+            yield batch
         
-        # Calcular relevancia
-        df['relevance_score'] = df.get('keyword_matches', 1)
-        df = df.sort_values('relevance_score', ascending=False)
+        for i, feed, error in self.fetcher.fetch_many((i, url) for i, (_, url, _) in enumerate(handlers)):
+            name, _, parse = handlers[i]
+            if error is not None:
+                count("feed_errors_total", source=name)
+                print(f"Error en {name}: {error}")
+                continue
+            # Coincidencias del feed y su lote (incluye guardarlo en el store si es directo)
+            with span("feed_match", source=name):
+                batch = self._to_frame(parse(feed), seen)
+            if batch is not None:
+                yield batch
+    
+    def aggregate_all_free(self, keyword: str, sources: Dict, 
+                          use_google_news: bool = True, 
+                          use_bing_news: bool = False,
+                          since: Optional[datetime] = None,
+                          min_matches: int = 1) -> pd.DataFrame:
+        """Agrega noticias de TODAS las fuentes gratuitas (todos los lotes de iter_results)"""
+        return self.aggregate_many([keyword], sources, use_google_news, use_bing_news,
+                                   since, min_matches)
+    
+    def aggregate_many(self, keywords: List[str], sources: Dict,
+                       use_google_news: bool = True,
+                       use_bing_news: bool = False,
+                       since: Optional[datetime] = None,
+                       min_matches: int = 1) -> pd.DataFrame:
+        """Agrega noticias de varios términos en una sola pasada por las fuentes
+
+        Una fila por (noticia, término), ordenadas por relevancia.
+        """
+        frames = list(self.iter_results_many(keywords, sources, use_google_news, use_bing_news,
+                                             since, min_matches))
+        if not frames:
+            return pd.DataFrame()
         
-        return df
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values('relevance_score', ascending=False)
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def highlight_pattern(keywords: Tuple[str, ...]) -> Optional[re.Pattern]:
+        """Regex de las frases no negadas de las consultas (misma sintaxis y plegado que
+        el índice: sin tildes ni mayúsculas, prefijo*); las más largas primero"""
+        phrases = {tuple(words) for keyword in keywords for words in positive_phrases(keyword)}
+        if not phrases:
+            return None
+        ordered = sorted(phrases, key=lambda words: (len(words), len("".join(words))), reverse=True)
+        return re.compile("|".join(phrase_regex(list(words)) for words in ordered), re.IGNORECASE)
     
     def highlight_keyword(self, text: str, keyword: str) -> str:
         """Resalta el keyword en el texto"""
-        if not text:
+        if not text or not keyword:
             return text
-        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-        return pattern.sub(lambda m: f"**{m.group()}**", text)
+        pattern = self.highlight_pattern((keyword,))
+        return pattern.sub(lambda m: f"**{m.group()}**", text) if pattern else text
+    
+    def highlight_series(self, texts: pd.Series, keywords: List[str]) -> pd.Series:
+        """highlight_keyword sobre una columna completa y varios términos a la vez"""
+        pattern = self.highlight_pattern(tuple(k for k in keywords if k))
+        if pattern is None:
+            return texts
+        return texts.fillna('').astype(str).str.replace(pattern, r"**\g<0>**", regex=True)
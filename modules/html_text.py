@@ -0,0 +1,51 @@
+"""Texto limpio a partir del HTML de summary/description de los feeds
+
+Los feeds traen la bajada como HTML (enlaces, <font>, <img>, entidades). Se limpia
+una sola vez al ingerir: así el índice cuenta menciones sobre texto, el dashboard
+no muestra marcas y los prompts no gastan tokens en HTML.
+"""
+import html
+import re
+from functools import lru_cache
+
+from config.settings import SUMMARY_MAX_TOKENS
+
+# Misma estimación que usa DeepSeekAnalyzer para reservar presupuesto (~3 caracteres por token)
+CHARS_PER_TOKEN = 3
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_DROP_RE = re.compile(r"<(script|style)\b[^>]*>.*?</\1\s*>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def strip_html(text: str) -> str:
+    """Sin etiquetas, con entidades decodificadas y espacios colapsados"""
+    if not text:
+        return ""
+    if "<" in text:
+        text = _COMMENT_RE.sub(" ", text)
+        text = _DROP_RE.sub(" ", text)
+        text = _TAG_RE.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return " ".join(text.split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens aproximados de un texto, sin tokenizador"""
+    return len(text) // CHARS_PER_TOKEN if text else 0
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Corta en un límite de palabra para no pasar de max_tokens (estimados)"""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if max_tokens <= 0 or len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip(" ,;:.") + "…"
+
+
+@lru_cache(maxsize=16384)
+def sanitize_summary(text: str, max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """strip_html + truncate_tokens; memorizado por contenido (los feeds repiten entradas en cada refresco)"""
+    return truncate_tokens(strip_html(text), max_tokens)
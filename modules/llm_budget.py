@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+from typing import Optional
+
+import openai
+
+from config.settings import (
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_MAX_RPS,
+    LLM_MAX_TPM,
+)
+
+
+class LLMBudget:
+    """Presupuesto compartido de requests/segundo y tokens/minuto (token buckets)
+
+    Todos los hilos que llaman al LLM pasan por acquire(); si no hay cupo esperan
+    lo justo en vez de provocar un 429.
+    """
+
+    def __init__(self, max_rps: float = LLM_MAX_RPS, max_tpm: float = LLM_MAX_TPM):
+        self.max_rps = max_rps
+        self.max_tpm = max_tpm
+        self._lock = threading.Lock()
+        self._requests = max_rps
+        self._tokens = max_tpm
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.max_rps, self._requests + elapsed * self.max_rps)
+        self._tokens = min(self.max_tpm, self._tokens + elapsed * self.max_tpm / 60.0)
+
+    def acquire(self, tokens: int):
+        """Bloquea hasta que haya cupo para un request de ~tokens tokens"""
+        # Un request más grande que el balde completo igual debe poder pasar
+        tokens = min(tokens, self.max_tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait_requests = (1 - self._requests) / self.max_rps if self._requests < 1 else 0
+                wait_tokens = (tokens - self._tokens) * 60.0 / self.max_tpm if self._tokens < tokens else 0
+            time.sleep(max(wait_requests, wait_tokens, 0.01))
+
+    def adjust(self, delta_tokens: int):
+        """Corrige el balde con el uso real informado por la API (positivo = se gastó más)"""
+        with self._lock:
+            self._tokens = min(self.max_tpm, self._tokens - delta_tokens)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """429, 5xx, timeouts y cortes de conexión merecen reintento; el resto no"""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """Backoff exponencial con jitter completo; respeta Retry-After si viene en la respuesta"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(LLM_BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
@@ -0,0 +1,167 @@
+"""Contabilidad de tokens y costo de DeepSeek: por búsqueda y por día
+
+Cada respuesta del LLM informa su `usage`; DeepSeekAnalyzer._chat lo registra aquí.
+El total diario vive en SQLite (lo comparten el dashboard y el monitor) y cada
+búsqueda acumula lo suyo en un SearchCost. La búsqueda activa se propaga con
+contextvars, así los hilos del AnalysisPipeline cargan el gasto a quien corresponde
+aunque varias sesiones busquen a la vez.
+"""
+import contextvars
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.settings import (
+    LLM_LEDGER_PATH,
+    LLM_PRICE_INPUT,
+    LLM_PRICE_INPUT_CACHED,
+    LLM_PRICE_OUTPUT,
+    LLM_SEARCH_TOKEN_ALERT,
+)
+
+_USAGE_FIELDS = ("calls", "prompt_tokens", "cached_tokens", "completion_tokens", "cost")
+
+_active_search: contextvars.ContextVar = contextvars.ContextVar("llm_active_search", default=None)
+
+
+def usage_tokens(usage) -> Dict[str, int]:
+    """prompt / cached / completion a partir del usage de la API (DeepSeek u OpenAI)"""
+    prompt = getattr(usage, 'prompt_tokens', None) or 0
+    completion = getattr(usage, 'completion_tokens', None) or 0
+    # DeepSeek informa prompt_cache_hit_tokens; OpenAI, prompt_tokens_details.cached_tokens
+    cached = getattr(usage, 'prompt_cache_hit_tokens', None)
+    if cached is None:
+        cached = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None)
+    return {"prompt_tokens": prompt, "cached_tokens": min(cached or 0, prompt), "completion_tokens": completion}
+
+
+def usage_cost(prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    """Costo en USD con los precios por millón de tokens de la configuración"""
+    return ((prompt_tokens - cached_tokens) * LLM_PRICE_INPUT
+            + cached_tokens * LLM_PRICE_INPUT_CACHED
+            + completion_tokens * LLM_PRICE_OUTPUT) / 1_000_000
+
+
+def _empty_totals() -> Dict:
+    return {field: 0 for field in _USAGE_FIELDS}
+
+
+class SearchCost:
+    """Lo que gastó una búsqueda (o una pasada de una vigilancia), por operación"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.time()
+        self.totals = _empty_totals()
+        self.by_operation: Dict[str, Dict] = {}
+        # Superó LLM_SEARCH_TOKEN_ALERT (se avisa una sola vez)
+        self.runaway = False
+
+    @property
+    def tokens(self) -> int:
+        return self.totals["prompt_tokens"] + self.totals["completion_tokens"]
+
+    def _add(self, operation: str, row: Dict):
+        for totals in (self.totals, self.by_operation.setdefault(operation, _empty_totals())):
+            for field in _USAGE_FIELDS:
+                totals[field] += row[field]
+
+
+class CostLedger:
+    """Registro de uso del LLM: total por día y operación en SQLite, y por búsqueda en memoria"""
+
+    def __init__(self, path: str = LLM_LEDGER_PATH, search_token_alert: int = LLM_SEARCH_TOKEN_ALERT):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.search_token_alert = search_token_alert
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_usage (
+                    day TEXT NOT NULL,
+                    operation TEXT NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    cached_tokens INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, operation)
+                )
+            """)
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def record(self, operation: str, usage) -> Dict:
+        """Suma una respuesta al día y a la búsqueda activa; devuelve lo que costó"""
+        row = {"calls": 1, **usage_tokens(usage)}
+        row["cost"] = usage_cost(row["prompt_tokens"], row["cached_tokens"], row["completion_tokens"])
+        search = _active_search.get()
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute("""
+                    INSERT INTO llm_usage (day, operation, calls, prompt_tokens, cached_tokens, completion_tokens, cost)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(day, operation) DO UPDATE SET
+                        calls = calls + excluded.calls,
+                        prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                        cached_tokens = cached_tokens + excluded.cached_tokens,
+                        completion_tokens = completion_tokens + excluded.completion_tokens,
+                        cost = cost + excluded.cost
+                """, (self._today(), operation, *(row[field] for field in _USAGE_FIELDS)))
+            if search is None:
+                return row
+            search._add(operation, row)
+            flag = not search.runaway and 0 < self.search_token_alert <= search.tokens
+            if flag:
+                search.runaway = True
+
+        if flag:
+            print(f"🔥 La búsqueda '{search.label}' ya gastó {search.tokens} tokens "
+                  f"(umbral LLM_SEARCH_TOKEN_ALERT={self.search_token_alert})")
+        return row
+
+    def day_totals(self, day: Optional[str] = None) -> Dict:
+        """Totales de un día UTC (hoy por defecto), con el desglose en "by_operation" """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT operation, {', '.join(_USAGE_FIELDS)} FROM llm_usage WHERE day = ?",
+                (day or self._today(),)
+            ).fetchall()
+        totals = _empty_totals()
+        by_operation = {}
+        for operation, *values in rows:
+            by_operation[operation] = dict(zip(_USAGE_FIELDS, values))
+            for field, value in zip(_USAGE_FIELDS, values):
+                totals[field] += value
+        totals["by_operation"] = by_operation
+        return totals
+
+    @contextmanager
+    def track(self, search: Optional[SearchCost]):
+        """Carga a `search` lo que se llame al LLM dentro del bloque (también desde hilos
+        lanzados con contextvars.copy_context) y deja una línea en el log si hubo gasto"""
+        if search is None:
+            yield None
+            return
+        before = dict(search.totals)
+        token = _active_search.set(search)
+        try:
+            yield search
+        finally:
+            _active_search.reset(token)
+            calls = search.totals["calls"] - before["calls"]
+            if calls:
+                tokens = search.tokens - before["prompt_tokens"] - before["completion_tokens"]
+                today = self.day_totals()
+                print(f"💰 '{search.label}': +{calls} llamadas, +{tokens} tokens "
+                      f"(${search.totals['cost'] - before['cost']:.4f}); búsqueda: {search.tokens} tokens "
+                      f"${search.totals['cost']:.4f}; hoy: ${today['cost']:.4f}")
@@ -0,0 +1,297 @@
+"""Clasificador local de sentimiento y emoción: léxico en español + modelo lineal sobre n-gramas hasheados
+
+Corre en CPU, sin red. Los pesos parten del léxico y se ajustan con las etiquetas
+que DeepSeek ya guardó en el ArticleStore:
+
+    python -m modules.local_classifier train
+    python -m modules.local_classifier evaluate
+"""
+import argparse
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import LOCAL_CONFIDENCE_THRESHOLD, LOCAL_MODEL_PATH
+from modules.text_index import tokenize
+
+SENTIMENTS = ['POSITIVO', 'NEGATIVO', 'NEUTRAL']
+EMOTIONS = ["RISA", "IRA", "MIEDO", "TRISTEZA", "DISGUSTO", "SORPRESA", "NEUTRAL"]
+
+N_FEATURES = 1 << 18
+# Palabras que invierten la polaridad de los términos siguientes ("no hay mejora" -> neg_mejora)
+_NEGATORS = {"no", "sin", "nunca", "jamas", "tampoco", "ni"}
+_NEGATION_WINDOW = 2
+
+# Léxico de polaridad (formas sin tildes, como las deja text_index.fold)
+_POSITIVE = """
+acuerdo alza aumento avance avances beneficio beneficios celebra celebran crecimiento crece
+destaca exito exitoso exitosa favorable gana ganan ganancia ganancias historico
+impulsa impulso inaugura inauguracion logra logro logros mejor mejora mejoras mejoran
+optimismo oportunidad positivo positiva premio recuperacion recupera repunte respaldo
+record reconocimiento solucion superavit triunfo victoria apoyo aprobado aprueba alivio
+""".split()
+_NEGATIVE = """
+accidente acusa acusan alerta amenaza asesinato ataque baja caida cae caen catastrofe
+conflicto crisis critica criticas muerte muertos muere mueren deficit delito delincuencia
+denuncia desastre desempleo despidos deuda emergencia escandalo fallece fracaso fraude
+grave herido heridos huelga incendio inflacion inseguridad investigacion negativo negativa
+paro perdida perdidas peligro polemica preocupacion problema problemas protesta
+quiebra recesion rechazo riesgo robo sequia tension terremoto tragedia violencia victimas
+""".split()
+
+_EMOTION_LEXICON = {
+    "RISA": "humor risa chiste divertido divertida comedia broma viral celebra fiesta insolito",
+    "IRA": "indignacion furia rabia molestia repudio enojo acusa acusan protesta protestas critica "
+           "criticas exige exigen rechazo abuso abusos",
+    "MIEDO": "temor miedo alerta amenaza riesgo peligro emergencia alarma incertidumbre evacuacion "
+             "inseguridad terremoto tsunami",
+    "TRISTEZA": "muerte muertos fallece fallecio luto tragedia victimas duelo pena lamenta lamentan "
+                "despedida perdida",
+    "DISGUSTO": "corrupcion escandalo fraude abuso colusion soborno verguenza repugnante asco",
+    "SORPRESA": "sorpresa inesperado inesperada sorprende sorpresivo insolito revelan revela "
+                "impactante historico inedito",
+}
+
+# Sesgo inicial hacia NEUTRAL: sin evidencia léxica el modelo duda (y el modo híbrido escala)
+_SENTIMENT_BIAS = np.array([0.0, 0.0, 0.5], dtype=np.float32)
+_EMOTION_BIAS = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5], dtype=np.float32)
+
+
+def _hash(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % N_FEATURES
+
+
+def _features(text: str) -> List[str]:
+    """Unigramas (con marca de negación) y bigramas del texto plegado"""
+    tokens = tokenize(text)
+    feats = []
+    negated = 0
+    for token in tokens:
+        if token in _NEGATORS:
+            negated = _NEGATION_WINDOW
+            continue
+        feats.append(f"neg_{token}" if negated else token)
+        negated = max(0, negated - 1)
+    feats.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return feats
+
+
+def featurize(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Matriz dispersa (fila, columna hasheada) de todos los textos, como dos arreglos paralelos"""
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        hashed = {_hash(f) for f in _features(text or "")}
+        rows.extend([row] * len(hashed))
+        cols.extend(hashed)
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _seed_weights() -> Tuple[np.ndarray, np.ndarray]:
+    """Pesos derivados solo del léxico; también sirven de prior al entrenar"""
+    sentiment = np.zeros((N_FEATURES, len(SENTIMENTS)), dtype=np.float32)
+    for words, label in ((_POSITIVE, 'POSITIVO'), (_NEGATIVE, 'NEGATIVO')):
+        opposite = 'NEGATIVO' if label == 'POSITIVO' else 'POSITIVO'
+        for word in words:
+            sentiment[_hash(word), SENTIMENTS.index(label)] += 1.5
+            sentiment[_hash(f"neg_{word}"), SENTIMENTS.index(opposite)] += 1.0
+
+    emotion = np.zeros((N_FEATURES, len(EMOTIONS)), dtype=np.float32)
+    for label, words in _EMOTION_LEXICON.items():
+        for word in words.split():
+            emotion[_hash(word), EMOTIONS.index(label)] += 1.5
+    return sentiment, emotion
+
+
+class LocalClassifier:
+    """Sentimiento y emoción de muchos textos a la vez, vectorizado con NumPy
+
+    predict() devuelve, por texto, la etiqueta más probable de cada tarea y su
+    probabilidad (softmax); el modo híbrido escala a DeepSeek las de baja confianza.
+    """
+
+    def __init__(self, model_path: str = LOCAL_MODEL_PATH,
+                 threshold: float = LOCAL_CONFIDENCE_THRESHOLD):
+        self.model_path = model_path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.trained = False
+        self.sentiment_weights, self.emotion_weights = _seed_weights()
+        self.sentiment_bias = _SENTIMENT_BIAS.copy()
+        self.emotion_bias = _EMOTION_BIAS.copy()
+        self.load()
+
+    def load(self):
+        path = Path(self.model_path)
+        if not path.exists():
+            return
+        try:
+            with np.load(path) as data:
+                if data['sentiment_weights'].shape != self.sentiment_weights.shape:
+                    print(f"Modelo local con otra dimensión en {path}; se usa solo el léxico")
+                    return
+                self.sentiment_weights = data['sentiment_weights']
+                self.emotion_weights = data['emotion_weights']
+                self.sentiment_bias = data['sentiment_bias']
+                self.emotion_bias = data['emotion_bias']
+            self.trained = True
+        except (OSError, KeyError, ValueError) as e:
+            print(f"No se pudo cargar el modelo local ({e}); se usa solo el léxico")
+
+    def save(self):
+        path = Path(self.model_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            sentiment_weights=self.sentiment_weights,
+            emotion_weights=self.emotion_weights,
+            sentiment_bias=self.sentiment_bias,
+            emotion_bias=self.emotion_bias
+        )
+        tmp.replace(path)
+
+    def _probabilities(self, rows: np.ndarray, cols: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        sentiment = np.tile(self.sentiment_bias, (n, 1))
+        emotion = np.tile(self.emotion_bias, (n, 1))
+        np.add.at(sentiment, rows, self.sentiment_weights[cols])
+        np.add.at(emotion, rows, self.emotion_weights[cols])
+        return _softmax(sentiment), _softmax(emotion)
+
+    def predict(self, texts: Sequence[str]) -> pd.DataFrame:
+        """DataFrame alineado con texts: sentiment, emotion, confidence, emotion_confidence"""
+        n = len(texts)
+        if n == 0:
+            return pd.DataFrame(columns=['sentiment', 'emotion', 'confidence', 'emotion_confidence'])
+        rows, cols = featurize(texts)
+        with self._lock:
+            sentiment, emotion = self._probabilities(rows, cols, n)
+        return pd.DataFrame({
+            'sentiment': np.asarray(SENTIMENTS)[sentiment.argmax(axis=1)],
+            'emotion': np.asarray(EMOTIONS)[emotion.argmax(axis=1)],
+            'confidence': sentiment.max(axis=1).round(3),
+            'emotion_confidence': emotion.max(axis=1).round(3)
+        })
+
+    def confident(self, predictions: pd.DataFrame) -> np.ndarray:
+        """Máscara de las predicciones que no necesitan pasar por el LLM"""
+        return ((predictions['confidence'] >= self.threshold) &
+                (predictions['emotion_confidence'] >= self.threshold)).to_numpy()
+
+    def fit(self, texts: Sequence[str], sentiments: Sequence[str], emotions: Sequence[str],
+            epochs: int = 30, learning_rate: float = 1.0, l2: float = 1e-3):
+        """Regresión logística multinomial (descenso de gradiente completo) regularizada hacia el léxico"""
+        rows, cols = featurize(texts)
+        n = len(texts)
+        seed_sentiment, seed_emotion = _seed_weights()
+        targets = (
+            (np.asarray([SENTIMENTS.index(s) for s in sentiments]), 'sentiment', seed_sentiment),
+            (np.asarray([EMOTIONS.index(e) for e in emotions]), 'emotion', seed_emotion),
+        )
+
+        with self._lock:
+            for labels, task, seed in targets:
+                weights = getattr(self, f"{task}_weights").copy()
+                bias = getattr(self, f"{task}_bias").copy()
+                onehot = np.eye(weights.shape[1], dtype=np.float32)[labels]
+                touched = np.unique(cols)
+                for _ in range(epochs):
+                    scores = np.tile(bias, (n, 1))
+                    np.add.at(scores, rows, weights[cols])
+                    error = (_softmax(scores) - onehot) / n
+                    grad = np.zeros_like(weights)
+                    np.add.at(grad, cols, error[rows])
+                    # El prior solo se aplica a las columnas vistas: el resto queda igual al léxico
+                    grad[touched] += l2 * (weights[touched] - seed[touched])
+                    weights -= learning_rate * grad
+                    bias -= learning_rate * error.sum(axis=0)
+                setattr(self, f"{task}_weights", weights)
+                setattr(self, f"{task}_bias", bias.astype(np.float32))
+            self.trained = True
+
+
+def evaluate(classifier: LocalClassifier, df: pd.DataFrame) -> Dict:
+    """Compara las etiquetas locales con las del LLM (columnas sentiment/emotion de df)"""
+    texts = (df['title'].fillna('') + " " + df['summary'].fillna('')).tolist()
+    predictions = classifier.predict(texts)
+    llm_sentiment = df['sentiment'].to_numpy()
+    llm_emotion = df['emotion'].to_numpy()
+    sentiment_ok = predictions['sentiment'].to_numpy() == llm_sentiment
+    emotion_ok = predictions['emotion'].to_numpy() == llm_emotion
+    confident = classifier.confident(predictions)
+
+    return {
+        "n": len(df),
+        "sentiment_accuracy": float(sentiment_ok.mean()) if len(df) else 0.0,
+        "emotion_accuracy": float(emotion_ok.mean()) if len(df) else 0.0,
+        # Lo que en modo híbrido se resolvería sin LLM, y qué tan bien
+        "local_share": float(confident.mean()) if len(df) else 0.0,
+        "confident_sentiment_accuracy": float(sentiment_ok[confident].mean()) if confident.any() else None,
+        "confident_emotion_accuracy": float(emotion_ok[confident].mean()) if confident.any() else None,
+        "confusion": pd.crosstab(
+            pd.Series(llm_sentiment, name="LLM"),
+            pd.Series(predictions['sentiment'].to_numpy(), name="local")
+        ),
+    }
+
+
+def _split(df: pd.DataFrame, holdout: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Partición estable por link: un artículo cae siempre del mismo lado"""
+    buckets = df['link'].map(lambda link: zlib.crc32(link.encode("utf-8")) % 100)
+    test = buckets < int(holdout * 100)
+    return df[~test], df[test]
+
+
+def main(argv: Optional[List[str]] = None):
+    from modules.article_store import ArticleStore
+
+    parser = argparse.ArgumentParser(description="Entrena y evalúa el clasificador local contra las etiquetas de DeepSeek")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--holdout", type=float, default=0.2, help="fracción reservada para evaluar")
+    parser.add_argument("--threshold", type=float, default=LOCAL_CONFIDENCE_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    labeled = ArticleStore().llm_labeled()
+    labeled = labeled[labeled['sentiment'].isin(SENTIMENTS) & labeled['emotion'].isin(EMOTIONS)]
+    if labeled.empty:
+        print("No hay artículos etiquetados por DeepSeek en el almacén")
+        return
+    train_df, test_df = _split(labeled, args.holdout)
+    classifier = LocalClassifier(threshold=args.threshold)
+
+    if args.command == "train":
+        if train_df.empty:
+            print("No hay suficientes artículos para entrenar")
+            return
+        classifier.fit(
+            (train_df['title'].fillna('') + " " + train_df['summary'].fillna('')).tolist(),
+            train_df['sentiment'].tolist(),
+            train_df['emotion'].tolist()
+        )
+        classifier.save()
+        print(f"Modelo entrenado con {len(train_df)} artículos -> {classifier.model_path}")
+
+    if test_df.empty:
+        print("Sin artículos reservados para evaluar")
+        return
+    report = evaluate(classifier, test_df)
+    print(f"Artículos evaluados: {report['n']} ({'modelo entrenado' if classifier.trained else 'solo léxico'})")
+    print(f"Sentimiento: {report['sentiment_accuracy']:.1%} | Emoción: {report['emotion_accuracy']:.1%}")
+    print(f"Resueltos localmente con umbral {classifier.threshold}: {report['local_share']:.1%}")
+    if report['confident_sentiment_accuracy'] is not None:
+        print(f"  precisión en esos: sentimiento {report['confident_sentiment_accuracy']:.1%}, "
+              f"emoción {report['confident_emotion_accuracy']:.1%}")
+    print(report['confusion'])
+
+
+if __name__ == "__main__":
+    main()
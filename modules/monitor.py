@@ -0,0 +1,242 @@
+"""Monitor sin interfaz: vigilancias periódicas de keywords, con alertas por email
+
+    python -m modules.monitor            # ciclo continuo
+    python -m modules.monitor --once     # una pasada por todas las vigilancias
+
+La lista de vigilancias es un JSON (WATCHLIST_PATH), por ejemplo:
+
+    [
+      {"keyword": "sequía", "interval": 600, "categories": ["nacional", "regional"]},
+      {"keyword": "reforma de pensiones", "alert_level": "MEDIO", "recipients": ["prensa@ejemplo.cl"]}
+    ]
+
+Los artículos analizados y el estado de cada vigilancia quedan en el ArticleStore,
+de donde los lee el dashboard.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+from config.news_sources import CHILEAN_SOURCES, INTERNATIONAL_SOURCES
+from config.settings import (
+    ALERT_COOLDOWN,
+    ALERT_LEVEL,
+    ALERT_RECIPIENTS,
+    CLASSIFIER_MODE,
+    EMAIL_PASSWORD,
+    EMAIL_SENDER,
+    WATCH_INTERVAL,
+    WATCH_WINDOW_DAYS,
+    WATCHLIST_PATH,
+)
+from modules.analysis_pipeline import AnalysisPipeline, apply_update
+from modules.article_store import ArticleStore
+from modules.crisis_scorer import CrisisScorer
+from modules.deepseek_analyzer import DeepSeekAnalyzer
+from modules.free_news_aggregator import FreeNewsAggregator
+from modules.llm_cost import SearchCost
+from modules.local_classifier import LocalClassifier
+from modules.notifications import generate_analysis_summary, send_email_summary
+from modules.story_clusters import CLASSIFICATION_COLUMNS, cluster_stories
+from modules.telemetry import Trace, span, start_metrics_server, tracing
+
+RISK_LEVELS = ["BAJO", "MEDIO", "ALTO", "CRÍTICO"]
+WATCHLIST_EXAMPLE = "watchlist.example.json"
+
+
+def load_watchlist(path: str = WATCHLIST_PATH) -> List[Dict]:
+    """Vigilancias de path; sin ese archivo (checkout recién clonado) se usa el ejemplo vecino"""
+    if not Path(path).is_file():
+        example = Path(path).with_name(WATCHLIST_EXAMPLE)
+        if not example.is_file():
+            raise SystemExit(f"No existe la lista de vigilancias {path}: copia config/{WATCHLIST_EXAMPLE}")
+        print(f"⚠️ No existe {path}: se usan las vigilancias de ejemplo ({example})")
+        path = str(example)
+    with open(path, encoding="utf-8") as f:
+        watches = json.load(f)
+    if Path(path).name == WATCHLIST_EXAMPLE:
+        # Los destinatarios del ejemplo son ficticios: las alertas van solo a ALERT_RECIPIENTS
+        watches = [{k: v for k, v in watch.items() if k != "recipients"} for watch in watches]
+    for watch in watches:
+        if not watch.get("keyword"):
+            raise ValueError(f"Vigilancia sin keyword en {path}: {watch}")
+    return watches
+
+
+def watch_origins(watch: Dict) -> List[str]:
+    """Orígenes (article_store.ORIGINS) que consulta la vigilancia"""
+    return ['rss'] + (['google'] if watch.get("google", True) else []) + (['bing'] if watch.get("bing", False) else [])
+
+
+def risk_rank(level: str) -> int:
+    return RISK_LEVELS.index(level) if level in RISK_LEVELS else -1
+
+
+class Monitor:
+    """Recorre la lista de vigilancias y procesa solo lo que no se había analizado"""
+
+    def __init__(self, watchlist: List[Dict], aggregator: FreeNewsAggregator,
+                 analyzer: DeepSeekAnalyzer, store: ArticleStore, pipeline: AnalysisPipeline,
+                 sources: Dict):
+        self.watchlist = watchlist
+        self.aggregator = aggregator
+        self.analyzer = analyzer
+        self.store = store
+        self.pipeline = pipeline
+        self.sources = sources
+        self.scorer = CrisisScorer(analyzer)
+
+    def _analyze_new(self, watch: Dict, since: datetime) -> int:
+        """Busca, analiza y guarda los artículos nuevos de una vigilancia; devuelve cuántos fueron"""
+        categories = watch.get("categories") or list(self.sources)
+        df = self.aggregator.aggregate_all_free(
+            watch["keyword"],
+            {cat: sources for cat, sources in self.sources.items() if cat in categories},
+            use_google_news=watch.get("google", True),
+            use_bing_news=watch.get("bing", False),
+            since=since,
+            min_matches=watch.get("min_matches", 1)
+        )
+        if df.empty:
+            return 0
+
+        # Solo lo que no se analizó en una pasada anterior (o desde el dashboard)
+        known = self.store.get_analysis(df['link'].tolist())
+        df = df[~df['link'].isin(known.index)].reset_index(drop=True)
+        if df.empty:
+            return 0
+
+        df = cluster_stories(df)
+        for col in CLASSIFICATION_COLUMNS + ['summary_ai']:
+            df[col] = None
+        pending = df.index[df['is_representative']].tolist()
+        outcome = self.pipeline.run(
+            df[['title', 'summary']].to_dict('records'),
+            classify=pending,
+            summarize=[],
+            mode=watch.get("mode", CLASSIFIER_MODE)
+        )
+        df = apply_update(df, outcome)
+
+        # Lo que falló se guarda sin análisis para reintentarlo en la próxima pasada
+        failed_stories = df.loc[outcome.get('failed', []), 'story_id']
+        df.loc[df['story_id'].isin(failed_stories), CLASSIFICATION_COLUMNS] = None
+        self.store.upsert(df)
+        return len(df)
+
+    def _alert(self, watch: Dict, crisis: Dict, window) -> bool:
+        recipients = watch.get("recipients") or ALERT_RECIPIENTS
+        if not recipients or not EMAIL_SENDER or not EMAIL_PASSWORD:
+            print(f"🚨 '{watch['keyword']}' en nivel {crisis['risk_level']} (sin destinatarios o credenciales de email)")
+            return False
+
+        subject = f"🚨 Riesgo {crisis['risk_level']}: {watch['keyword']}"
+        body = f"{crisis['analysis']}\n\n{generate_analysis_summary(window, watch['keyword'])}"
+        sent = False
+        for recipient in recipients:
+            ok, message = send_email_summary(recipient, subject, body, EMAIL_SENDER, EMAIL_PASSWORD)
+            print(f"{message} ({recipient})")
+            sent = sent or ok
+        return sent
+
+    def run_watch(self, watch: Dict) -> Dict:
+        keyword = watch["keyword"]
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=watch.get("window_days", WATCH_WINDOW_DAYS))
+        state = self.store.get_watch(keyword) or {}
+
+        # Lo que la pasada gaste en DeepSeek queda en el registro de costos como una búsqueda,
+        # y sus spans en el log de telemetría con la vigilancia como traza
+        label = f"vigilancia: {keyword}"
+        with self.analyzer.ledger.track(SearchCost(label)), tracing(Trace(label)), \
+                span("watch_run", keyword=keyword):
+            new_articles = self._analyze_new(watch, since)
+            window = self.store.search(keyword, since=since, categories=watch.get("categories"),
+                                       origins=watch_origins(watch))
+
+            # El LLM de riesgo solo se consulta si cambió el conjunto de noticias de la ventana
+            crisis = self.scorer.assess(keyword, window, now)
+
+        update = {
+            "last_run": now.isoformat(),
+            "new_articles": new_articles,
+            "total_articles": len(window),
+            "risk_level": crisis["risk_level"],
+            "risk_score": crisis.get("score", 0),
+            "analysis": crisis.get("analysis", "")
+        }
+
+        threshold = risk_rank(watch.get("alert_level", ALERT_LEVEL))
+        if threshold >= 0 and risk_rank(crisis["risk_level"]) >= threshold:
+            alerted_at = state.get("alerted_at")
+            cooled_down = (alerted_at is None or
+                           (now - datetime.fromisoformat(alerted_at)).total_seconds() >= ALERT_COOLDOWN)
+            # Se alerta al subir de nivel o, si se mantiene, una vez por ALERT_COOLDOWN
+            if risk_rank(crisis["risk_level"]) > risk_rank(state.get("alerted_level") or "") or cooled_down:
+                if self._alert(watch, crisis, window):
+                    update["alerted_level"] = crisis["risk_level"]
+                    update["alerted_at"] = now.isoformat()
+
+        self.store.save_watch(keyword, **update)
+        print(f"👁️ '{keyword}': {new_articles} nuevas, {len(window)} en ventana, riesgo {crisis['risk_level']}")
+        return update
+
+    def _due_in(self, watch: Dict, now: float) -> float:
+        """Segundos hasta que toque la vigilancia (<= 0: ya toca)"""
+        state = self.store.get_watch(watch["keyword"])
+        if not state or not state.get("last_run"):
+            return 0.0
+        last_run = datetime.fromisoformat(state["last_run"]).timestamp()
+        return last_run + watch.get("interval", WATCH_INTERVAL) - now
+
+    def run_once(self):
+        for watch in self.watchlist:
+            try:
+                self.run_watch(watch)
+            except Exception as e:
+                print(f"Error en vigilancia '{watch['keyword']}': {e}")
+
+    def run_forever(self):
+        while True:
+            for watch in self.watchlist:
+                if self._due_in(watch, time.time()) <= 0:
+                    try:
+                        self.run_watch(watch)
+                    except Exception as e:
+                        print(f"Error en vigilancia '{watch['keyword']}': {e}")
+            wait = min((self._due_in(w, time.time()) for w in self.watchlist), default=WATCH_INTERVAL)
+            time.sleep(min(max(wait, 1.0), 60.0))
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Vigilancias periódicas de keywords con alertas de crisis")
+    parser.add_argument("--once", action="store_true", help="una pasada por todas las vigilancias y salir")
+    parser.add_argument("--watchlist", default=WATCHLIST_PATH)
+    args = parser.parse_args(argv)
+
+    watchlist = load_watchlist(args.watchlist)
+    start_metrics_server()
+    sources = {**CHILEAN_SOURCES, **INTERNATIONAL_SOURCES}
+    aggregator = FreeNewsAggregator()
+    if not args.once:
+        # Los feeds directos se refrescan en segundo plano; cada vigilancia consulta memoria
+        aggregator.start_ingestion(sources)
+    analyzer = DeepSeekAnalyzer()
+    monitor = Monitor(watchlist, aggregator, analyzer, ArticleStore(),
+                      AnalysisPipeline(analyzer, LocalClassifier()), sources)
+
+    print(f"👁️ Monitor con {len(watchlist)} vigilancias")
+    if args.once:
+        monitor.run_once()
+    else:
+        monitor.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import smtplib
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+
+def generate_analysis_summary(df, keyword, max_news=20):
+    """
+    Genera un resumen consolidado
+    """
+    if df.empty:
+        return "No hay datos para generar el resumen."
+
+    summary_parts = []
+    summary_parts.append(f"📊 RESUMEN DE ANÁLISIS: '{keyword}'")
+    summary_parts.append(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    summary_parts.append(f"Total de noticias analizadas: {len(df)}\n")
+
+    if 'sentiment' in df.columns:
+        sentiment_counts = df['sentiment'].value_counts()
+        summary_parts.append("🎭 ANÁLISIS DE SENTIMIENTOS:")
+        for sentiment, count in sentiment_counts[sentiment_counts > 0].items():
+            percentage = (count / len(df)) * 100
+            summary_parts.append(f"  • {sentiment}: {count} ({percentage:.1f}%)")
+        summary_parts.append("")
+
+    if 'emotion' in df.columns:
+        emotion_counts = df['emotion'].value_counts()
+        summary_parts.append("😊 ANÁLISIS DE EMOCIONES:")
+        for emotion, count in emotion_counts[emotion_counts > 0].items():
+            percentage = (count / len(df)) * 100
+            summary_parts.append(f"  • {emotion}: {count} ({percentage:.1f}%)")
+        summary_parts.append("")
+
+    summary_parts.append(f"📰 DETALLE DE NOTICIAS (Mostrando las primeras {min(max_news, len(df))} de {len(df)}):\n")
+
+    for idx, row in df.head(max_news).iterrows():
+        title = row.get('title', 'Sin título')
+        source = row.get('source', 'Fuente desconocida')
+        link = row.get('link', 'Sin enlace')
+        sentiment = row.get('sentiment', 'N/A')
+        emotion = row.get('emotion', 'N/A')
+
+        summary_parts.append(f"{'='*80}")
+        summary_parts.append(f"Noticia #{idx + 1}")
+        summary_parts.append(f"Titular: {title}")
+        summary_parts.append(f"Medio: {source}")
+        summary_parts.append(f"Sentimiento: {sentiment}")
+        summary_parts.append(f"Emoción: {emotion}")
+        summary_parts.append(f"Link: {link}")
+        summary_parts.append("")
+
+    if len(df) > max_news:
+        summary_parts.append(f"\n... y {len(df) - max_news} noticias más")
+
+    return "\n".join(summary_parts)
+
+
+def send_email_summary(recipient_email, subject, summary_content, sender, password):
+    """
+    Envía el resumen por email
+    """
+    try:
+        message = MIMEMultipart()
+        message["From"] = sender
+        message["To"] = recipient_email
+        message["Subject"] = subject
+        message.attach(MIMEText(summary_content, "plain", "utf-8"))
+
+        server = smtplib.SMTP("smtp.gmail.com", 587)
+        server.starttls()
+        server.login(sender, password)
+        server.sendmail(sender, recipient_email, message.as_string())
+        server.quit()
+
+        return True, "Email enviado exitosamente ✅"
+    except Exception as e:
+        return False, f"Error al enviar email: {str(e)}"
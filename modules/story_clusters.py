@@ -0,0 +1,155 @@
+"""Agrupación de copias casi idénticas de una misma noticia (MinHash + LSH)
+
+La misma nota de agencia llega por Google News ("Título - Medio"), Bing y varios
+medios chilenos con títulos y bajadas levemente distintos. Se agrupan en historias
+para analizar una sola copia por historia y mostrar cuántos medios la publicaron.
+"""
+import re
+import zlib
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from config.settings import STORY_SIMILARITY_THRESHOLD
+from modules.text_index import tokenize
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Primo < 2^32: (a * x + b) con a < 2^31 y x < 2^32 no desborda uint64
+_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+
+_TAG_RE = re.compile(r"<[^>]+>")
+# Sufijo " - Medio" / " | Medio" que agrega Google News (y algunos medios) al título
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,60}$")
+# Palabras de la bajada que entran a la firma: suficiente para distinguir, sin arrastrar ruido
+_SUMMARY_TOKENS = 30
+# Bajo estas palabras distintas el título es genérico ("Minuto a minuto", "Última hora")
+# y no basta para unir dos copias: hace falta que coincida también la bajada
+_MIN_TITLE_TOKENS = 4
+# Palabras de la bajada ausentes del título para considerarla contexto (Google suele repetir el título)
+_MIN_LEAD_TOKENS = 5
+
+# Columnas que una copia hereda del representante de su historia
+CLASSIFICATION_COLUMNS = ['sentiment', 'emotion', 'confidence', 'classifier']
+
+
+def normalize_title(title: str) -> str:
+    return _SOURCE_SUFFIX_RE.sub("", title or "").strip()
+
+
+def shingles(text: str) -> List[str]:
+    """Bigramas de palabras plegadas (sin tildes ni mayúsculas)"""
+    tokens = tokenize(text)
+    if len(tokens) == 1:
+        return tokens
+    return sorted({f"{a} {b}" for a, b in zip(tokens, tokens[1:])})
+
+
+def signature(grams: List[str]) -> np.ndarray:
+    """Firma MinHash de NUM_PERM valores (vacía = todo al máximo, no coincide con nada)"""
+    if not grams:
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    hashed = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    permuted = (np.outer(hashed, _A) + _B) % _PRIME
+    return permuted.min(axis=0)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # La raíz es siempre el menor índice: la historia se identifica por su primera fila
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def cluster_stories(df: pd.DataFrame, threshold: float = STORY_SIMILARITY_THRESHOLD) -> pd.DataFrame:
+    """Agrega story_id, story_size e is_representative a cada fila
+
+    Candidatos por LSH (bandas de las firmas MinHash); un par se une si la similitud
+    Jaccard estimada de los títulos alcanza threshold y, cuando ambas copias traen
+    bajada, también la de título + bajada. Sin bajada en alguna de las dos, solo se
+    unen títulos con al menos _MIN_TITLE_TOKENS palabras distintas.
+    El representante de cada historia es la copia con la bajada más larga (más
+    contexto para el análisis).
+    """
+    df = df.copy()
+    n = len(df)
+    if n == 0:
+        return df.assign(story_id=pd.Series(dtype=int), story_size=pd.Series(dtype=int),
+                         is_representative=pd.Series(dtype=bool))
+
+    titles = [normalize_title(t) for t in df['title'].fillna('').astype(str)]
+    summaries = df['summary'].fillna('').astype(str).tolist() if 'summary' in df.columns else [''] * n
+    leads = [" ".join(_TAG_RE.sub(" ", s).split()[:_SUMMARY_TOKENS]) for s in summaries]
+    # Dos firmas: solo título (candidatos y primera condición) y título + inicio de la bajada
+    # (separa titulares genéricos o casi iguales que cuentan hechos distintos)
+    title_signatures = np.vstack([signature(shingles(t)) for t in titles])
+    full_signatures = np.vstack([signature(shingles(f"{t} {lead}")) for t, lead in zip(titles, leads)])
+    title_words = [set(tokenize(t)) for t in titles]
+    has_lead = [len(set(tokenize(lead)) - words) >= _MIN_LEAD_TOKENS for lead, words in zip(leads, title_words)]
+    specific_title = [len(words) >= _MIN_TITLE_TOKENS for words in title_words]
+    uf = _UnionFind(n)
+
+    def same_story(i: int, j: int) -> bool:
+        if not title_words[i] or not title_words[j]:
+            return False
+        if (title_signatures[i] == title_signatures[j]).mean() < threshold:
+            return False
+        if has_lead[i] and has_lead[j]:
+            return (full_signatures[i] == full_signatures[j]).mean() >= threshold
+        return specific_title[i] and specific_title[j]
+
+    for signatures in (title_signatures, full_signatures):
+        for band in range(BANDS):
+            buckets: Dict[bytes, List[int]] = {}
+            block = signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            for i in range(n):
+                buckets.setdefault(block[i].tobytes(), []).append(i)
+            for members in buckets.values():
+                # Se compara contra una fila por grupo ya formado en el bucket, no contra todas
+                heads: List[int] = []
+                for i in members:
+                    if any(uf.find(h) == uf.find(i) for h in heads):
+                        continue
+                    for h in heads:
+                        if same_story(h, i):
+                            uf.union(h, i)
+                            break
+                    else:
+                        heads.append(i)
+
+    story = np.array([uf.find(i) for i in range(n)])
+    summary_len = np.array([len(lead) for lead in leads])
+    order = pd.DataFrame({'story': story, 'summary_len': summary_len, 'pos': np.arange(n)})
+    representatives = order.sort_values(['story', 'summary_len', 'pos'], ascending=[True, False, True]) \
+        .drop_duplicates('story')['pos'].to_numpy()
+
+    df['story_id'] = story
+    df['story_size'] = df.groupby('story_id')['story_id'].transform('size').to_numpy()
+    is_rep = np.zeros(n, dtype=bool)
+    is_rep[representatives] = True
+    df['is_representative'] = is_rep
+    return df
+
+
+def spread_story_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """Copia la clasificación a las filas de cada historia que aún no la tienen"""
+    labeled = df[df['sentiment'].notna()].drop_duplicates('story_id').set_index('story_id')
+    missing = df['sentiment'].isna()
+    for col in CLASSIFICATION_COLUMNS:
+        df.loc[missing, col] = df.loc[missing, 'story_id'].map(labeled[col])
+    return df
@@ -0,0 +1,272 @@
+"""Instrumentación de los caminos calientes: spans de tiempo, contadores, log JSON y /metrics
+
+    with span("feed_fetch", host="www.latercera.com"):
+        ...
+    count("feed_bytes_total", len(body), host=host)
+
+Cada span alimenta un histograma (<nombre>_seconds), deja una línea JSON en
+TELEMETRY_LOG_PATH (volumen ./logs) y, si hay una traza activa, queda en ella para
+el desglose de tiempos del dashboard. La traza activa se propaga con contextvars,
+igual que la búsqueda activa del registro de costos: las tareas lanzadas con
+contextvars.copy_context().run cargan sus spans a la búsqueda que las originó.
+
+Las métricas se exponen en formato Prometheus en http://<host>:METRICS_PORT/metrics.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import METRICS_PORT, TELEMETRY_LOG_BACKUPS, TELEMETRY_LOG_MAX_BYTES, TELEMETRY_LOG_PATH
+
+METRIC_PREFIX = "news_monitor_"
+# Límites (segundos) de los histogramas de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_active_trace: contextvars.ContextVar = contextvars.ContextVar("telemetry_trace", default=None)
+
+_INF_LABEL = 'le="+Inf"'
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict) -> _Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    """Contadores e histogramas en memoria, con salida en formato de texto de Prometheus"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, _Labels], float] = {}
+        # (nombre, labels) -> [conteos por balde..., suma, total]
+        self._histograms: Dict[Tuple[str, _Labels], List[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def total(self, name: str) -> float:
+        """Suma de un contador sobre todas sus etiquetas"""
+        with self._lock:
+            return sum(v for (counter, _), v in self._counters.items() if counter == name)
+
+    def render(self) -> str:
+        def series(name: str, labels: _Labels, extra: str = "") -> str:
+            parts = [f'{k}="{_escape(v)}"' for k, v in labels] + ([extra] if extra else [])
+            return f"{METRIC_PREFIX}{name}{{{','.join(parts)}}}" if parts else f"{METRIC_PREFIX}{name}"
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, list(v)) for k, v in self._histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+                typed.add(name)
+            lines.append(f"{series(name, labels)} {value:g}")
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                typed.add(name)
+            for bound, bucket_count in zip(self.buckets, histogram):
+                le = f'le="{bound:g}"'
+                lines.append(f"{series(name + '_bucket', labels, le)} {bucket_count}")
+            lines.append(f"{series(name + '_bucket', labels, _INF_LABEL)} {histogram[-1]}")
+            lines.append(f"{series(name + '_sum', labels)} {histogram[-2]:.6f}")
+            lines.append(f"{series(name + '_count', labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+class Trace:
+    """Spans de una búsqueda (o de una ejecución del dashboard), para el desglose de tiempos"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict] = []
+
+    def add(self, name: str, labels: Dict, start: float, duration: float, status: str):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "detail": ", ".join(f"{v}" for _, v in _labels(labels)),
+                "start": start - self.started,
+                "duration": duration,
+                "status": status
+            })
+
+    def wall_time(self) -> float:
+        """Segundos desde el inicio de la traza hasta el fin del último span"""
+        with self._lock:
+            return max((s["start"] + s["duration"] for s in self.spans), default=0.0)
+
+    def breakdown(self) -> List[Dict]:
+        """Un renglón por (span, detalle): llamadas, segundos totales y máximo, errores"""
+        with self._lock:
+            spans = list(self.spans)
+        rows: Dict[Tuple[str, str], Dict] = {}
+        for s in spans:
+            row = rows.setdefault((s["name"], s["detail"]), {
+                "span": s["name"], "detalle": s["detail"], "llamadas": 0, "total_s": 0.0, "max_s": 0.0, "errores": 0
+            })
+            row["llamadas"] += 1
+            row["total_s"] += s["duration"]
+            row["max_s"] = max(row["max_s"], s["duration"])
+            row["errores"] += s["status"] != "ok"
+        return sorted(rows.values(), key=lambda r: r["total_s"], reverse=True)
+
+
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+def _json_logger() -> Optional[logging.Logger]:
+    """Logger de eventos JSON (uno por línea, con rotación); None si TELEMETRY_LOG_PATH está vacío"""
+    global _logger
+    if _logger is None and TELEMETRY_LOG_PATH:
+        with _logger_lock:
+            if _logger is None:
+                Path(TELEMETRY_LOG_PATH).parent.mkdir(parents=True, exist_ok=True)
+                logger = logging.getLogger("news_monitor.telemetry")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(TELEMETRY_LOG_PATH, maxBytes=TELEMETRY_LOG_MAX_BYTES,
+                                              backupCount=TELEMETRY_LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def log_event(event: str, **fields):
+    """Una línea JSON en el log de telemetría"""
+    logger = _json_logger()
+    if logger is None:
+        return
+    trace = _active_trace.get()
+    record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event,
+              **({"trace": trace.label} if trace is not None else {}), **fields}
+    logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def count(name: str, value: float = 1, **labels):
+    METRICS.inc(name, value, **labels)
+
+
+@contextmanager
+def span(name: str, **labels):
+    """Mide el bloque: histograma <name>_seconds, línea JSON y, si hay traza activa, un span en ella
+
+    Una excepción se cuenta en errors_total{stage=name} y se vuelve a lanzar.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        status = "error"
+        error = f"{type(e).__name__}: {e}"
+        count("errors_total", stage=name)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        METRICS.observe(f"{name}_seconds", duration, **labels)
+        trace = _active_trace.get()
+        if trace is not None:
+            trace.add(name, labels, start, duration, status)
+        log_event("span", name=name, duration_ms=round(duration * 1000, 2), status=status,
+                  **labels, **({"error": error} if error else {}))
+
+
+@contextmanager
+def tracing(trace: Optional[Trace]):
+    """Los spans del bloque (y de las tareas lanzadas con copy_context) quedan en `trace`"""
+    token = _active_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _active_trace.reset(token)
+
+
+def start_trace(label: str) -> Trace:
+    """Traza activa desde aquí hasta el fin del contexto actual
+
+    Para código que no se puede envolver en un with: el dashboard de Streamlit
+    re-ejecuta el script completo en cada interacción y abre una traza por ejecución.
+    """
+    trace = Trace(label)
+    _active_trace.set(trace)
+    return trace
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Los scrapes periódicos no ensucian la salida
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """Sirve /metrics en un hilo de fondo (una vez por proceso; port=0 lo desactiva)"""
+    global _server
+    if _server is not None or not port:
+        return _server
+    try:
+        _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as e:
+        print(f"Métricas: no se pudo abrir el puerto {port} ({e})")
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Métricas en http://0.0.0.0:{port}/metrics")
+    return _server
@@ -0,0 +1,274 @@
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_QUERY_RE = re.compile(r'"([^"]*)"|(\()|(\))|(-?[\w*]+(?:-[\w*]+)*)', re.UNICODE)
+_OPERATORS = {"AND", "OR", "NOT"}
+
+# Separación de posiciones entre título y resumen: una frase nunca cruza de un campo al otro
+_FIELD_GAP = 1000
+
+
+@lru_cache(maxsize=65536)
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes/diéresis: 'Rancagüino' -> 'rancaguino', 'sequía' -> 'sequia'"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold(text)) if text else []
+
+
+class InvertedIndex:
+    """Índice invertido término -> {doc_id: posiciones}, actualizado incrementalmente
+
+    Consultas soportadas:
+      - sequía                      término (sin tildes ni mayúsculas)
+      - reforma tributaria          varias palabras seguidas = frase
+      - "banco central" AND tasa    operadores AND, OR, NOT y paréntesis
+      - -farándula                  '-' antepuesto equivale a NOT
+      - minero*                     prefijo
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, List[int]]] = {}
+        self._doc_terms: Dict[int, Set[str]] = {}
+
+    def add(self, doc_id: int, title: str, summary: str = ""):
+        """Indexa (o reindexa) un documento"""
+        with self._lock:
+            if doc_id in self._doc_terms:
+                self.remove(doc_id)
+
+            positions: Dict[str, List[int]] = {}
+            for offset, text in ((0, title), (_FIELD_GAP, summary)):
+                for pos, term in enumerate(tokenize(text)):
+                    positions.setdefault(term, []).append(offset + pos)
+
+            for term, term_positions in positions.items():
+                self._postings.setdefault(term, {})[doc_id] = term_positions
+            self._doc_terms[doc_id] = set(positions)
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            for term in self._doc_terms.pop(doc_id, ()):
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    # --- Evaluación -------------------------------------------------------
+
+    def _term_postings(self, term: str) -> Dict[int, List[int]]:
+        if not term.endswith("*"):
+            return self._postings.get(term, {})
+
+        # Prefijo: une las listas de todos los términos que empiezan igual
+        prefix = term.rstrip("*")
+        merged: Dict[int, List[int]] = {}
+        for candidate, posting in self._postings.items():
+            if candidate.startswith(prefix):
+                for doc_id, positions in posting.items():
+                    merged.setdefault(doc_id, []).extend(positions)
+        return merged
+
+    def _phrase(self, words: List[str]) -> Dict[int, int]:
+        """doc_id -> número de apariciones de la frase"""
+        postings = [self._term_postings(w) for w in words]
+        if not postings or any(not p for p in postings):
+            return {}
+        if len(postings) == 1:
+            return {doc_id: len(pos) for doc_id, pos in postings[0].items()}
+
+        # Se parte de la lista más corta para que el costo dependa de las coincidencias
+        candidates = set(min(postings, key=len))
+        for posting in postings:
+            candidates.intersection_update(posting)
+
+        counts = {}
+        for doc_id in candidates:
+            following = [set(p[doc_id]) for p in postings[1:]]
+            hits = sum(
+                1 for start in postings[0][doc_id]
+                if all(start + i + 1 in positions for i, positions in enumerate(following))
+            )
+            if hits:
+                counts[doc_id] = hits
+        return counts
+
+    def search(self, query: str) -> Dict[int, int]:
+        """Evalúa la consulta y devuelve doc_id -> cantidad de coincidencias"""
+        tokens = lex_query(query)
+        if not tokens:
+            return {}
+        with self._lock:
+            parser = _QueryParser(tokens, self)
+            return parser.parse()
+
+
+def lex_query(query: str) -> List[tuple]:
+    """Tokens de la consulta: ('PHRASE', palabras), operadores y paréntesis"""
+    tokens = []
+    for phrase, lparen, rparen, word in _QUERY_RE.findall(query or ""):
+        if phrase:
+            tokens.append(("PHRASE", tokenize(phrase)))
+        elif lparen:
+            tokens.append(("(", None))
+        elif rparen:
+            tokens.append((")", None))
+        elif word in _OPERATORS:
+            tokens.append((word, None))
+        else:
+            # 'covid-19' se indexó como 'covid', '19': se busca igual
+            words = []
+            for part in word.lstrip("-").split("-"):
+                part_words = tokenize(part)
+                if part_words and part.endswith("*"):
+                    part_words[-1] += "*"
+                words.extend(part_words)
+            if word.startswith("-"):
+                # '-x' niega solo esa palabra, no se une a las siguientes
+                tokens.extend([("NOT", None), ("PHRASE", words)])
+            else:
+                tokens.extend(("WORD", w) for w in words)
+
+    # Palabras sueltas consecutivas forman una frase (igual que la búsqueda literal de antes)
+    merged = []
+    for kind, value in tokens:
+        if kind == "WORD" and merged and merged[-1][0] == "WORDS":
+            merged[-1][1].append(value)
+        elif kind == "WORD":
+            merged.append(("WORDS", [value]))
+        else:
+            merged.append((kind, value))
+    return [("PHRASE", v) if k == "WORDS" else (k, v) for k, v in merged if k != "PHRASE" or v]
+
+
+def positive_phrases(query: str) -> List[List[str]]:
+    """Frases de la consulta que no están negadas (con NOT o '-')
+
+    Toda coincidencia contiene al menos una: sirven para preseleccionar candidatos
+    (FTS5 en el historial) y para resaltar los términos en pantalla.
+    """
+    tokens = lex_query(query)
+    phrases = []
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        if kind == "NOT":
+            # Se salta el operando negado: una frase o un grupo entre paréntesis
+            i += 1
+            if i < len(tokens) and tokens[i][0] == "(":
+                depth = 0
+                while i < len(tokens):
+                    depth += {"(": 1, ")": -1}.get(tokens[i][0], 0)
+                    i += 1
+                    if depth == 0:
+                        break
+                continue
+        elif kind == "PHRASE":
+            phrases.append(value)
+        i += 1
+    return phrases
+
+
+@lru_cache(maxsize=1)
+def _folded_variants() -> Dict[str, str]:
+    """Letra plegada -> clase regex con sus variantes con tilde ('i' -> '[iíìîïÍ...]')"""
+    variants: Dict[str, Set[str]] = {}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        folded = fold(char)
+        if len(folded) == 1 and folded.isascii() and folded.isalpha():
+            variants.setdefault(folded, set()).add(char)
+    return {letter: "[" + letter + "".join(sorted(chars)) + "]" for letter, chars in variants.items()}
+
+
+def phrase_regex(words: List[str]) -> str:
+    """Regex que encuentra la frase en el texto original (sin tildes ni mayúsculas,
+    con re.IGNORECASE), con el mismo corte de palabras que tokenize y prefijo*"""
+    variants = _folded_variants()
+    parts = []
+    for word in words:
+        prefix = word.endswith("*")
+        body = "".join(variants.get(c, re.escape(c)) for c in word.rstrip("*"))
+        parts.append(body + (r"\w*" if prefix else ""))
+    return r"(?<!\w)" + r"\W+".join(parts) + r"(?!\w)"
+
+
+class _QueryParser:
+    """Descenso recursivo: OR < AND (implícito) < NOT < operando"""
+
+    def __init__(self, tokens: List[tuple], index: InvertedIndex):
+        self.tokens = tokens
+        self.pos = 0
+        self.index = index
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def parse(self) -> Dict[int, int]:
+        result = self._or()
+        return {doc_id: count for doc_id, count in result.items() if count > 0}
+
+    def _or(self) -> Dict[int, int]:
+        result = self._and()
+        while self._peek() == "OR":
+            self.pos += 1
+            right = self._and()
+            for doc_id, count in right.items():
+                result[doc_id] = result.get(doc_id, 0) + count
+        return result
+
+    def _and(self) -> Dict[int, int]:
+        result = self._not()
+        while self._peek() in ("AND", "NOT", "PHRASE", "("):
+            if self._peek() == "AND":
+                self.pos += 1
+            if self._peek() == "NOT":
+                # x NOT y: se descarta sobre las coincidencias de x, sin recorrer el corpus
+                self.pos += 1
+                excluded = self._operand()
+                result = {doc_id: count for doc_id, count in result.items() if doc_id not in excluded}
+                continue
+            right = self._not()
+            result = {
+                doc_id: count + right[doc_id]
+                for doc_id, count in result.items()
+                if doc_id in right
+            }
+        return result
+
+    def _not(self) -> Dict[int, int]:
+        if self._peek() != "NOT":
+            return self._operand()
+        self.pos += 1
+        excluded = self._operand()
+        # NOT aislado: todos los documentos salvo los excluidos, sin aportar menciones
+        return {doc_id: 0 for doc_id in self.index._doc_terms if doc_id not in excluded}
+
+    def _operand(self) -> Dict[int, int]:
+        kind = self._peek()
+        if kind == "(":
+            self.pos += 1
+            result = self._or()
+            if self._peek() == ")":
+                self.pos += 1
+            return result
+        if kind == "PHRASE":
+            words = self.tokens[self.pos][1]
+            self.pos += 1
+            return self.index._phrase(words)
+        # Token inesperado (p. ej. operador colgante): se ignora
+        self.pos += 1
+        return {}
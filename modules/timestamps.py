@@ -0,0 +1,50 @@
+import calendar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Optional
+
+import pandas as pd
+
+
+@lru_cache(maxsize=16384)
+def parse_published(text: str) -> Optional[datetime]:
+    """Texto de fecha de un feed -> datetime UTC; se parsea una vez por string distinto
+
+    Primero RFC-822 (lo habitual en RSS); si no, ISO-8601 y otros formatos vía pandas.
+    """
+    if not text:
+        return None
+    try:
+        parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        parsed = pd.to_datetime(text, errors='coerce', utc=True)
+        return None if pd.isna(parsed) else parsed.to_pydatetime()
+    if parsed.tzinfo is None:
+        # RFC-822 sin zona ("-0000"): se asume UTC
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def entry_timestamp(entry) -> Optional[datetime]:
+    """Fecha de publicación de una entrada de feedparser, en UTC
+
+    Usa published_parsed / updated_parsed (feedparser ya los normaliza a UTC) y
+    solo si faltan recurre al texto.
+    """
+    for field in ('published_parsed', 'updated_parsed'):
+        struct = entry.get(field)
+        if struct:
+            try:
+                return datetime.fromtimestamp(calendar.timegm(struct), tz=timezone.utc)
+            except (OverflowError, ValueError, TypeError):
+                continue
+    return parse_published(entry.get('published') or entry.get('updated') or '')
+
+
+def within(published_dt: Optional[datetime], since: Optional[datetime]) -> bool:
+    """¿Entra en la ventana? Sin fecha conocida se descarta si hay ventana"""
+    if since is None:
+        return True
+    return published_dt is not None and published_dt >= since
+
@@ -0,0 +1,226 @@
+"""URLs canónicas: desenvuelve redirecciones de Google/Bing y quita parámetros de seguimiento
+
+La misma nota llega como https://news.google.com/rss/articles/CBMi..., como
+http://www.bing.com/news/apiclick.aspx?...&url=... y como el link del medio con
+?utm_source=rss. canonical_url() deja las tres en la misma forma para que la
+deduplicación y el ArticleStore usen una sola clave.
+"""
+import base64
+import binascii
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+
+from config.settings import (
+    URL_CACHE_FAILURE_TTL,
+    URL_CACHE_PATH,
+    URL_CACHE_TTL,
+    URL_RESOLVE_MAX_WORKERS,
+    URL_RESOLVE_NETWORK,
+    URL_RESOLVE_TIMEOUT,
+)
+from modules.feed_fetcher import DomainRateLimiter
+
+# Solo parámetros que nunca cambian la página: cid, ref, feed o id son a veces el
+# identificador de la nota en el medio y quitarlos lleva a otra página (o a la portada)
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "twclid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src",
+}
+_TRACKING_PREFIXES = ("utm_", "mc_", "pk_", "mtm_")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_GOOGLE_NEWS_HOST = "news.google.com"
+_GOOGLE_ARTICLE_RE = re.compile(r"^/(?:rss/)?articles/([A-Za-z0-9_-]+)")
+_BING_HOSTS = {"bing.com", "www.bing.com"}
+# Marca del formato antiguo del id de Google News (protobuf con la URL en el campo 4)
+_GOOGLE_ID_PREFIX = b"\x08\x13\x22"
+
+
+def _is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param in _TRACKING_PARAMS or param.startswith(_TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """Forma canónica sin red: host en minúsculas sin puerto por defecto, sin
+    fragmento, sin parámetros de seguimiento, query ordenada y sin '/' final
+
+    El esquema y el www se conservan: hay medios que no responden por https o en el
+    dominio desnudo, y el link canónico es también el que se muestra.
+    """
+    if not url:
+        return url
+    url = url.strip()
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except ValueError:
+        return url
+    if parts.scheme.lower() not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = parts.hostname.lower()
+    if parts.port and parts.port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(k)
+    )
+    return urllib.parse.urlunsplit((scheme, host, path, urllib.parse.urlencode(query), ""))
+
+
+def _decode_google_id(article_id: str) -> Optional[str]:
+    """URL embebida en el id de Google News (solo el formato antiguo la trae en claro)"""
+    try:
+        data = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if not data.startswith(_GOOGLE_ID_PREFIX):
+        return None
+
+    # Largo de la URL como varint de protobuf
+    length, shift, pos = 0, 0, len(_GOOGLE_ID_PREFIX)
+    while pos < len(data):
+        byte = data[pos]
+        length |= (byte & 0x7F) << shift
+        pos += 1
+        if not byte & 0x80:
+            break
+        shift += 7
+    candidate = data[pos:pos + length].decode("utf-8", errors="ignore")
+    return candidate if candidate.startswith(("http://", "https://")) else None
+
+
+def unwrap_url(url: str) -> str:
+    """Desenvuelve sin red los links de redirección de Bing y Google News (cuando se puede)"""
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except ValueError:
+        return url
+    host = (parts.hostname or "").lower()
+
+    if host in _BING_HOSTS and parts.path.lower().startswith("/news/apiclick"):
+        target = urllib.parse.parse_qs(parts.query).get("url")
+        if target and target[0].startswith(("http://", "https://")):
+            return target[0]
+    elif host == _GOOGLE_NEWS_HOST:
+        match = _GOOGLE_ARTICLE_RE.match(parts.path)
+        if match:
+            return _decode_google_id(match.group(1)) or url
+    return url
+
+
+def is_wrapped(url: str) -> bool:
+    """¿Sigue siendo un link de redirección de un agregador?"""
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return host == _GOOGLE_NEWS_HOST or host in _BING_HOSTS
+
+
+class UrlResolver:
+    """Resuelve links a su URL canónica, memorizando en SQLite lo que necesitó red
+
+    Primero se intenta sin red (unwrap_url + canonical_url). Si el link sigue
+    envuelto y la red está habilitada, se sigue la redirección con un HEAD/GET
+    respetando el turno del dominio (rate_limiter). Lo resuelto queda en caché hasta
+    que expire ttl; lo que siguió envuelto, solo failure_ttl.
+    """
+
+    def __init__(self, session: requests.Session, path: str = URL_CACHE_PATH,
+                 ttl: float = URL_CACHE_TTL, network: bool = URL_RESOLVE_NETWORK,
+                 timeout: float = URL_RESOLVE_TIMEOUT, max_workers: int = URL_RESOLVE_MAX_WORKERS,
+                 rate_limiter: Optional[DomainRateLimiter] = None, failure_ttl: float = URL_CACHE_FAILURE_TTL):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.network = network
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="url")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS resolved_urls (
+                    url TEXT PRIMARY KEY,
+                    canonical TEXT NOT NULL,
+                    resolved_at REAL NOT NULL
+                )
+            """)
+
+    def _cached(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT canonical, resolved_at FROM resolved_urls WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        ttl = self.failure_ttl if is_wrapped(row[0]) else self.ttl
+        return row[0] if time.time() - row[1] <= ttl else None
+
+    def _remember(self, url: str, canonical: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolved_urls (url, canonical, resolved_at) VALUES (?, ?, ?)",
+                (url, canonical, time.time())
+            )
+
+    def _follow(self, url: str) -> Optional[str]:
+        """Sigue las redirecciones HTTP; si terminan en el mismo agregador, se queda el link original
+
+        None si la red falló: eso no se memoriza y se reintenta en la próxima búsqueda.
+        """
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait(url)
+            response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            if response.status_code >= 400:
+                # Algunos servidores no aceptan HEAD
+                if self.rate_limiter is not None:
+                    self.rate_limiter.wait(url)
+                response = self.session.get(url, allow_redirects=True, timeout=self.timeout, stream=True)
+                response.close()
+            final = response.url
+        except requests.RequestException:
+            return None
+        return final if final and not is_wrapped(final) else url
+
+    def resolve(self, url: str) -> str:
+        if not url:
+            return url
+        unwrapped = unwrap_url(url)
+        if not is_wrapped(unwrapped):
+            return canonical_url(unwrapped)
+
+        cached = self._cached(url)
+        if cached is not None:
+            return cached
+        if not self.network:
+            return canonical_url(unwrapped)
+
+        followed = self._follow(unwrapped)
+        if followed is None:
+            return canonical_url(unwrapped)
+        canonical = canonical_url(followed)
+        self._remember(url, canonical)
+        return canonical
+
+    def resolve_many(self, urls: List[str]) -> List[str]:
+        """resolve() de una lista; los que requieren red se resuelven en paralelo"""
+        return list(self.executor.map(self.resolve, urls))
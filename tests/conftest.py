@@ -0,0 +1,11 @@
+"""Configuración común: los tests no escriben logs ni abren el puerto de métricas"""
+import os
+import sys
+from pathlib import Path
+
+# Antes de importar config.settings (se lee al importar)
+os.environ.setdefault("TELEMETRY_LOG_PATH", "")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("URL_RESOLVE_NETWORK", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,61 @@
+import pytest
+
+from modules import analysis_cache
+from modules.analysis_cache import AnalysisCache, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {"now": 1_000_000.0}
+    monkeypatch.setattr(analysis_cache.time, "time", lambda: state["now"])
+    return state
+
+
+def test_key_ignores_whitespace_but_not_prompt_or_model():
+    key = AnalysisCache.make_key("deepseek-chat", "v1", "Sequía  en\nChile")
+    assert key == AnalysisCache.make_key("deepseek-chat", "v1", " Sequía en Chile ")
+    assert key != AnalysisCache.make_key("deepseek-chat", "v2", "Sequía en Chile")
+    assert key != AnalysisCache.make_key("otro-modelo", "v1", "Sequía en Chile")
+    assert normalize_text(None) == ""
+
+
+def test_roundtrip_and_counters(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "c.db"))
+    assert cache.get("k") is None
+    cache.set("k", {"sentiment": "NEGATIVO", "emotion": "MIEDO"})
+    assert cache.get("k") == {"sentiment": "NEGATIVO", "emotion": "MIEDO"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "c.db"), ttl=60)
+    cache.set("k", "resumen")
+    clock["now"] += 59
+    assert cache.get("k") == "resumen"
+    clock["now"] += 2
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_is_evicted(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "_EVICT_EVERY", 1)
+    cache = AnalysisCache(str(tmp_path / "c.db"), max_entries=2)
+    cache.set("a", 1)
+    clock["now"] += 10
+    cache.set("b", 2)
+    # Un acierto posterior al umbral renueva a "a"
+    clock["now"] += analysis_cache._TOUCH_AFTER + 1
+    assert cache.get("a") == 1
+    clock["now"] += 10
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_recent_hits_do_not_write(tmp_path, clock):
+    cache = AnalysisCache(str(tmp_path / "c.db"))
+    cache.set("k", 1)
+    changes = cache._conn.total_changes
+    for _ in range(20):
+        clock["now"] += 1
+        cache.get("k")
+    assert cache._conn.total_changes == changes
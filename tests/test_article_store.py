@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from modules.article_store import ArticleStore, fts_query
+
+NOW = datetime.now(timezone.utc)
+
+
+def _row(link, title, summary="", **extra):
+    row = dict(link=link, title=title, summary=summary, source="Emol", category="nacional", origin="rss",
+               keyword="x", keyword_matches=1, published_dt=NOW, fetched_at=NOW)
+    row.update(extra)
+    return row
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    store.upsert(pd.DataFrame([
+        _row("l1", "Sequía golpea a Coquimbo", "La sequía afecta a mineros"),
+        _row("l2", "Sequía y farándula", "Estrella de farándula opina"),
+        _row("l3", "Minería del cobre crece", "Mineros celebran", category="economia"),
+        _row("g1", "Sequía en el norte", source="La Tercera", category=None, origin="google"),
+        _row("b1", "Sequía en el sur", source="Bing News", category=None, origin="bing",
+             published_dt=NOW - timedelta(days=10)),
+    ]))
+    return store
+
+
+def _links(df):
+    return sorted(df['link']) if not df.empty else []
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("sequía", ["b1", "g1", "l1", "l2"]),
+    ("sequia -farándula", ["b1", "g1", "l1"]),
+    ("sequía AND NOT farándula", ["b1", "g1", "l1"]),
+    ("miner*", ["l1", "l3"]),
+    ('"banco central" AND tasa', []),
+    ("NOT sequía", []),
+])
+def test_search_understands_the_index_grammar(store, query, expected):
+    assert _links(store.search(query)) == expected
+
+
+def test_fts_query_only_preselects_positive_phrases():
+    assert fts_query("sequía -farándula") == '"sequia"'
+    assert fts_query("miner*") == '"miner" *'
+    assert fts_query('"banco central" OR tasa') == '"banco central" OR "tasa"'
+    assert fts_query("NOT x") is None
+
+
+def test_mentions_are_computed_for_the_query(store):
+    # El upsert de otra búsqueda no cambia las menciones de esta
+    store.upsert(pd.DataFrame([_row("l1", "Sequía golpea a Coquimbo", "La sequía afecta a mineros",
+                                    keyword="coquimbo", keyword_matches=1)]))
+    df = store.search("sequía", min_matches=2).set_index('link')
+    assert list(df.index) == ["l1"]
+    assert df.loc["l1", "keyword"] == "sequía" and df.loc["l1", "keyword_matches"] == 2
+
+
+def test_filters_by_origin_category_and_date(store):
+    assert _links(store.search("sequía", origins=["rss"])) == ["l1", "l2"]
+    assert _links(store.search("sequía", origins=["rss", "google"], categories=["economia"])) == ["g1"]
+    assert _links(store.search("sequía", since=NOW - timedelta(days=1))) == ["g1", "l1", "l2"]
+
+
+def test_upsert_keeps_existing_analysis(store):
+    store.upsert(pd.DataFrame([_row("l1", "Sequía golpea a Coquimbo", sentiment="NEGATIVO", emotion="MIEDO",
+                                    confidence=0.9, classifier="llm")]))
+    store.upsert(pd.DataFrame([_row("l1", "Sequía golpea a Coquimbo")]))
+    analysis = store.get_analysis(["l1", "l2"])
+    assert list(analysis.index) == ["l1"]
+    assert analysis.loc["l1", "sentiment"] == "NEGATIVO"
+
+
+def test_get_analysis_of_unknown_links_is_empty(store):
+    assert store.get_analysis(["nada"]).empty
+    assert store.get_analysis([]).empty
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from modules.crisis_scorer import CrisisScorer, RollingStats
+
+NOW = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+
+class _Analyzer:
+    def __init__(self, level="BAJO"):
+        self.level = level
+        self.calls = 0
+
+    def detect_crisis_signals(self, df):
+        self.calls += 1
+        return {"risk_level": self.level, "score": 0, "analysis": ""}
+
+
+def _frame(hours_ago, sentiments):
+    return pd.DataFrame({
+        'link': [f"l{i}" for i in range(len(hours_ago))],
+        'published_dt': [NOW - timedelta(hours=h) for h in hours_ago],
+        'sentiment': sentiments,
+    })
+
+
+def test_rolling_stats_follow_the_given_frame():
+    stats = RollingStats(baseline_days=7)
+    df = _frame([1, 2, 30], ['NEGATIVO', 'NEUTRAL', 'NEGATIVO'])
+    assert stats.update(df, NOW) == 3
+    assert stats.window(NOW, 24) == (2, 1)
+    assert stats.update(df, NOW) == 0
+    # Lo que ya no viene se descuenta
+    stats.update(df.iloc[:1], NOW)
+    assert stats.window(NOW, 24 * 7) == (1, 1)
+
+
+def test_llm_is_asked_only_when_the_articles_change():
+    analyzer = _Analyzer()
+    scorer = CrisisScorer(analyzer)
+    df = _frame([1, 2], ['NEGATIVO', 'NEUTRAL'])
+    scorer.assess("sequía", df, NOW)
+    scorer.assess("sequía", df, NOW)
+    assert analyzer.calls == 1
+    scorer.assess("sequía", df.assign(sentiment='NEGATIVO'), NOW)
+    assert analyzer.calls == 2
+
+
+def test_scopes_do_not_share_stats():
+    scorer = CrisisScorer(_Analyzer())
+    full = scorer.assess("sequía", _frame([1, 2], ['NEGATIVO', 'NEUTRAL']), NOW, scope="todo")
+    narrow = scorer.assess("sequía", _frame([1], ['NEGATIVO']), NOW, scope="nacional")
+    assert full["recent_news"] == 2 and narrow["recent_news"] == 1
+
+
+def test_state_is_bounded():
+    scorer = CrisisScorer(_Analyzer(), max_keys=2)
+    for keyword in ("a", "b", "c"):
+        scorer.assess(keyword, _frame([1], ['NEUTRAL']), NOW)
+    assert [key for key, _ in scorer._stats] == ["b", "c"]
+    assert set(key for key, _ in scorer._last) == {"b", "c"}
+
+
+def test_fallback_level_when_llm_fails():
+    scorer = CrisisScorer(_Analyzer(level="ERROR"))
+    result = scorer.assess("sequía", _frame([1, 2], ['NEGATIVO', 'NEGATIVO']), NOW)
+    assert result["risk_level"] == "ALTO"
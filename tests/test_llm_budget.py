@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from modules import llm_budget
+from modules.llm_budget import LLMBudget, backoff_delay, is_transient_error
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj falso: sleep avanza el tiempo en vez de esperar"""
+    state = {"now": 1000.0, "slept": 0.0}
+
+    def sleep(seconds):
+        state["now"] += seconds
+        state["slept"] += seconds
+
+    monkeypatch.setattr(llm_budget.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(llm_budget.time, "sleep", sleep)
+    return state
+
+
+def test_requests_within_budget_do_not_wait(clock):
+    budget = LLMBudget(max_rps=5, max_tpm=60000)
+    for _ in range(5):
+        budget.acquire(100)
+    assert clock["slept"] == 0
+
+
+def test_request_rate_is_capped(clock):
+    budget = LLMBudget(max_rps=5, max_tpm=60000)
+    for _ in range(15):
+        budget.acquire(10)
+    # 5 de entrada y 10 más a 5 por segundo
+    assert clock["slept"] == pytest.approx(2.0, abs=0.05)
+
+
+def test_token_rate_is_capped(clock):
+    budget = LLMBudget(max_rps=100, max_tpm=600)
+    budget.acquire(600)
+    budget.acquire(300)
+    # 300 tokens a 10 tokens/s
+    assert clock["slept"] == pytest.approx(30.0, abs=0.1)
+
+
+def test_oversized_request_still_passes(clock):
+    budget = LLMBudget(max_rps=10, max_tpm=100)
+    budget.acquire(10_000)
+    assert clock["slept"] == 0
+
+
+def test_adjust_charges_real_usage(clock):
+    budget = LLMBudget(max_rps=100, max_tpm=600)
+    budget.acquire(100)
+    budget.adjust(500)
+    budget.acquire(60)
+    assert clock["slept"] == pytest.approx(6.0, abs=0.1)
+
+
+def _status_error(status, headers=None):
+    # Basta con lo que lee el cliente: status, headers y request
+    response = SimpleNamespace(status_code=status, headers=headers or {}, request=None)
+    cls = openai.RateLimitError if status == 429 else openai.APIStatusError
+    return cls("error", response=response, body=None)
+
+
+@pytest.mark.parametrize("status, transient", [(429, True), (500, True), (503, True), (400, False), (401, False)])
+def test_is_transient_error(status, transient):
+    assert is_transient_error(_status_error(status)) is transient
+
+
+def test_plain_exceptions_are_not_retried():
+    assert not is_transient_error(ValueError("json inválido"))
+
+
+def test_backoff_respects_retry_after():
+    assert backoff_delay(3, _status_error(429, {"retry-after": "2"})) == 2.0
+
+
+def test_backoff_is_bounded():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt) <= llm_budget.LLM_BACKOFF_MAX
@@ -0,0 +1,88 @@
+import pandas as pd
+
+from modules.story_clusters import cluster_stories, normalize_title, shingles, spread_story_labels
+
+LEAD_SEQUIA = ("El Ejecutivo destinará recursos para camiones aljibe y pozos en comunas rurales "
+               "de la región afectadas por la falta de lluvias")
+LEAD_SISMO = ("Un sismo de magnitud 6,2 sacudió la zona central esta madrugada, sin daños mayores "
+              "reportados por Senapred")
+LEAD_FUTBOL = ("Colo-Colo enfrenta a la U en el superclásico del fútbol chileno en el estadio "
+               "Monumental este domingo")
+LEAD_TASA = ("El consejo del instituto emisor anunció su decisión de política monetaria tras la "
+             "reunión de este martes con el mercado atento")
+
+
+def _stories(rows):
+    df = cluster_stories(pd.DataFrame(rows, columns=['title', 'summary']))
+    return df['story_id'].tolist()
+
+
+def test_normalize_title_drops_source_suffix():
+    assert normalize_title("Gobierno anuncia plan - La Tercera") == "Gobierno anuncia plan"
+    assert normalize_title("Gobierno anuncia plan | Emol") == "Gobierno anuncia plan"
+
+
+def test_shingles_are_folded_word_bigrams():
+    assert shingles("Sequía en Chile") == ["en chile", "sequia en"]
+    assert shingles("Sequía") == ["sequia"]
+
+
+def test_syndicated_copies_are_grouped():
+    stories = _stories([
+        ("Gobierno anuncia plan de emergencia por sequía en Coquimbo - La Tercera",
+         "Gobierno anuncia plan de emergencia por sequía en Coquimbo La Tercera"),
+        ("Gobierno anuncia plan de emergencia por sequía en Coquimbo", LEAD_SEQUIA),
+        ("Gobierno anuncia plan de emergencia por la sequía en Coquimbo", LEAD_SEQUIA),
+    ])
+    assert len(set(stories)) == 1
+
+
+def test_generic_titles_with_different_leads_stay_apart():
+    stories = _stories([
+        ("Minuto a minuto - Emol", LEAD_SISMO),
+        ("Minuto a minuto - BioBioChile", LEAD_FUTBOL),
+    ])
+    assert stories[0] != stories[1]
+
+
+def test_generic_titles_without_leads_stay_apart():
+    assert len(set(_stories([("Última hora", ""), ("Última hora", "")]))) == 2
+
+
+def test_opposite_headlines_with_shared_lead_stay_apart():
+    stories = _stories([
+        ("Banco Central sube la tasa", LEAD_TASA),
+        ("Banco Central baja la tasa", LEAD_TASA),
+    ])
+    assert stories[0] != stories[1]
+
+
+def test_empty_titles_are_never_grouped():
+    assert len(set(_stories([("", ""), ("", "")]))) == 2
+
+
+def test_representative_has_the_longest_lead():
+    df = cluster_stories(pd.DataFrame({
+        'title': ["Gobierno anuncia plan de emergencia por sequía en Coquimbo"] * 2,
+        'summary': [LEAD_SEQUIA[:80], LEAD_SEQUIA],
+    }))
+    assert df['story_size'].tolist() == [2, 2]
+    assert df['is_representative'].tolist() == [False, True]
+
+
+def test_empty_frame():
+    df = cluster_stories(pd.DataFrame(columns=['title', 'summary']))
+    assert {'story_id', 'story_size', 'is_representative'} <= set(df.columns)
+
+
+def test_spread_story_labels_copies_the_representative():
+    df = pd.DataFrame({
+        'story_id': [0, 0, 2],
+        'sentiment': ['NEGATIVO', None, None],
+        'emotion': ['IRA', None, None],
+        'confidence': [0.9, None, None],
+        'classifier': ['llm', None, None],
+    }).astype({'sentiment': object, 'emotion': object, 'classifier': object})
+    df = spread_story_labels(df)
+    assert df.loc[1, 'sentiment'] == 'NEGATIVO' and df.loc[1, 'classifier'] == 'llm'
+    assert pd.isna(df.loc[2, 'sentiment'])
@@ -0,0 +1,99 @@
+import re
+
+import pytest
+
+from modules.text_index import InvertedIndex, lex_query, phrase_regex, positive_phrases, tokenize
+
+DOCS = {
+    1: ("Sequía en Coquimbo", "La sequía afecta a los mineros de la región"),
+    2: ("Farándula y sequía", "Una estrella de la farándula opina sobre la sequía"),
+    3: ("Banco Central sube la tasa", "El consejo del Banco Central decidió subir la tasa"),
+    4: ("Minería del cobre", "Codelco reporta alzas; la minera estatal celebra"),
+    5: ("COVID-19 en Ñuñoa", "Nuevos casos de covid 19 en la comuna"),
+}
+
+
+@pytest.fixture
+def index():
+    idx = InvertedIndex()
+    for doc_id, (title, summary) in DOCS.items():
+        idx.add(doc_id, title, summary)
+    return idx
+
+
+def test_tokenize_folds_accents_and_case():
+    assert tokenize("Rancagüino SEQUÍA Ñuñoa") == ["rancaguino", "sequia", "nunoa"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("sequía", {1, 2}),
+    ("SEQUIA", {1, 2}),
+    ("sequía -farándula", {1}),
+    ("sequía AND NOT farándula", {1}),
+    ("sequía NOT farándula", {1}),
+    ("sequía OR cobre", {1, 2, 4}),
+    ('"banco central" AND tasa', {3}),
+    ("central banco", set()),
+    ("miner*", {1, 4}),
+    ("(cobre OR tasa) -codelco", {3}),
+    ("covid-19", {5}),
+    ("nunoa", {5}),
+    ("NOT sequía", set()),
+    ("", set()),
+])
+def test_search_grammar(index, query, expected):
+    assert set(index.search(query)) == expected
+
+
+def test_search_counts_mentions(index):
+    # Título + bajada: dos menciones
+    assert index.search("sequía")[1] == 2
+    assert index.search('"banco central"')[3] == 2
+
+
+def test_reindex_and_remove(index):
+    index.add(1, "Otra cosa", "")
+    assert 1 not in index.search("sequía")
+    index.remove(2)
+    assert index.search("sequía") == {}
+    assert len(index) == len(DOCS) - 1
+
+
+def test_phrase_does_not_cross_fields():
+    idx = InvertedIndex()
+    idx.add(1, "Reforma", "tributaria aprobada")
+    assert idx.search("reforma tributaria") == {}
+
+
+def test_lex_query_joins_consecutive_words():
+    assert lex_query("reforma tributaria -ley") == [
+        ("PHRASE", ["reforma", "tributaria"]), ("NOT", None), ("PHRASE", ["ley"])
+    ]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("sequía -farándula", [["sequia"]]),
+    ("sequía AND NOT farándula", [["sequia"]]),
+    ('"banco central" AND tasa', [["banco", "central"], ["tasa"]]),
+    ("(a OR b) NOT (c OR d) e", [["a"], ["b"], ["e"]]),
+    ("educ*", [["educ*"]]),
+    ("NOT x", []),
+])
+def test_positive_phrases(query, expected):
+    assert positive_phrases(query) == expected
+
+
+@pytest.mark.parametrize("words, text, found", [
+    (["sequia"], "La Sequía avanza", "Sequía"),
+    (["banco", "central"], "El banco  Central decidió", "banco  Central"),
+    (["educ*"], "Educación pública", "Educación"),
+    (["covid", "19"], "Casos de COVID-19", "COVID-19"),
+    (["nunoa"], "Comuna de Ñuñoa", "Ñuñoa"),
+])
+def test_phrase_regex_matches_original_text(words, text, found):
+    match = re.search(phrase_regex(words), text, re.IGNORECASE)
+    assert match is not None and match.group() == found
+
+
+def test_phrase_regex_respects_word_boundaries():
+    assert re.search(phrase_regex(["tasa"]), "las tasas suben", re.IGNORECASE) is None
@@ -0,0 +1,111 @@
+import base64
+import time
+
+import pytest
+import requests
+
+from modules.url_canonicalizer import UrlResolver, canonical_url, is_wrapped, unwrap_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.emol.com/noticia?utm_source=rss&utm_medium=feed", "https://www.emol.com/noticia"),
+    ("https://WWW.Emol.com:443/a//b/#comentarios", "https://www.emol.com/a/b"),
+    ("https://x.cl/nota/?fbclid=abc&gclid=def&mc_cid=1&_ga=2", "https://x.cl/nota"),
+    ("https://x.cl/?b=2&a=1", "https://x.cl/?a=1&b=2"),
+    ("https://x.cl:8443/nota", "https://x.cl:8443/nota"),
+    # Identificadores de la nota en algunos medios: no son seguimiento
+    ("https://www.df.cl/noticias/nota?cid=123&utm_source=rss", "https://www.df.cl/noticias/nota?cid=123"),
+    ("https://x.cl/nota?ref=portada&feed=1", "https://x.cl/nota?feed=1&ref=portada"),
+    # El esquema se conserva
+    ("http://www.medio.cl:80/nota/", "http://www.medio.cl/nota"),
+    ("mailto:prensa@ejemplo.cl", "mailto:prensa@ejemplo.cl"),
+    ("", ""),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def test_unwrap_bing_redirect():
+    wrapped = "http://www.bing.com/news/apiclick.aspx?ref=FexRss&url=https%3A%2F%2Fwww.emol.com%2Fa%3Futm_source%3Dx"
+    assert unwrap_url(wrapped) == "https://www.emol.com/a?utm_source=x"
+    assert canonical_url(unwrap_url(wrapped)) == "https://www.emol.com/a"
+
+
+def _old_google_id(target: str) -> str:
+    encoded = target.encode()
+    data = b"\x08\x13\x22" + bytes([len(encoded)]) + encoded + b"\xd2\x01\x00"
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def test_unwrap_old_google_news_id():
+    url = f"https://news.google.com/rss/articles/{_old_google_id('https://www.latercera.com/nota')}?oc=5"
+    assert unwrap_url(url) == "https://www.latercera.com/nota"
+
+
+def test_current_google_ids_stay_wrapped():
+    url = "https://news.google.com/rss/articles/CBMiXkFVX3lxTE1vZ2x0?oc=5"
+    assert unwrap_url(url) == url
+    assert is_wrapped(url)
+
+
+class _Session:
+    """Sesión falsa: cuenta requests y responde con la URL final indicada"""
+
+    def __init__(self, final_url):
+        self.final_url = final_url
+        self.calls = 0
+
+    def head(self, url, **kwargs):
+        self.calls += 1
+        if self.final_url is None:
+            raise requests.ConnectionError("sin red")
+        return type("Response", (), {"status_code": 200, "url": self.final_url})()
+
+
+class _Limiter:
+    def __init__(self):
+        self.waited = []
+
+    def wait(self, url):
+        self.waited.append(url)
+
+
+WRAPPED = "https://news.google.com/rss/articles/CBMiXkFVX3lxTE1vZ2x0?oc=5"
+
+
+def test_resolver_without_network_does_not_touch_the_session(tmp_path):
+    session = _Session("https://www.emol.com/nota")
+    resolver = UrlResolver(session, path=str(tmp_path / "urls.db"), network=False)
+    assert resolver.resolve(WRAPPED) == canonical_url(WRAPPED)
+    assert session.calls == 0
+
+
+def test_resolver_follows_redirects_through_the_rate_limiter(tmp_path):
+    session, limiter = _Session("https://www.emol.com/nota?utm_source=gn"), _Limiter()
+    resolver = UrlResolver(session, path=str(tmp_path / "urls.db"), network=True, rate_limiter=limiter)
+    assert resolver.resolve(WRAPPED) == "https://www.emol.com/nota"
+    assert limiter.waited == [WRAPPED]
+    # Segunda vez desde la caché
+    assert resolver.resolve(WRAPPED) == "https://www.emol.com/nota"
+    assert session.calls == 1
+
+
+def test_resolver_caches_unresolved_links_only_briefly(tmp_path):
+    session = _Session("https://news.google.com/articles/otra")
+    resolver = UrlResolver(session, path=str(tmp_path / "urls.db"), network=True, failure_ttl=60)
+    resolver.resolve(WRAPPED)
+    resolver.resolve(WRAPPED)
+    assert session.calls == 1
+
+    resolver.failure_ttl = 0
+    time.sleep(0.01)
+    resolver.resolve(WRAPPED)
+    assert session.calls == 2
+
+
+def test_resolver_does_not_cache_network_errors(tmp_path):
+    session = _Session(None)
+    resolver = UrlResolver(session, path=str(tmp_path / "urls.db"), network=True)
+    resolver.resolve(WRAPPED)
+    resolver.resolve(WRAPPED)
+    assert session.calls == 2